@@ -1,47 +1,46 @@
 import cv2, numpy as np
-import time
+import time, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from .config import (
-    DATASET_DIR, MODELS_DIR, MIN_FACE_SIZE, CAMERA_INDEX,
+    DATASET_DIR, MODELS_DIR, MIN_FACE_SIZE, CAMERA_INDEX, CAMERA_SOURCE,
     FRAME_WIDTH, FRAME_HEIGHT, LBPH_RADIUS, LBPH_NEIGHBORS,
-    LBPH_GRID_X, LBPH_GRID_Y, THRESHOLD
+    LBPH_GRID_X, LBPH_GRID_Y, THRESHOLD, KIOSK_EVENT_INTERVAL,
+    KIOSK_PIPELINE, PIPELINE_DETECT_WORKERS, PIPELINE_QUEUE_SIZE,
+    RECOGNITION_ENGINE, RECOGNITION_WORKERS, GALLERY_COMPACTION, TRAIN_INCREMENTAL,
+    TRAIN_IMAGE_CACHE, TRAIN_CACHE_DIR, TRAIN_WORKERS
+)
+from .utils import log_attendance, load_rollups
+from .presence import presence_cache
+from .directory import user_directory, invalidate_directory, clean_name, folder_name
+from .tracking import FaceTracker
+from .lbph import LBPHEngine
+from .gallery import compact_training_set, save_prototypes, load_two_stage
+from .image_cache import ImageCache, normalize_face
+from .resources import resources, invalidate_resources
+from .sources import open_source
+from .metrics import log, metrics, profiled
+from .model_store import (
+    MODEL_PATH, MANIFEST_PATH, lbph_params, scan_dataset, changed_labels,
+    load_manifest, save_manifest, write_model, read_lbph_model, is_binary_model, load_binary_model
 )
-from .utils import get_cascade, users_df, log_attendance
 
 # ---------- helpers ----------
 
-def clean_name(s):
-    """Normalize a name string and decide if it's usable."""
-    try:
-        s = str(s).strip()
-    except Exception:
-        return "", False
-    if not s:
-        return "", False
-    if s.isnumeric():   # '0', '123' shouldn't be used as a name
-        return "", False
-    return s, True
-
 def fallback_name_from_dataset(label: int):
-    """Find the first dataset folder starting with '<label>_' and extract the name part."""
-    try:
-        for d in DATASET_DIR.glob(f"{label}_*"):
-            if d.is_dir():
-                raw = d.name.split("_", 1)[1] if "_" in d.name else d.name
-                # turn underscores into spaces: Alex_Raji -> Alex Raji
-                name = raw.replace("_", " ").strip()
-                name, ok = clean_name(name)
-                if ok:
-                    return name
-    except Exception:
-        pass
+    """Name part of the first dataset folder '<label>_*' (from the user directory index), or ""."""
+    for folder in user_directory().folders(label):
+        name = folder_name(folder.name)
+        if name:
+            return name
     return ""  # no fallback
 
 def resolve_name(label: int, id_to_name: dict):
     """
     Resolve a human-readable name for 'label':
     1) from users.csv mapping (id_to_name),
-    2) fallback to dataset folder name,
+    2) fallback to dataset folder name (indexed by the user directory),
     3) return "" if neither works.
     """
     name_csv = id_to_name.get(label, "")
@@ -62,18 +61,22 @@ def write_trained_labels_file(label_set):
         with open(out, "w", encoding="utf-8") as f:
             f.write("Trained IDs (from users.csv): " + ", ".join(str(x) for x in sorted(label_set)) + "\n")
     except Exception as e:
-        print(f"[WARN] Could not write trained_labels.txt: {e}")
+        log.warn("Could not write trained_labels.txt: %s", e)
 
 # ---------- enrollment capture ----------
 
-def capture_samples(person_id: int, name: str, num_samples: int = 60):
+def capture_samples(person_id: int, name: str, num_samples: int = 60, cancel=None, progress=None):
+    """
+    Save up to `num_samples` 200x200 face crops for a user. `cancel` (a
+    threading.Event) stops the capture early; `progress(count, num_samples)`
+    is called after every saved face.
+    """
     person_dir = DATASET_DIR / f"{person_id}_{name.strip().replace(' ', '_')}"
     person_dir.mkdir(parents=True, exist_ok=True)
+    invalidate_directory()
 
-    face_cascade = get_cascade()
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+    tracker = FaceTracker(resources().cascade())
+    cap = open_camera()
 
     count = 0
     while True:
@@ -81,11 +84,9 @@ def capture_samples(person_id: int, name: str, num_samples: int = 60):
         if not ret:
             break
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(
-            gray, scaleFactor=1.2, minNeighbors=5, minSize=MIN_FACE_SIZE
-        )
 
-        for (x, y, w, h) in faces:
+        for tr in tracker.update(gray):
+            x, y, w, h = tr.box
             face = gray[y:y+h, x:x+w]
             face = cv2.resize(face, (200, 200))
             count += 1
@@ -93,11 +94,13 @@ def capture_samples(person_id: int, name: str, num_samples: int = 60):
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
             cv2.putText(frame, f"{count}/{num_samples}", (10, 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+            if progress is not None:
+                progress(count, num_samples)
 
         cv2.imshow("Capturing - Press q to stop", frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
-        if count >= num_samples:
+        if count >= num_samples or (cancel is not None and cancel.is_set()):
             break
 
     cap.release()
@@ -106,137 +109,560 @@ def capture_samples(person_id: int, name: str, num_samples: int = 60):
 
 # ---------- training ----------
 
-def train_model():
+def _decode_folder(folder: str, info: dict, dataset_dir: Path):
+    images = []
+    for name in info["files"]:
+        img = cv2.imread(str(dataset_dir / folder / name), cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            images.append(normalize_face(img))
+    return images
+
+def _extract_shard(folder: str, info: dict, cache, dataset_dir: Path):
+    """Decode one user folder and compute its LBPH histograms (OpenCV releases the GIL)."""
+    label = int(info["id"])
+    if cache is not None:
+        images = [np.asarray(img) for img in cache.folder(folder, info["files"])]
+    else:
+        images = _decode_folder(folder, info, dataset_dir)
+    if not images:
+        return [], []
+    labels = [label] * len(images)
+    if GALLERY_COMPACTION == "prototypes":
+        images, labels = compact_training_set(images, labels)
+    recognizer = cv2.face.LBPHFaceRecognizer_create(
+        radius=LBPH_RADIUS, neighbors=LBPH_NEIGHBORS,
+        grid_x=LBPH_GRID_X, grid_y=LBPH_GRID_Y
+    )
+    recognizer.train(images, np.array(labels, dtype=np.int32))
+    return list(recognizer.getHistograms()), labels
+
+def extract_training_set(folders: dict, labels=None, workers: int = TRAIN_WORKERS,
+                         use_cache: bool = TRAIN_IMAGE_CACHE, dataset_dir: Path = DATASET_DIR,
+                         cache_dir: Path = TRAIN_CACHE_DIR):
+    """
+    LBPH histograms and labels for scan_dataset() `folders` (optionally only
+    those of `labels`). Folders are decoded and featurized in parallel, one
+    task per user, and merged back in folder order so the model is the same
+    for any worker count.
+    """
+    selected = [(f, info) for f, info in folders.items()
+                if labels is None or int(info["id"]) in labels]
+    cache = ImageCache(cache_dir, dataset_dir) if use_cache else None
+    if cache is not None:
+        cache.prune(folders)
+
+    def task(item):
+        return _extract_shard(item[0], item[1], cache, Path(dataset_dir))
+
+    if workers > 1 and len(selected) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="train") as ex:
+            results = list(ex.map(task, selected))
+    else:
+        results = [task(item) for item in selected]
+
+    hists, out_labels = [], []
+    for h, lbls in results:
+        hists.extend(h)
+        out_labels.extend(lbls)
+    if cache is not None:
+        log.info("Image cache: %d reused, %d decoded", cache.reused, cache.decoded)
+    return hists, out_labels
+
+def _finish_training(hists, labels, folders, manifest):
+    """Save model, manifest, trained_labels.txt and (two-stage) prototypes."""
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    invalidate_resources()
+    write_model(MODEL_PATH, hists, labels)
+    log.info("Model saved to %s", MODEL_PATH)
+    write_trained_labels_file(set(int(x) for x in labels))
+    manifest = save_manifest(folders, len(labels), labels, previous=manifest)
+    log.info("Model version %s: %d samples, IDs %s", manifest["version"], len(labels), manifest["labels"])
+    if GALLERY_COMPACTION == "two_stage":
+        engine = LBPHEngine()
+        engine.add_histograms(np.concatenate([np.asarray(h, np.float32).reshape(1, -1) for h in hists]), labels)
+        n = save_prototypes(MODELS_DIR / "prototypes.npz", engine)
+        log.info("Saved %d prototypes for two-stage search", n)
+    invalidate_resources()
+    return len(labels)
+
+def _train_incremental(valid_ids):
+    """
+    Bring the saved model in line with the dataset by touching only the users
+    whose folders changed since the manifest was written. Returns None when a
+    full retrain is needed (no model/manifest, or LBPH parameters changed).
+    """
+    manifest = load_manifest()
+    if manifest is None or not MODEL_PATH.exists() or manifest.get("params") != lbph_params():
+        return None
+    folders = scan_dataset(valid_ids)
+    dirty = changed_labels(manifest.get("folders", {}), folders)
+    if not dirty:
+        log.info("Model is up to date with the dataset")
+        return True, int(manifest.get("samples", 0))
+
+    hists, labels = read_lbph_model()
+    stale = dirty & set(labels.tolist())
+    if stale:
+        log.info("Removing templates for IDs: %s", sorted(stale))
+    keep = [i for i, lbl in enumerate(labels.tolist()) if lbl not in dirty]
+    new_hists, new_labels = extract_training_set(folders, dirty)
+    if new_hists:
+        log.info("Adding IDs: %s  (images: %d)", sorted(set(new_labels)), len(new_hists))
+    hists = [hists[i] for i in keep] + new_hists
+    labels = [int(labels[i]) for i in keep] + new_labels
+    if not hists:
+        log.error("No training images left after the update.")
+        return False, 0
+    return True, _finish_training(hists, labels, folders, manifest)
+
+def train_model(incremental: bool = TRAIN_INCREMENTAL):
     """
     Train LBPH recognizer from DATASET_DIR, but only for IDs present in users.csv.
+    With `incremental`, only users added, changed or removed since the last
+    training (per models/manifest.json) are updated in the existing model.
     Writes the trained ID set to models/trained_labels.txt.
     """
-    udf = users_df()
-    valid_ids = set(int(v) for v in udf["id"].dropna().tolist())
+    valid_ids = set(user_directory().ids())
     if not valid_ids:
-        print("[ERROR] users.csv has no IDs. Add a user first.")
+        log.error("users.csv has no IDs. Add a user first.")
         return False, 0
 
-    images, labels = [], []
-    used_labels = set()
+    if incremental:
+        result = _train_incremental(valid_ids)
+        if result is not None:
+            return result
 
-    for person_dir in DATASET_DIR.iterdir():
-        if not person_dir.is_dir():
-            continue
-        # Expect folder like "180_Alex_Raji"
-        try:
-            label = int(str(person_dir.name).split("_", 1)[0])
-        except Exception:
-            print(f"[WARN] Skipping folder (cannot parse ID): {person_dir.name}")
-            continue
-
-        if label not in valid_ids:
-            print(f"[WARN] Skipping folder not in users.csv: {person_dir.name}")
-            continue
-
-        for img_path in person_dir.glob("*.png"):
-            img = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
-            if img is None:
-                continue
-            images.append(img)
-            labels.append(label)
-            used_labels.add(label)
+    folders = scan_dataset(valid_ids)
+    hists, labels = extract_training_set(folders)
 
-    if not images:
-        print("[ERROR] No training images found after filtering to users.csv IDs.")
+    if not hists:
+        log.error("No training images found after filtering to users.csv IDs.")
         return False, 0
 
-    print(f"[INFO] Training on IDs: {sorted(used_labels)}  (total images: {len(images)})")
-    write_trained_labels_file(used_labels)
+    log.info("Trained on IDs: %s  (total samples: %d)", sorted(set(labels)), len(hists))
+    return True, _finish_training(hists, labels, folders, load_manifest())
 
-    recognizer = cv2.face.LBPHFaceRecognizer_create(
-        radius=LBPH_RADIUS, neighbors=LBPH_NEIGHBORS,
-        grid_x=LBPH_GRID_X, grid_y=LBPH_GRID_Y
-    )
-    recognizer.train(images, np.array(labels, dtype=np.int32))
-    MODELS_DIR.mkdir(parents=True, exist_ok=True)
-    model_path = MODELS_DIR / "lbph_model.yml"
-    recognizer.save(str(model_path))
-    print(f"[INFO] Model saved to {model_path}")
-    return True, len(images)
+def forget_user(pid: int):
+    """
+    Remove one user's templates from the saved model without retraining anyone
+    else (used after deleting a user). Returns the number of samples left.
+    """
+    if not MODEL_PATH.exists():
+        return 0
+    hists, labels = read_lbph_model()
+    if int(pid) not in set(labels.tolist()):
+        return len(labels)
+    keep = [i for i, lbl in enumerate(labels.tolist()) if lbl != int(pid)]
+    manifest = load_manifest()
+    folders = {k: v for k, v in (manifest or {}).get("folders", {}).items() if int(v["id"]) != int(pid)}
+    if not keep:
+        MODEL_PATH.unlink(missing_ok=True)
+        MANIFEST_PATH.unlink(missing_ok=True)
+        write_trained_labels_file(set())
+        invalidate_resources()
+        log.info("Removed ID %s; model is now empty", pid)
+        return 0
+    log.info("Removed ID %s from the model", pid)
+    return _finish_training([hists[i] for i in keep], [int(labels[i]) for i in keep], folders, manifest)
 
 # ---------- recognition ----------
 
-def take_attendance():
+def load_recognizer(path: Path = None):
+    """
+    Load the trained LBPH model, or return None if it has not been trained yet.
+    With RECOGNITION_ENGINE = "numpy" the histograms are moved into an
+    LBPHEngine (same results, multi-threaded prediction); a
+    binary model (.bin) is always memory-mapped into an LBPHEngine.
+    Sessions use the shared copy from resources() instead of calling this.
+    """
+    path = Path(path or MODEL_PATH)
+    if not path.exists():
+        return None
+    if is_binary_model(path):
+        engine = load_binary_model(path)
+    else:
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(str(path))
+        if RECOGNITION_ENGINE != "numpy":
+            return recognizer
+        engine = LBPHEngine.from_recognizer(recognizer)
+    engine.workers = RECOGNITION_WORKERS
+    if GALLERY_COMPACTION == "two_stage":
+        index = load_two_stage(path.parent / "prototypes.npz", engine)
+        if index is not None:
+            return index
+        log.warn("prototypes.npz missing or stale; using full gallery search")
+    return engine
+
+def load_id_to_name():
+    """id -> raw name map from users.csv (via the shared user directory index)."""
+    return user_directory().id_to_name()
+
+def warm_up():
+    """
+    Pay the one-time costs of a camera session ahead of time: the cascade,
+    parsing the shared model (resources.py), the user index, today's
+    presence cache and the attendance rollups (which log_attendance only
+    feeds once they are loaded). Returns the seconds spent per step.
+    """
+    timings = {}
+    shared = resources()
+    for step, fn in (("cascade", shared.cascade), ("model", shared.recognizer),
+                     ("users", shared.id_to_name), ("presence", presence_cache),
+                     ("rollups", load_rollups)):
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            log.warn("Warm-up step %s failed: %s", step, e)
+        timings[step] = time.perf_counter() - t0
+    return timings
+
+def open_camera(source=None):
+    """The webcam (CAMERA_INDEX), or CAMERA_SOURCE / `source` if set - see sources.open_source()."""
+    if source is None:
+        source = CAMERA_SOURCE if CAMERA_SOURCE is not None else CAMERA_INDEX
+    cap = open_source(source)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+    return cap
+
+def detect_faces(face_cascade, gray):
+    """Face boxes in `gray`; `face_cascade` may also be an AdaptiveDetector (detection.py)."""
+    with metrics().time("detectMultiScale"):
+        if hasattr(face_cascade, "detect"):
+            return face_cascade.detect(gray)
+        return face_cascade.detectMultiScale(
+            gray, scaleFactor=1.2, minNeighbors=5, minSize=MIN_FACE_SIZE
+        )
+
+def predict_faces(recognizer, faces):
+    """(label, confidence) for each 200x200 face; one batched call when the engine supports it."""
+    if not len(faces):
+        return []
+    with metrics().time("predict"):
+        if hasattr(recognizer, "predict_batch"):
+            labels, confs = recognizer.predict_batch(np.stack(faces))
+            return list(zip(labels.tolist(), confs.tolist()))
+        return [recognizer.predict(f) for f in faces]
+
+def recognize_face(recognizer, face, id_to_name: dict, presence):
+    """
+    Predict one 200x200 grayscale face and log attendance if it is a known user.
+    Returns (result, tag, colour) where result is
+    ("known"/"already"/"unknown", name, confidence, id).
+    """
+    with metrics().time("predict"):
+        label, confidence = recognizer.predict(face)
+    return classify_prediction(label, confidence, id_to_name, presence)
+
+def classify_prediction(label: int, confidence: float, id_to_name: dict, presence, write=log_attendance):
+    """
+    Turn a raw (label, confidence) into the recognize_face() result, logging
+    attendance through `write(id, name)` (e.g. server.AttendanceWriter.submit).
+    """
+    log.debug("predicted label=%s, confidence=%.1f, threshold=%s", label, confidence, THRESHOLD)
+    m = metrics()
+    m.histogram("confidence").observe(confidence)
+
+    # Try to resolve a usable name (csv -> dataset fallback)
+    resolved_name, source = resolve_name(label, id_to_name)
+
+    if confidence <= THRESHOLD and resolved_name:
+        tag = f"{resolved_name} ({confidence:.1f})"
+        clr = (0, 255, 0)
+        if presence.check_and_mark(label):
+            with m.time("log_attendance"):
+                write(label, resolved_name)
+            m.inc("faces_known")
+            m.event(result="known", id=int(label), confidence=round(float(confidence), 1))
+            log.info("Recognized ID %s as '%s' via %s", label, resolved_name, source)
+            return ("known", resolved_name, confidence, label), tag, clr
+        m.inc("faces_already")
+        log.debug("ID %s already logged recently; skipping", label)
+        return ("already", resolved_name, confidence, label), tag, clr
+
+    reason = []
+    if confidence > THRESHOLD:
+        reason.append("confidence too high")
+        m.inc("faces_rejected")
+    if not resolved_name:
+        # show what we found in csv (if anything) to aid debugging
+        raw = id_to_name.get(label, "")
+        reason.append(f"name missing/invalid (csv='{raw}')")
+    rtxt = "; ".join(reason) if reason else "no match"
+    tag = f"Unknown (id:{label}, {confidence:.1f})"
+    clr = (0, 0, 255)
+    m.inc("faces_unknown")
+    m.event(result="unknown", id=int(label), confidence=round(float(confidence), 1), reason=rtxt)
+    log.debug("Treating as Unknown: %s", rtxt)
+    return ("unknown", None, None, None), tag, clr
+
+def recognize_track(track, gray, recognizer, id_to_name: dict, presence):
+    """
+    Run recognize_face() for a tracked face only if the track is new or not yet
+    confidently matched; otherwise keep its cached result.
+    Returns the new result, or None when the cached one was reused.
+    """
+    if not track.needs_prediction():
+        return None
+    x, y, w, h = track.box
+    with metrics().time("resize"):
+        face = cv2.resize(gray[y:y+h, x:x+w], (200, 200))
+    result, tag, clr = recognize_face(recognizer, face, id_to_name, presence)
+    track.remember(result, tag, clr)
+    return result
+
+def draw_face(frame, box, tag, clr):
+    x, y, w, h = box
+    cv2.rectangle(frame, (x, y), (x+w, y+h), clr, 2)
+    cv2.putText(frame, tag, (x, y-10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, clr, 2)
+
+def take_attendance(cancel=None):
     """
     Run recognition. Shows predicted label+confidence even when treated as Unknown.
     Holds ~2s after detection so you can read the overlay.
+    A person already logged within the cooldown window (see presence.py) is
+    reported as "already" and no new row is written.
+    Setting `cancel` (a threading.Event) closes the camera and returns None.
     """
-    model_path = MODELS_DIR / "lbph_model.yml"
-    if not model_path.exists():
+    shared = resources()
+    recognizer = shared.recognizer()
+    if recognizer is None:
         return "no_model"
 
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.read(str(model_path))
+    tracker = FaceTracker(shared.cascade())
+    presence = presence_cache()
+    id_to_name = load_id_to_name()
+    log.info("Known user IDs from users.csv: %s", sorted(id_to_name.keys()))
 
-    face_cascade = get_cascade()
-    udf = users_df()
-    # Build id -> raw name map from users.csv
-    id_to_name = {int(r.id): r.name for _, r in udf.iterrows()}
-    print(f"[INFO] Known user IDs from users.csv: {sorted(id_to_name.keys())}")
+    cap = open_camera()
 
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
-
-    detected = None  # ("known"/"unknown", name, confidence, id)
+    detected = None  # ("known"/"already"/"unknown", name, confidence, id)
+    m = metrics()
     while True:
-        ret, frame = cap.read()
+        with m.time("capture"):
+            ret, frame = cap.read()
         if not ret:
             break
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(
-            gray, scaleFactor=1.2, minNeighbors=5, minSize=MIN_FACE_SIZE
-        )
+        with m.time("cvtColor"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-        for (x, y, w, h) in faces:
-            face = gray[y:y+h, x:x+w]
-            face = cv2.resize(face, (200, 200))
-
-            label, confidence = recognizer.predict(face)
-            print(f"[DEBUG] predicted label={label}, confidence={confidence:.1f}, threshold={THRESHOLD}")
-
-            # Try to resolve a usable name (csv -> dataset fallback)
-            resolved_name, source = resolve_name(label, id_to_name)
-
-            if confidence <= THRESHOLD and resolved_name:
-                tag = f"{resolved_name} ({confidence:.1f})"
-                clr = (0, 255, 0)
-                log_attendance(label, resolved_name)
-                print(f"[INFO] Recognized ID {label} as '{resolved_name}' via {source}")
-                detected = ("known", resolved_name, confidence, label)
-            else:
-                reason = []
-                if confidence > THRESHOLD:
-                    reason.append("confidence too high")
-                if not resolved_name:
-                    # show what we found in csv (if anything) to aid debugging
-                    raw = id_to_name.get(label, "")
-                    reason.append(f"name missing/invalid (csv='{raw}')")
-                rtxt = "; ".join(reason) if reason else "no match"
-                tag = f"Unknown (id:{label}, {confidence:.1f})"
-                clr = (0, 0, 255)
-                print(f"[INFO] Treating as Unknown: {rtxt}")
-                detected = ("unknown", None, None, None)
-
-            cv2.rectangle(frame, (x, y), (x+w, y+h), clr, 2)
-            cv2.putText(frame, tag, (x, y-10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, clr, 2)
+        for tr in tracker.update(gray):
+            recognize_track(tr, gray, recognizer, id_to_name, presence)
+            detected = tr.result
+            draw_face(frame, tr.box, tr.tag, tr.clr)
 
         cv2.imshow("Take Attendance - Press q to finish", frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
+        if cancel is not None and cancel.is_set():
+            detected = None
+            break
 
         if detected is not None:
-            time.sleep(2.0)
+            if cancel is not None:
+                cancel.wait(2.0)
+            else:
+                time.sleep(2.0)
             break
 
     cap.release()
     cv2.destroyAllWindows()
     return detected
+
+# ---------- kiosk mode ----------
+
+class RecognitionSession:
+    """
+    Long-running recognition loop for a door kiosk.
+
+    Camera, LBPH model and Haar cascade are opened once and kept open; every
+    face in every frame is recognized and reported through `on_result`
+    (called from the session thread) and/or the `results` queue, so the
+    caller never waits on camera setup between people.
+
+    Events are (state, name, confidence, id) tuples like take_attendance().
+    "known" is reported every time a row is logged; "already" and "unknown"
+    are rate-limited to one event per ID every KIOSK_EVENT_INTERVAL seconds.
+
+    With `pipelined=True` capture, detection and recognition run on separate
+    threads (see pipeline.py) and pipeline_stats() reports per-stage queue
+    depths and timings. `source` replaces the webcam (see open_camera()).
+    `write(id, name)` logs attendance rows (log_attendance by default).
+    """
+
+    def __init__(self, on_result=None, results=None, show_window: bool = True,
+                 source=None, pipelined: bool = KIOSK_PIPELINE, write=log_attendance):
+        self.on_result = on_result
+        self.results = results
+        self.show_window = show_window
+        self.source = source
+        self.pipelined = pipelined
+        self.write = write
+        self.pipeline = None
+        self.tracker = None
+
+        self.frames = 0
+        self.started_at = None
+        self._people = deque()     # timestamps of recognized people (last 60 s)
+        self._last_event = {}      # (state, id) -> monotonic time of last event
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.error = None
+
+    # ----- lifecycle -----
+
+    def start(self):
+        """Run the session on a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_thread, name="kiosk-session", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run_thread(self):
+        try:
+            self.run()
+        except Exception as e:   # surfaced to the UI through self.error
+            self.error = str(e) or type(e).__name__
+            log.error("Kiosk session failed: %s", e)
+
+    def stop(self, wait: bool = True):
+        """Ask the loop to finish; camera and windows are released by the session thread."""
+        self._stop.set()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self):
+        """Blocking loop; returns "no_model", "camera_error" or "stopped"."""
+        shared = resources()
+        recognizer = shared.recognizer()
+        if recognizer is None:
+            self.error = "no_model"
+            return self.error
+        face_cascade = shared.cascade()
+        presence = presence_cache()
+        id_to_name = load_id_to_name()
+
+        cap = open_camera(self.source)
+        m = metrics()
+        try:
+            if not cap.isOpened():
+                self.error = "camera_error"
+                return self.error
+            self.started_at = time.monotonic()
+            with profiled("kiosk"):
+                if self.pipelined:
+                    self._run_pipelined(cap, recognizer, face_cascade, id_to_name, presence)
+                else:
+                    while not self._stop.is_set():
+                        with m.time("capture"):
+                            ret, frame = cap.read()
+                        if not ret:
+                            break
+                        self.process_frame(frame, recognizer, face_cascade, id_to_name, presence)
+                        if not self._show(frame):
+                            break
+        finally:
+            cap.release()
+            if self.show_window:
+                cv2.destroyAllWindows()
+            self._stop.set()
+        return "stopped"
+
+    def _run_pipelined(self, cap, recognizer, face_cascade, id_to_name, presence):
+        from .pipeline import RecognitionPipeline
+        self.pipeline = RecognitionPipeline(
+            cap, recognizer, face_cascade, id_to_name, presence,
+            detect_workers=PIPELINE_DETECT_WORKERS, queue_size=PIPELINE_QUEUE_SIZE,
+            on_result=self._emit, on_frame=self._frame_done, write=self.write,
+        ).start()
+        try:
+            while not self._stop.is_set() and self.pipeline.running:
+                frame = self.pipeline.latest_frame(timeout=0.1)
+                if frame is not None and not self._show(frame):
+                    break
+        finally:
+            self.pipeline.stop()
+
+    def _show(self, frame):
+        """Display `frame` if a window is wanted; False when the user pressed q."""
+        if not self.show_window:
+            return True
+        cv2.imshow("Kiosk Mode - Press q to stop", frame)
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    def pipeline_stats(self):
+        return self.pipeline.snapshot() if self.pipeline is not None else {}
+
+    # ----- per frame -----
+
+    def process_frame(self, frame, recognizer, face_cascade, id_to_name, presence):
+        """Recognize every tracked face in `frame`, draw overlays and emit events."""
+        if self.tracker is None or self.tracker.face_cascade is not face_cascade:
+            self.tracker = FaceTracker(face_cascade)
+        m = metrics()
+        with m.time("cvtColor"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        tracks = self.tracker.update(gray)
+        pending = [tr for tr in tracks if tr.needs_prediction()]
+        with m.time("resize"):
+            faces = [cv2.resize(gray[y:y+h, x:x+w], (200, 200)) for (x, y, w, h) in (tr.box for tr in pending)]
+        for tr, (label, confidence) in zip(pending, predict_faces(recognizer, faces)):
+            result, tag, clr = classify_prediction(label, confidence, id_to_name, presence, self.write)
+            tr.remember(result, tag, clr)
+            self._emit(result)
+        for tr in tracks:
+            draw_face(frame, tr.box, tr.tag, tr.clr)
+        self._frame_done(frame)
+
+    def _frame_done(self, frame):
+        self.frames += 1
+        if self.show_window:
+            cv2.putText(frame, f"{self.people_per_minute():.1f} people/min", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+
+    def _emit(self, result):
+        state, _, _, pid = result
+        now = time.monotonic()
+        if state != "known":
+            key = (state, pid)
+            if now - self._last_event.get(key, -1e9) < KIOSK_EVENT_INTERVAL:
+                return
+            self._last_event[key] = now
+        if state == "known":   # "already" repeats for anyone still in view
+            with self._lock:
+                self._people.append(now)
+        if self.on_result is not None:
+            try:
+                self.on_result(result)
+            except Exception as e:
+                log.warn("Kiosk result callback failed: %s", e)
+        if self.results is not None:
+            self.results.put(result)
+
+    # ----- throughput -----
+
+    def people_per_minute(self):
+        """People recognized over the last 60 s (or since start, if shorter), per minute."""
+        now = time.monotonic()
+        with self._lock:
+            while self._people and now - self._people[0] > 60.0:
+                self._people.popleft()
+            recent = len(self._people)
+        if self.started_at is None:
+            return 0.0
+        window = min(60.0, max(now - self.started_at, 1.0))
+        return recent * 60.0 / window
+
+    def fps(self):
+        if self.started_at is None:
+            return 0.0
+        return self.frames / max(time.monotonic() - self.started_at, 1e-6)
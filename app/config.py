@@ -5,9 +5,11 @@ DATASET_DIR = BASE_DIR / "dataset"
 MODELS_DIR = BASE_DIR / "models"
 USERS_CSV = BASE_DIR / "users.csv"
 ATTENDANCE_CSV = BASE_DIR / "attendance.csv"
+ROLLUPS_DIR = BASE_DIR / "attendance_rollups"
 
 # Camera / detection
 CAMERA_INDEX = 0
+CAMERA_SOURCE = None   # instead of the webcam: "synthetic", a video file or an image folder (sources.py)
 FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
 MIN_FACE_SIZE = (60, 60)
@@ -18,3 +20,108 @@ LBPH_NEIGHBORS = 8
 LBPH_GRID_X = 8
 LBPH_GRID_Y = 8
 THRESHOLD = 90.0   # LBPH confidence: lower is better
+
+# Attendance journal (append-only attendance.csv writer)
+JOURNAL_FSYNC_POLICY = "batch"   # "always" | "batch" | "never"
+JOURNAL_FSYNC_EVERY = 32         # rows between fsyncs in "batch" mode
+JOURNAL_FSYNC_INTERVAL = 2.0     # max seconds between fsyncs in "batch" mode
+JOURNAL_COMPACT_INTERVAL = 60.0  # seconds between background compaction checks (0 disables)
+
+# Attendance de-duplication (see app/presence.py)
+ATTENDANCE_ONCE_PER_DAY = False   # True: log each person at most once per day
+ATTENDANCE_COOLDOWN_SEC = 300.0   # otherwise: min seconds between rows for the same person
+
+# Attendance rollups (see app/rollups.py)
+ROLLUPS_SAVE_INTERVAL = 30.0      # seconds between background saves of the changed days
+
+# Kiosk mode (continuous recognition session)
+KIOSK_EVENT_INTERVAL = 3.0   # seconds between repeated "already"/"unknown" events per ID
+KIOSK_PIPELINE = True        # run capture / detection / recognition on separate threads
+PIPELINE_DETECT_WORKERS = 2  # detection threads (cores - 2 is a good start)
+PIPELINE_QUEUE_SIZE = 4      # frames buffered between stages before stale ones are dropped
+
+# Recognition server (server.py): several cameras / entrances from one process
+SERVER_SOURCES = [0]         # camera indexes, video files, image folders or "synthetic" (see sources.py)
+SERVER_DETECT_WORKERS = 4    # threads detecting and recognizing frames, shared fairly by all sources
+SERVER_SOURCE_FPS = 30.0     # pace of video files / folders / synthetic sources (None: as fast as read)
+SERVER_LOOP = True           # restart video files / folders when they end
+SERVER_WRITE_BATCH = 64      # max attendance rows per storage write
+SERVER_WRITE_INTERVAL = 0.5  # max seconds a recognized row waits for others before it is written
+SERVER_STATS_INTERVAL = 30.0 # seconds between per-source stats lines in the log (0 disables)
+
+# Face tracking between frames (see app/tracking.py)
+TRACK_DETECT_EVERY = 5      # full-frame detection every N frames (or when a track is lost)
+TRACK_ROI_MARGIN = 0.3      # search window around a track, as a fraction of its size
+TRACK_MAX_MISSES = 2        # frames a track may go unseen before it is dropped
+TRACK_IOU_MATCH = 0.3       # min overlap to match a detection to an existing track
+TRACK_CONFIDENT = 70.0      # tracks with LBPH confidence above this are predicted again
+
+# Adaptive face detection (see app/detection.py); recognition crops still come from the full frame
+DETECT_ADAPTIVE = False     # True: detect on a downscaled frame, inside a region of interest, auto-tuned
+DETECT_SCALE = 0.5          # starting downscale of the frame the cascade sees
+DETECT_ROI = None           # fixed search region (x, y, w, h) as fractions of the frame, e.g. (0.2, 0.0, 0.6, 1.0)
+DETECT_LEARN_ROI = True     # without DETECT_ROI: narrow the search to where (and how big) faces have been seen
+DETECT_LEARN_MIN = 10       # faces seen before the learned region / size band is used
+DETECT_ROI_MARGIN = 0.25    # learned region grown by this fraction of its size on each side
+DETECT_FULL_EVERY = 10      # every Nth detection searches the whole frame at any size (new faces elsewhere)
+DETECT_BUDGET_MS = 8.0      # target detection time per frame for the auto-tuner (None: keep DETECT_SCALE)
+
+# Recognition engine: "opencv" (cv2.face LBPH) or "numpy" (app/lbph.py, same results,
+# templates split over RECOGNITION_WORKERS threads). On one core the numpy engine is
+# ~1.1-1.5x slower per face than OpenCV (benchmarks/check_lbph_parity.py); it only pays
+# off with several cores, or for binary models (MODEL_FORMAT), which it always serves.
+RECOGNITION_ENGINE = "opencv"
+RECOGNITION_WORKERS = 4
+
+# Gallery compaction at training time (see app/gallery.py)
+#   "off"        - train on every captured sample
+#   "prototypes" - keep at most GALLERY_PROTOTYPES_PER_USER representative samples per user
+#   "two_stage"  - keep every sample, save prototype clusters; the numpy engine then searches
+#                  prototypes first and refines inside the GALLERY_SHORTLIST closest clusters
+GALLERY_COMPACTION = "off"
+GALLERY_PROTOTYPES_PER_USER = 10
+GALLERY_SHORTLIST = 16
+
+# Model file (model_store.py): "yaml" writes OpenCV's models/lbph_model.yml; "binary" writes
+# models/lbph_model.bin (exact uint16 bin counts, memory-mapped on load, always served by the
+# numpy engine; convert with python -m app.model_store <src> <dst>)
+MODEL_FORMAT = "yaml"
+
+# Training
+TRAIN_INCREMENTAL = True   # update only users whose dataset folders changed (models/manifest.json)
+TRAIN_IMAGE_CACHE = True   # keep decoded faces packed per user in TRAIN_CACHE_DIR
+TRAIN_CACHE_DIR = MODELS_DIR / "cache"
+TRAIN_WORKERS = 4          # threads decoding / featurizing user folders in parallel
+
+# User directory index (directory.py)
+DIRECTORY_CHECK_INTERVAL = 2.0   # seconds between users.csv / dataset mtime checks
+
+# Shared recognizer / cascade (resources.py)
+RESOURCE_CHECK_INTERVAL = 1.0    # seconds between lbph_model.yml mtime checks
+
+# Storage backend (storage.py): "csv" keeps users.csv / attendance.csv,
+# "sqlite" uses STORAGE_DB (imported from the CSVs when first created)
+STORAGE_BACKEND = "csv"
+STORAGE_DB = BASE_DIR / "attendance.db"
+
+# Tables in the UI (table_view.py)
+TABLE_PAGE_SIZE = 200      # rows held in a Treeview at a time
+
+# Exports (exporter.py)
+EXPORT_CHUNK_ROWS = 20000     # attendance rows read from storage at a time
+EXCEL_MAX_ROWS = 1048576      # rows per sheet (Excel's limit); beyond it, one sheet per month
+PDF_TABLE_ROWS = 30           # rows per PDF table chunk (about one landscape A4 page)
+
+# Background work in the UI (tasks.py / speech.py)
+TASK_WORKERS = 4       # threads running camera sessions, training and exports
+TASK_POLL_MS = 16      # how often Tk picks up task results (~60 fps)
+SPEECH_RATE = 175      # text-to-speech words per minute
+SPEECH_MAX_PENDING = 3 # queued prompts beyond this drop the oldest
+
+# Logging / metrics (metrics.py)
+LOG_LEVEL = "INFO"             # "DEBUG" | "INFO" | "WARN" | "ERROR"
+METRICS_WINDOW = 1024          # recent durations kept per stage timer for percentiles
+METRICS_EVENTS = 256           # recent recognition events kept in memory
+METRICS_CONFIDENCE_BUCKETS = (20, 30, 40, 50, 60, 70, 80, 90, 100, 120, 150)   # LBPH confidence histogram bounds
+METRICS_PORT = None            # e.g. 9464: serve /metrics and /metrics.json on 127.0.0.1
+METRICS_PROFILE_DIR = None     # e.g. BASE_DIR / "profiles": cProfile each camera session there
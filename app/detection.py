@@ -0,0 +1,157 @@
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from .config import (
+    MIN_FACE_SIZE, DETECT_SCALE, DETECT_ROI, DETECT_LEARN_ROI, DETECT_LEARN_MIN,
+    DETECT_ROI_MARGIN, DETECT_FULL_EVERY, DETECT_BUDGET_MS
+)
+
+# Detection settings the auto-tuner steps through, most thorough first:
+# (downscale, scaleFactor, minNeighbors)
+LADDER = (
+    (1.0, 1.1, 5),
+    (1.0, 1.2, 5),
+    (0.75, 1.2, 5),
+    (0.5, 1.2, 5),
+    (0.5, 1.3, 4),
+    (0.4, 1.3, 4),
+    (0.33, 1.35, 3),
+)
+CASCADE_WINDOW = 24   # Haar frontal-face window: faces smaller than this in the searched image are not found
+TUNE_EVERY = 10       # detections between auto-tuner decisions
+
+
+class AdaptiveDetector:
+    """
+    detectMultiScale on a smaller image than the camera frame.
+
+    Each call searches a region of interest - DETECT_ROI if configured,
+    otherwise the area where the last faces were seen (grown by `margin`) -
+    downscaled by the current LADDER level, with minSize / maxSize set from
+    the sizes of those faces. Boxes are mapped back to full-frame pixels,
+    so callers still crop faces for recognition from the full-resolution
+    frame. Every `full_every`th call searches the whole frame at any size,
+    which finds people outside the learned region and keeps it current.
+
+    With a `budget_ms`, the detector measures its own cost and moves one
+    LADDER level cheaper when it runs over budget, or back when it needs
+    less than half of it; it never downscales so far that the smallest
+    wanted face falls below the cascade's 24 px window.
+
+    Keeps per-instance state and wraps one cascade, so use one per thread.
+    """
+
+    def __init__(self, face_cascade, scale: float = DETECT_SCALE, roi=DETECT_ROI,
+                 learn_roi: bool = DETECT_LEARN_ROI, budget_ms: float = DETECT_BUDGET_MS,
+                 min_size=MIN_FACE_SIZE, full_every: int = DETECT_FULL_EVERY,
+                 learn_min: int = DETECT_LEARN_MIN, margin: float = DETECT_ROI_MARGIN):
+        self.face_cascade = face_cascade
+        self.level = next((i for i, row in enumerate(LADDER) if row[0] <= scale), len(LADDER) - 1)
+        self.roi = roi
+        self.learn_roi = learn_roi
+        self.budget_ms = budget_ms
+        self.min_side = min(min_size)
+        self.full_every = int(full_every or 0)
+        self.learn_min = max(1, int(learn_min))
+        self.margin = float(margin)
+
+        self.recent = deque(maxlen=64)   # full-frame boxes of recently seen faces
+        self.detections = 0
+        self.full_searches = 0
+        self.cost_ms = None              # moving average of the targeted (non-full) searches
+        self._since_tune = 0
+
+    # ----- search area -----
+
+    def _learned(self):
+        return self.learn_roi and len(self.recent) >= self.learn_min
+
+    def region(self, shape):
+        """(x0, y0, x1, y1) in full-frame pixels to search in a frame of `shape`."""
+        H, W = shape[:2]
+        if self.roi is not None:
+            fx, fy, fw, fh = self.roi
+            x0, y0, x1, y1 = fx * W, fy * H, (fx + fw) * W, (fy + fh) * H
+        elif self._learned():
+            x0 = min(b[0] for b in self.recent)
+            y0 = min(b[1] for b in self.recent)
+            x1 = max(b[0] + b[2] for b in self.recent)
+            y1 = max(b[1] + b[3] for b in self.recent)
+            mx, my = (x1 - x0) * self.margin, (y1 - y0) * self.margin
+            x0, y0, x1, y1 = x0 - mx, y0 - my, x1 + mx, y1 + my
+        else:
+            return 0, 0, W, H
+        return max(0, int(x0)), max(0, int(y0)), min(W, int(x1)), min(H, int(y1))
+
+    def size_band(self):
+        """(min, max) face side in full-frame pixels; max is None when unknown."""
+        if not self._learned():
+            return self.min_side, None
+        sides = [b[2] for b in self.recent]
+        return max(self.min_side, int(min(sides) * 0.7)), int(max(sides) * 1.5) + 1
+
+    def settings(self, min_side: int):
+        """LADDER row for the current level, stepped back while it would lose `min_side` faces."""
+        level = self.level
+        while level > 0 and LADDER[level][0] * min_side < CASCADE_WINDOW:
+            level -= 1
+        return LADDER[level]
+
+    # ----- detection -----
+
+    def detect(self, gray):
+        """Face boxes (N x 4 int array, x, y, w, h) in full-frame coordinates."""
+        self.detections += 1
+        full = self.full_every and self.detections % self.full_every == 0
+        if full:
+            self.full_searches += 1
+            x0, y0, x1, y1 = 0, 0, gray.shape[1], gray.shape[0]
+            lo, hi = self.min_side, None
+        else:
+            x0, y0, x1, y1 = self.region(gray.shape)
+            lo, hi = self.size_band()
+        s, scale_factor, min_neighbors = self.settings(lo)
+
+        t0 = time.perf_counter()
+        roi = gray[y0:y1, x0:x1]
+        small = roi if s == 1.0 else cv2.resize(roi, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+        side = max(CASCADE_WINDOW, int(lo * s))
+        kwargs = {"scaleFactor": scale_factor, "minNeighbors": min_neighbors, "minSize": (side, side)}
+        if hi is not None:
+            big = max(side + 1, int(hi * s))
+            kwargs["maxSize"] = (big, big)
+        found = self.face_cascade.detectMultiScale(small, **kwargs) if small.size else ()
+        ms = (time.perf_counter() - t0) * 1000.0
+
+        boxes = (np.asarray(found, np.float64).reshape(-1, 4) / s).round().astype(np.int32)
+        boxes[:, 0] += x0
+        boxes[:, 1] += y0
+        self.recent.extend(tuple(b) for b in boxes.tolist())
+        if not full:
+            self._tune(ms, lo)
+        return boxes
+
+    def _tune(self, ms: float, min_side: int):
+        if self.budget_ms is None:
+            return
+        self.cost_ms = ms if self.cost_ms is None else 0.8 * self.cost_ms + 0.2 * ms
+        self._since_tune += 1
+        if self._since_tune < TUNE_EVERY:
+            return
+        self._since_tune = 0
+        cheaper = self.level + 1
+        if (self.cost_ms > self.budget_ms and cheaper < len(LADDER)
+                and LADDER[cheaper][0] * min_side >= CASCADE_WINDOW):
+            self.level = cheaper
+            self.cost_ms = None
+        elif self.cost_ms < self.budget_ms / 2 and self.level > 0:
+            self.level -= 1
+            self.cost_ms = None
+
+    def stats(self):
+        lo, hi = self.size_band()
+        return {"level": self.level, "settings": self.settings(lo), "cost_ms": self.cost_ms,
+                "size_band": (lo, hi), "detections": self.detections, "full_searches": self.full_searches}
@@ -0,0 +1,170 @@
+import threading, time
+from pathlib import Path
+
+from .config import DATASET_DIR, DIRECTORY_CHECK_INTERVAL
+from .storage import storage
+
+
+def clean_name(s):
+    """Normalize a name string and decide if it's usable."""
+    try:
+        s = str(s).strip()
+    except Exception:
+        return "", False
+    if not s:
+        return "", False
+    if s.isnumeric():   # '0', '123' shouldn't be used as a name
+        return "", False
+    return s, True
+
+
+def folder_name(folder: str):
+    """Name part of a dataset folder: "180_Alex_Raji" -> "Alex Raji" ("" if unusable)."""
+    raw = folder.split("_", 1)[1] if "_" in folder else folder
+    name, ok = clean_name(raw.replace("_", " ").strip())
+    return name if ok else ""
+
+
+def _stamp(path: Path):
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class UserDirectory:
+    """
+    In-memory index of users: rows of the users table (storage.py) plus
+    dataset folder names, keyed by ID, so name lookups are dict hits instead
+    of CSV reads or directory globs per face.
+
+    The index is rebuilt only when the users table (its version stamp) or the
+    dataset directory itself changes (adding, removing or renaming a user
+    folder updates the directory mtime). Those checks are made at most once
+    every `check_interval` seconds; invalidate() forces a reload on the next
+    lookup.
+    """
+
+    def __init__(self, store=None, dataset_dir: Path = DATASET_DIR,
+                 check_interval: float = DIRECTORY_CHECK_INTERVAL):
+        self.store = store
+        self.dataset_dir = Path(dataset_dir)
+        self.check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._stamps = None
+        self._checked = 0.0
+        self._users = {}      # id -> {"name", "sex", "department"}
+        self._folders = {}    # id -> [folder names]
+        self._names = None    # id_to_name() mapping, built once per reload
+        self.reloads = 0
+
+    # ----- freshness -----
+
+    def invalidate(self):
+        with self._lock:
+            self._stamps = None
+
+    def _fresh(self):
+        now = time.monotonic()
+        if self._stamps is not None and now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        store = self.store or storage()
+        stamps = (store.users_version(), _stamp(self.dataset_dir))
+        if stamps != self._stamps:
+            self._load()
+            self._stamps = stamps
+
+    def _load(self):
+        users = {}
+        for pid, name, sex, dept in (self.store or storage()).user_records():
+            users[int(pid)] = {"name": name, "sex": sex, "department": dept}
+        folders = {}
+        if self.dataset_dir.exists():
+            for d in sorted(self.dataset_dir.iterdir()):
+                try:
+                    pid = int(d.name.split("_", 1)[0])
+                except ValueError:
+                    continue
+                if d.is_dir():
+                    folders.setdefault(pid, []).append(d.name)
+        self._users, self._folders = users, folders
+        self._names = None
+        self.reloads += 1
+
+    # ----- lookups -----
+
+    def resolve(self, label: int):
+        """(name, source): users table name ("csv"), else dataset folder name, else ("", "none")."""
+        with self._lock:
+            self._fresh()
+            user = self._users.get(label)
+            folders = self._folders.get(label, ())
+        if user is not None:
+            name, ok = clean_name(user["name"])
+            if ok:
+                return name, "csv"
+        for folder in folders:
+            name = folder_name(folder)
+            if name:
+                return name, "dataset"
+        return "", "none"
+
+    def name(self, label: int, default: str = ""):
+        return self.resolve(label)[0] or default
+
+    def get(self, label: int):
+        """users table record of an ID, or None."""
+        with self._lock:
+            self._fresh()
+            user = self._users.get(label)
+        return dict(user, id=label) if user is not None else None
+
+    def __contains__(self, label):
+        return self.get(label) is not None
+
+    def ids(self):
+        with self._lock:
+            self._fresh()
+            return sorted(self._users)
+
+    def id_to_name(self):
+        """
+        id -> raw users table name. The same dict is returned until the index
+        reloads (per-frame callers get it without a copy), so do not modify it.
+        """
+        with self._lock:
+            self._fresh()
+            if self._names is None:
+                self._names = {pid: u["name"] for pid, u in self._users.items()}
+            return self._names
+
+    def records(self):
+        """(id, name, sex, department) tuples in storage order."""
+        with self._lock:
+            self._fresh()
+            return [(pid, u["name"], u["sex"], u["department"]) for pid, u in self._users.items()]
+
+    def folders(self, label: int):
+        """Dataset folder paths of an ID."""
+        with self._lock:
+            self._fresh()
+            return [self.dataset_dir / f for f in self._folders.get(label, ())]
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+def user_directory() -> UserDirectory:
+    """Process-wide user index shared by the backend, the UI and the exporters."""
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            _directory = UserDirectory()
+        return _directory
+
+def invalidate_directory():
+    """Call after writing users.csv or changing dataset folders."""
+    if _directory is not None:
+        _directory.invalidate()
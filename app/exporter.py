@@ -1,74 +1,256 @@
-import pandas as pd
 from datetime import datetime
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer
 from reportlab.lib.units import cm
 
-from .utils import attendance_df
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 
-def export_attendance_to_excel(path: str) -> int:
+from .config import EXCEL_MAX_ROWS, EXPORT_CHUNK_ROWS, PDF_TABLE_ROWS
+from .storage import storage, ATTENDANCE_FIELDS
+from .directory import user_directory, clean_name
+from .rollups import attendance_rollups
+
+def export_attendance_to_excel(path: str, start: str = None, end: str = None,
+                               department: str = None, max_rows: int = EXCEL_MAX_ROWS,
+                               progress=None) -> int:
     """
-    Export attendance.csv to an Excel file.
+    Export attendance to an Excel file, optionally only dates start..end
+    ("YYYY-MM-DD", inclusive) and users of one department.
+    Rows are streamed from storage in date/time order into an openpyxl
+    write-only workbook, so memory stays flat however long the history is.
+    If the selection does not fit in one sheet (`max_rows`), it is split
+    into one sheet per month. `progress(done, total)` is called per chunk.
     Returns number of rows exported.
     """
-    df = attendance_df().copy()
-    # sort by date/time then name
-    if not df.empty:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df["time"] = pd.to_datetime(df["time"], format="%H:%M:%S", errors="coerce").dt.time
-        df.sort_values(by=["date", "time", "name"], inplace=True)
-        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
-        df["time"] = df["time"].astype(str)
-
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Attendance")
-        ws = writer.sheets["Attendance"]
+    store = storage()
+    total = store.count_attendance(start, end, department=department)
+    per_month = total > max_rows - 1
+
+    wb = Workbook(write_only=True)
+    sheet, sheet_key, sheet_rows, sheet_no = None, None, 0, 0
+    directory = user_directory()
+    done = 0
+
+    def new_sheet(title):
+        ws = wb.create_sheet(title=title)
         # set simple column widths
-        widths = {"A": 14, "B": 12, "C": 10, "D": 28}
-        for col, w in widths.items():
+        for col, w in {"A": 14, "B": 12, "C": 10, "D": 28}.items():
             ws.column_dimensions[col].width = w
+        ws.append([_header_cell(ws, h) for h in ATTENDANCE_FIELDS])
+        return ws
+
+    for rows in store.iter_attendance(start, end, department=department, chunk=EXPORT_CHUNK_ROWS):
+        for date_str, time_str, pid, name in rows:
+            key = date_str[:7] if per_month else "Attendance"
+            if sheet is None or key != sheet_key or sheet_rows >= max_rows - 1:
+                sheet_no = sheet_no + 1 if key == sheet_key else 1
+                sheet_key, sheet_rows = key, 0
+                sheet = new_sheet(key if sheet_no == 1 else f"{key} ({sheet_no})")
+            if not (isinstance(name, str) and clean_name(name)[1]):
+                name = directory.name(int(pid), "")
+            sheet.append([date_str, time_str, int(pid), name])
+            sheet_rows += 1
+        done += len(rows)
+        if progress is not None:
+            progress(done, total)
+    if sheet is None:
+        new_sheet("Attendance")
+    wb.save(path)
+    return done
+
+def export_summary_to_excel(path: str, start: str = None, end: str = None,
+                            department: str = None, progress=None) -> int:
+    """
+    Export per-day summaries from the attendance rollups (rollups.py): a
+    "Daily" sheet with present / absent / row counts per day and a
+    "First-Last" sheet with each user's first-in and last-out time per day.
+    No raw rows are read. Returns the number of days exported.
+    """
+    directory = user_directory()
+    users = [u for u in directory.records() if department is None or u[3] == department]
+    roster = {u[0] for u in users}
+    rollups = attendance_rollups()
+    days = rollups.dates(start, end)
+
+    wb = Workbook(write_only=True)
+    daily = wb.create_sheet("Daily")
+    firstlast = wb.create_sheet("First-Last")
+    for ws, head, widths in ((daily, ["date", "present", "absent", "registered", "rows"], [14, 10, 10, 12, 10]),
+                             (firstlast, ["date", "id", "name", "first_in", "last_out", "rows"], [14, 10, 28, 12, 12, 8])):
+        for i, w in enumerate(widths):
+            ws.column_dimensions[chr(ord("A") + i)].width = w
+        ws.append([_header_cell(ws, h) for h in head])
+
+    for n, d in enumerate(days, 1):
+        entries = rollups.day(d)
+        if department is not None:
+            entries = {pid: v for pid, v in entries.items() if pid in roster}
+        present = set(entries) & roster
+        daily.append([d, len(present), len(roster - present), len(roster), sum(v[0] for v in entries.values())])
+        for pid in sorted(entries):
+            rows, first, last = entries[pid]
+            firstlast.append([d, pid, directory.name(pid, ""), first, last, rows])
+        if progress is not None:
+            progress(n, len(days))
+    wb.save(path)
+    return len(days)
 
-    return len(df)
+def _header_cell(ws, text):
+    cell = WriteOnlyCell(ws, value=text)
+    cell.font = Font(bold=True)
+    return cell
 
-def export_attendance_to_pdf(path: str, title: str = "Attendance Report") -> int:
+TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#0d6efd")),
+    ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+    ("ALIGN", (0,0), (-1,-1), "CENTER"),
+    ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
+    ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+    ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.Color(0.97,0.97,1.0)]),
+    ("FONTSIZE", (0,0), (-1,-1), 10),
+])
+COL_WIDTHS = [4*cm, 3.5*cm, 3*cm, 12*cm]
+
+def export_attendance_to_pdf(path: str, title: str = "Attendance Report", start: str = None,
+                             end: str = None, department: str = None, group_by: str = "date",
+                             chunk_rows: int = PDF_TABLE_ROWS, progress=None) -> int:
     """
-    Export attendance.csv to a simple, printable PDF table.
+    Export attendance to a printable PDF report.
+
+    Rows are streamed from storage and laid out as many small tables of
+    `chunk_rows` rows (about one page each) instead of one huge Table, so
+    reportlab's layout cost stays linear. The tables are generated while
+    reportlab lays out the pages (see _FlowableStream), so memory stays
+    flat however long the history is. group_by:
+      "date"       - a section per day, ending with a present/absent summary
+      "department" - a section per department, each split by day with summaries;
+                     rows of IDs missing from users.csv get an "(unregistered)" section
+      None         - one flat list, no summaries
+    `progress(done, total)` is called per chunk of rows laid out.
     Returns number of rows exported.
     """
-    df = attendance_df().copy()
-    if not df.empty:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df["time"] = pd.to_datetime(df["time"], format="%H:%M:%S", errors="coerce").dt.time
-        df.sort_values(by=["date", "time", "name"], inplace=True)
-        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
-        df["time"] = df["time"].astype(str)
-
-    data = [["Date", "Time", "ID", "Name"]]
-    data += df[["date", "time", "id", "name"]].values.tolist() if not df.empty else []
-
-    # Build PDF
+    store = storage()
+    total = store.count_attendance(start, end, department=department)
+    done = [0]
     doc = SimpleDocTemplate(path, pagesize=landscape(A4), leftMargin=1.2*cm, rightMargin=1.2*cm, topMargin=1.0*cm, bottomMargin=1.0*cm)
+    flowables = _pdf_flowables(store, title, start, end, department, group_by, chunk_rows, total, done, progress)
+    doc.build(_FlowableStream(flowables))
+    if progress is not None:
+        progress(total, total)
+    return done[0]
+
+def _pdf_flowables(store, title, start, end, department, group_by, chunk_rows, total, done, progress):
+    """The flowables of export_attendance_to_pdf, in order; counts rows in done[0]."""
+    directory = user_directory()
+    users = directory.records()
     styles = getSampleStyleSheet()
-    elements = []
 
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
-    elements.append(Paragraph(f"<b>{title}</b>", styles["Title"]))
-    elements.append(Paragraph(f"Generated: {now}", styles["Normal"]))
-    elements.append(Spacer(1, 0.4*cm))
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#0d6efd")),
-        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
-        ("ALIGN", (0,0), (-1,-1), "CENTER"),
-        ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.Color(0.97,0.97,1.0)]),
-        ("FONTSIZE", (0,0), (-1,-1), 10),
-    ]))
-
-    elements.append(table)
-    doc.build(elements)
-    return len(data) - 1
+    yield Paragraph(f"<b>{title}</b>", styles["Title"])
+    yield Paragraph(f"Generated: {now}", styles["Normal"])
+    scope = [f"{start or '...'} to {end or '...'}" if start or end else "",
+             f"department {department}" if department is not None else ""]
+    if any(scope):
+        yield Paragraph(escape("Selection: " + ", ".join(x for x in scope if x)), styles["Normal"])
+    yield Spacer(1, 0.4*cm)
+
+    registered = {u[0] for u in users}
+    if group_by == "department":
+        depts = [department] if department is not None else sorted({u[3] for u in users})
+        sections = [(d or "(no department)", d, False) for d in depts]
+        if department is None:
+            sections.append(("(unregistered)", None, True))
+    else:
+        sections = [(None, department, False)]
+
+    for heading, dept, unregistered in sections:
+        if heading is not None and not unregistered:
+            yield Paragraph(f"Department: {escape(heading)}", styles["Heading1"])
+        roster = {} if unregistered else {u[0]: u[1] for u in users if dept is None or u[3] == dept}
+        day, day_rows, present = None, [], set()
+        out = []
+
+        def close_day():
+            _flush_rows(out, day_rows, chunk_rows)
+            if group_by is not None and day is not None:
+                out.extend(_day_summary(day, present, roster, directory, styles))
+
+        for rows in store.iter_attendance(start, end, department=dept, chunk=EXPORT_CHUNK_ROWS):
+            if unregistered:
+                rows = [r for r in rows if int(r[2]) not in registered]
+                if rows and heading is not None:
+                    out.append(Paragraph(f"Department: {escape(heading)}", styles["Heading1"]))
+                    heading = None
+            for date_str, time_str, pid, name in rows:
+                if group_by is not None and date_str != day:
+                    close_day()
+                    day, day_rows, present = date_str, [], set()
+                    out.append(Paragraph(f"{date_str}", styles["Heading2"]))
+                if not (isinstance(name, str) and clean_name(name)[1]):
+                    name = directory.name(int(pid), "")
+                day_rows.append([date_str, time_str, int(pid), name])
+                present.add(int(pid))
+                if len(day_rows) >= chunk_rows:
+                    _flush_rows(out, day_rows, chunk_rows)
+                    day_rows = []
+                    yield from out
+                    out = []
+            done[0] += len(rows)
+            if progress is not None:
+                progress(done[0], total)
+            yield from out
+            out = []
+        close_day()
+        yield from out
+
+    if total == 0:
+        yield Paragraph("No attendance records.", styles["Normal"])
+
+class _FlowableStream(list):
+    """
+    The flowable list given to doc.build(), filled from a generator as
+    reportlab consumes it. build() only looks at the front of the list and
+    deletes each flowable once it is drawn, so only the flowables around
+    the current page are held in memory.
+    """
+
+    def __init__(self, source, ahead: int = 8):
+        super().__init__()
+        self._source = source
+        self._ahead = ahead
+
+    def __len__(self):
+        while self._source is not None and list.__len__(self) < self._ahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return list.__len__(self)
+
+def _flush_rows(elements, rows, chunk_rows):
+    """Append `rows` as tables of at most `chunk_rows` rows, each with its own header."""
+    for i in range(0, len(rows), chunk_rows):
+        table = Table([["Date", "Time", "ID", "Name"]] + rows[i:i + chunk_rows],
+                      colWidths=COL_WIDTHS, repeatRows=1)
+        table.setStyle(TABLE_STYLE)
+        elements.append(table)
+
+def _day_summary(day, present, roster, directory, styles, max_names: int = 40):
+    """Present/absent counts for one day against the registered users in `roster`."""
+    expected = set(roster)
+    absent = sorted(expected - present)
+    out = [Spacer(1, 0.2*cm),
+           Paragraph(f"<b>Summary {day}</b>: present {len(present & expected)} of {len(expected)} registered, "
+                     f"absent {len(absent)}" + (f", {len(present - expected)} not registered"
+                                                 if present - expected else ""), styles["Normal"])]
+    if absent:
+        names = [escape(f"{directory.name(pid, roster.get(pid) or '')} ({pid})") for pid in absent[:max_names]]
+        more = f" ... and {len(absent) - max_names} more" if len(absent) > max_names else ""
+        out.append(Paragraph("Absent: " + ", ".join(names) + more, styles["Normal"]))
+    out.append(Spacer(1, 0.4*cm))
+    return out
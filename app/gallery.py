@@ -0,0 +1,146 @@
+import numpy as np
+import cv2
+
+from .config import GALLERY_PROTOTYPES_PER_USER, GALLERY_SHORTLIST
+from .lbph import LBPHEngine
+
+
+def medoids(dist, k: int, iters: int = 5):
+    """
+    Pick `k` representative rows of a square distance matrix (k-medoids).
+    Seeds with the most central sample plus farthest-point picks, then
+    alternates assignment / medoid update for up to `iters` rounds.
+    Returns (medoid indices, assignment of every row to a medoid position).
+    """
+    n = len(dist)
+    if n <= k:
+        return list(range(n)), np.arange(n)
+    chosen = [int(dist.sum(axis=1).argmin())]
+    nearest = dist[chosen[0]].copy()
+    while len(chosen) < k:
+        nxt = int(nearest.argmax())
+        chosen.append(nxt)
+        nearest = np.minimum(nearest, dist[nxt])
+    for _ in range(iters):
+        assign = dist[:, chosen].argmin(axis=1)
+        updated = []
+        for c in range(k):
+            members = np.flatnonzero(assign == c)
+            if not len(members):
+                updated.append(chosen[c])
+                continue
+            within = dist[np.ix_(members, members)].sum(axis=1)
+            updated.append(int(members[within.argmin()]))
+        if updated == chosen:
+            break
+        chosen = updated
+    return chosen, dist[:, chosen].argmin(axis=1)
+
+
+def pairwise_chi_square(hists):
+    """Symmetric HISTCMP_CHISQR_ALT matrix of a small set of histograms (cv2.compareHist per pair)."""
+    n = len(hists)
+    dist = np.zeros((n, n), np.float64)
+    for i in range(n):
+        for j in range(i + 1, n):
+            dist[i, j] = dist[j, i] = cv2.compareHist(hists[i], hists[j], cv2.HISTCMP_CHISQR_ALT)
+    return dist
+
+
+def select_prototypes(engine: LBPHEngine, per_user: int = GALLERY_PROTOTYPES_PER_USER):
+    """
+    Cluster each user's templates in `engine` and keep at most `per_user`
+    medoids. Returns (prototype template indices, cluster id of every
+    template) - the cluster id is the position of its prototype.
+    """
+    labels = engine.labels
+    proto = []
+    cluster = np.empty(len(labels), np.int64)
+    for lbl in np.unique(labels):
+        idx = np.flatnonzero(labels == lbl)
+        dist = pairwise_chi_square(engine.counts[:, idx].T.astype(np.float32) / np.float32(engine.cell_area))
+        chosen, assign = medoids(dist, per_user)
+        cluster[idx] = len(proto) + assign
+        proto.extend(int(idx[c]) for c in chosen)
+    return np.array(proto, np.int64), cluster
+
+
+class TwoStageIndex:
+    """
+    Prototype-first search over a full LBPH gallery.
+
+    Stage 1 scores the query against the per-user prototypes only (at most
+    `per_user` x users templates). Stage 2 refines against the full
+    templates of the `shortlist` best prototype clusters. With a shortlist
+    covering the true match this returns the same answer as a full scan
+    while touching a small fraction of the gallery.
+    """
+
+    def __init__(self, engine: LBPHEngine, proto=None, cluster=None,
+                 per_user: int = GALLERY_PROTOTYPES_PER_USER, shortlist: int = GALLERY_SHORTLIST):
+        self.engine = engine
+        if proto is None or cluster is None:
+            proto, cluster = select_prototypes(engine, per_user)
+        self.proto = np.asarray(proto, np.int64)
+        self.cluster = np.asarray(cluster, np.int64)
+        self.shortlist = max(1, int(shortlist))
+        order = np.argsort(self.cluster, kind="stable")
+        bounds = np.searchsorted(self.cluster[order], np.arange(len(self.proto) + 1))
+        self._members = [order[bounds[c]:bounds[c+1]] for c in range(len(self.proto))]
+
+    def __len__(self):
+        return len(self.engine)
+
+    @property
+    def threshold(self):
+        return self.engine.threshold
+
+    def predict_batch(self, faces):
+        return self.predict_histograms(self.engine.histograms(faces))
+
+    def predict_histograms(self, hists):
+        eng = self.engine
+        qcounts = eng.to_counts(np.atleast_2d(hists))
+        labels = np.full(len(qcounts), -1, np.int32)
+        conf = np.full(len(qcounts), np.finfo(np.float64).max)
+        if not len(self.proto):
+            return labels, conf
+        coarse = eng.count_distances(qcounts, cols=self.proto)
+        for b, q in enumerate(qcounts):
+            best = np.argsort(coarse[b], kind="stable")[:self.shortlist]
+            cols = np.sort(np.concatenate([self._members[c] for c in best]))
+            d = eng.count_distances(q, cols=cols)[0]
+            i = int(d.argmin())
+            if d[i] < eng.threshold:
+                labels[b], conf[b] = eng.labels[cols[i]], d[i]
+        return labels, conf
+
+    def predict(self, face):
+        labels, conf = self.predict_batch(face)
+        return int(labels[0]), float(conf[0])
+
+
+def compact_training_set(images, labels, per_user: int = GALLERY_PROTOTYPES_PER_USER):
+    """Keep only each user's prototype samples; returns (images, labels) in the original order."""
+    engine = LBPHEngine()
+    engine.train(np.stack(images), labels)
+    proto, _ = select_prototypes(engine, per_user)
+    keep = np.sort(proto)
+    return [images[i] for i in keep], [labels[i] for i in keep]
+
+
+def save_prototypes(path, engine: LBPHEngine, per_user: int = GALLERY_PROTOTYPES_PER_USER):
+    proto, cluster = select_prototypes(engine, per_user)
+    np.savez(path, proto=proto, cluster=cluster, labels=engine.labels)
+    return len(proto)
+
+
+def load_two_stage(path, engine: LBPHEngine, shortlist: int = GALLERY_SHORTLIST):
+    """TwoStageIndex from a saved prototypes file, or None if it does not match `engine`."""
+    try:
+        data = np.load(path)
+    except (OSError, ValueError):
+        return None
+    if not np.array_equal(data["labels"], engine.labels):
+        return None
+    return TwoStageIndex(engine, data["proto"], data["cluster"], shortlist=shortlist)
@@ -0,0 +1,121 @@
+import json
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .config import DATASET_DIR, TRAIN_CACHE_DIR
+
+FACE_SHAPE = (200, 200)
+
+
+def normalize_face(img):
+    """A decoded training face at FACE_SHAPE, the size recognition crops are resized to."""
+    return img if img.shape == FACE_SHAPE else cv2.resize(img, FACE_SHAPE[::-1])
+
+
+class ImageCache:
+    """
+    Packed cache of decoded grayscale training faces.
+
+    Each dataset folder is stored as one `<folder>.npy` array of shape
+    (n, 200, 200) uint8, opened with mmap so it costs no decoding and no
+    per-file open(). `index.json` records, per folder, the PNG names in
+    array order and the mtime each was decoded from, plus the PNGs that
+    could not be decoded ("skipped", with their mtime). A folder is only
+    re-decoded for PNGs that are new or whose mtime changed; unchanged
+    rows are copied from the previous array and unchanged unreadable files
+    are not tried again. Folders that disappeared from
+    the dataset are pruned. Different folders may be loaded from several
+    threads at once; index updates are serialized.
+    """
+
+    def __init__(self, cache_dir: Path = TRAIN_CACHE_DIR, dataset_dir: Path = DATASET_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.dataset_dir = Path(dataset_dir)
+        self.index_path = self.cache_dir / "index.json"
+        self.index = self._load_index()
+        self.decoded = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        tmp.replace(self.index_path)
+
+    def _array_path(self, folder: str):
+        return self.cache_dir / f"{folder}.npy"
+
+    def folder(self, folder: str, files: dict):
+        """
+        Faces of one dataset folder as an (n, 200, 200) uint8 array, in the
+        order of `files` ({png name: mtime_ns} from scan_dataset()).
+        Unreadable PNGs are skipped.
+        """
+        with self._lock:
+            entry = self.index.get(folder)
+        path = self._array_path(folder)
+        bad = dict(entry.get("skipped", ())) if entry else {}
+        if entry and path.exists():
+            cached = {name: (i, mtime) for i, (name, mtime) in enumerate(entry["files"])}
+            readable = [(n, m) for n, m in files.items() if bad.get(n) != m]
+            if [(n, m) for n, m in entry["files"]] == readable:
+                with self._lock:
+                    self.reused += len(readable)
+                return np.load(path, mmap_mode="r")
+            old = np.load(path, mmap_mode="r")
+        else:
+            cached, old = {}, None
+
+        rows, kept, skipped, reused, decoded = [], [], [], 0, 0
+        for name, mtime in files.items():
+            hit = cached.get(name)
+            if bad.get(name) == mtime:
+                skipped.append([name, mtime])
+                continue
+            if hit is not None and hit[1] == mtime and old is not None:
+                rows.append(np.array(old[hit[0]]))
+                reused += 1
+            else:
+                img = cv2.imread(str(self.dataset_dir / folder / name), cv2.IMREAD_GRAYSCALE)
+                if img is None:
+                    skipped.append([name, mtime])
+                    continue
+                rows.append(normalize_face(img))
+                decoded += 1
+            kept.append([name, mtime])
+        arr = np.stack(rows) if rows else np.zeros((0,) + FACE_SHAPE, np.uint8)
+        del old
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npy")
+        np.save(tmp, arr)
+        tmp.replace(path)
+        with self._lock:
+            self.reused += reused
+            self.decoded += decoded
+            self.index[folder] = {"files": kept, "skipped": skipped}
+            self._save_index()
+        return arr
+
+    def prune(self, folders):
+        """Forget cached folders that are not in `folders`."""
+        with self._lock:
+            gone = [f for f in self.index if f not in folders]
+            for f in gone:
+                self._array_path(f).unlink(missing_ok=True)
+                del self.index[f]
+            if gone:
+                self._save_index()
+        return gone
@@ -0,0 +1,366 @@
+import csv, io, os, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .metrics import log
+
+FIELDS = ["date", "time", "id", "name"]
+HEADER = ",".join(FIELDS) + "\n"
+
+FSYNC_POLICIES = ("always", "batch", "never")
+
+
+class AttendanceJournal:
+    """
+    Append-only writer for attendance.csv.
+
+    Every row is formatted once and written to the end of the file with a
+    single buffered write, so logging cost does not depend on how much
+    history the file already holds. The on-disk format stays the plain
+    `date,time,id,name` CSV that attendance_df() and the exporters read.
+
+    fsync_policy:
+      "always" - fsync after every row (safest, slowest)
+      "batch"  - fsync every `fsync_every` rows or `fsync_interval` seconds
+      "never"  - leave durability to the OS
+
+    A background compactor wakes every `compact_interval` seconds. Rows are
+    normally appended in chronological order; if a row arrives out of order
+    (clock change) or repeats the previous (date, time, id) key, the file is
+    marked dirty and the compactor rewrites it sorted (rows with equal keys
+    are all kept).
+    """
+
+    def __init__(self, path, fsync_policy="batch", fsync_every=32,
+                 fsync_interval=2.0, compact_interval=60.0):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}")
+        self.path = Path(path)
+        self.fsync_policy = fsync_policy
+        self.fsync_every = max(1, int(fsync_every))
+        self.fsync_interval = float(fsync_interval)
+        self.compact_interval = float(compact_interval)
+
+        self._lock = threading.RLock()
+        self._fh = None
+        self._last_key = None
+        self._dirty = False
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, lineterminator="\n")
+        self._stop = threading.Event()
+        self._compactor = None
+        self._generation = 0
+
+    # ---------- file handle ----------
+
+    def _open(self):
+        """Open the file for appending, creating the header or repairing a torn last line."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not self.path.exists() or self.path.stat().st_size == 0
+        self._fh = open(self.path, "a", encoding="utf-8", newline="")
+        if fresh:
+            self._fh.write(HEADER)
+            self._fh.flush()
+            self._last_key = None
+            return
+        tail = _read_tail(self.path)
+        if not tail.endswith(b"\n"):
+            # crash mid-row: terminate the partial line so the next row parses
+            self._fh.write("\n")
+            self._fh.flush()
+        self._last_key = _key_from_line(tail)
+
+    def _ensure_open(self):
+        if self._fh is None or self._fh.closed:
+            self._open()
+        if self._compactor is None and self.compact_interval > 0:
+            self._compactor = threading.Thread(target=self._compact_loop,
+                                               name="attendance-compactor", daemon=True)
+            self._compactor.start()
+
+    def close(self):
+        """Flush, fsync and release the file handle (it is reopened on the next append)."""
+        with self._lock:
+            if self._fh is not None and not self._fh.closed:
+                self._sync()
+                self._fh.close()
+            self._fh = None
+
+    def stop(self):
+        """Stop the background compactor and close the file."""
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5.0)
+            self._compactor = None
+        self.close()
+
+    # ---------- writing ----------
+
+    def append(self, date_str: str, time_str: str, pid: int, name: str):
+        """Append one attendance row; O(1) in the size of the existing file."""
+        key = (date_str, time_str, int(pid))
+        with self._lock:
+            self._ensure_open()
+            self._buf.seek(0)
+            self._buf.truncate()
+            self._writer.writerow([date_str, time_str, int(pid), name])
+            self._fh.write(self._buf.getvalue())
+            self._fh.flush()
+            if self._last_key is not None and key <= self._last_key:
+                self._dirty = True
+            self._last_key = key if self._last_key is None else max(key, self._last_key)
+            self._unsynced += 1
+            if self.fsync_policy == "always":
+                self._sync()
+            elif self.fsync_policy == "batch" and self._sync_due():
+                self._sync()
+
+    def append_many(self, rows):
+        """Append (date, time, id, name) rows with one write, flush and fsync decision."""
+        rows = [(d, t, int(pid), name) for d, t, pid, name in rows]
+        if not rows:
+            return
+        with self._lock:
+            self._ensure_open()
+            self._buf.seek(0)
+            self._buf.truncate()
+            self._writer.writerows(rows)
+            self._fh.write(self._buf.getvalue())
+            self._fh.flush()
+            for d, t, pid, _ in rows:
+                key = (d, t, pid)
+                if self._last_key is not None and key <= self._last_key:
+                    self._dirty = True
+                self._last_key = key if self._last_key is None else max(key, self._last_key)
+            self._unsynced += len(rows)
+            if self.fsync_policy == "always":
+                self._sync()
+            elif self.fsync_policy == "batch" and self._sync_due():
+                self._sync()
+
+    def _sync_due(self):
+        return (self._unsynced >= self.fsync_every or
+                time.monotonic() - self._last_sync >= self.fsync_interval)
+
+    def _sync(self):
+        if self._fh is None or self._fh.closed or not self._unsynced:
+            return
+        self._fh.flush()
+        if self.fsync_policy != "never":
+            os.fsync(self._fh.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    # ---------- compaction ----------
+
+    def _compact_loop(self):
+        tick = min(self.compact_interval, max(self.fsync_interval, 0.5))
+        next_compact = time.monotonic() + self.compact_interval
+        while not self._stop.wait(tick):
+            with self._lock:
+                if self.fsync_policy == "batch" and self._unsynced and self._sync_due():
+                    self._sync()
+            if time.monotonic() >= next_compact:
+                next_compact = time.monotonic() + self.compact_interval
+                try:
+                    self.compact()
+                except Exception as e:
+                    log.warn("Attendance compaction failed: %s", e)
+
+    def compact(self, force: bool = False):
+        """
+        Rewrite the file sorted by (date, time, id). Rows with the same key
+        are all kept, in the order they were written. The sorted copy is built
+        outside the append lock from a snapshot of the file; rows appended
+        meanwhile are carried over when it is swapped in. Only runs when
+        out-of-order or repeated rows were appended, unless `force`. Returns
+        the number of rows written, or None if nothing was done.
+        """
+        with self._lock:
+            if not (self._dirty or force) or not self.path.exists():
+                return None
+            if self._fh is not None and not self._fh.closed:
+                self._fh.flush()
+            size = self.path.stat().st_size
+            generation = self._generation
+            self._dirty = False
+
+        with open(self.path, "rb") as f:
+            rows = _parse_rows(f.read(size))
+        rows.sort(key=lambda r: r[0])   # stable: equal keys keep their order
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(HEADER)
+            csv.writer(f, lineterminator="\n").writerows(row for _, row in rows)
+
+        with self._lock:
+            if generation != self._generation:   # rewritten elsewhere meanwhile (deletions)
+                tmp.unlink(missing_ok=True)
+                self._dirty = True
+                return None
+            self.close()
+            with open(self.path, "rb") as f:
+                f.seek(size)
+                tail = f.read()
+            appended = _parse_rows(tail, header=False)
+            with open(tmp, "ab") as f:
+                f.write(tail if not tail or tail.endswith(b"\n") else tail + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            last = rows[-1][0] if rows else None
+            for key, _ in appended:
+                if last is not None and key <= last:
+                    self._dirty = True
+                last = key if last is None else max(key, last)
+            self._last_key = last
+            return len(rows) + len(appended)
+
+    def invalidate(self):
+        """Call after the file was rewritten elsewhere (e.g. deletions) to drop the open handle."""
+        with self._lock:
+            self._generation += 1   # a compaction in progress must not swap in its stale copy
+            self.close()
+            self._dirty = False
+            self._last_key = None
+
+    @contextmanager
+    def exclusive(self):
+        """Keep appends out while the caller rewrites the file (e.g. deletions)."""
+        with self._lock:
+            self.invalidate()
+            yield
+
+
+def _parse_rows(data: bytes, header: bool = True):
+    """[((date, time, id), row)] for the well-formed rows of raw CSV bytes."""
+    reader = csv.reader(io.StringIO(data.decode("utf-8", errors="replace"), newline=""))
+    if header:
+        next(reader, None)
+    out = []
+    for row in reader:
+        if len(row) < 4:
+            continue
+        try:
+            out.append(((row[0], row[1], int(row[2])), row[:4]))
+        except ValueError:
+            continue
+    return out
+
+
+def _read_tail(path: Path, size: int = 4096) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - size))
+        return f.read()
+
+
+def _key_from_line(tail: bytes):
+    """Parse the (date, time, id) key of the last complete row in `tail`."""
+    lines = [ln for ln in tail.decode("utf-8", errors="ignore").splitlines() if ln.strip()]
+    if not lines:
+        return None
+    try:
+        row = next(csv.reader([lines[-1]]))
+        return (row[0], row[1], int(row[2]))
+    except (StopIteration, IndexError, ValueError):
+        return None
+
+
+def rows_since(path, date_str: str, block: int = 65536):
+    """
+    Return [date, time, id, name] rows whose date is >= `date_str`, reading
+    attendance.csv backwards from the end. The journal keeps the file in
+    chronological order, so only the recent tail is decoded.
+    """
+    path = Path(path)
+    if not path.exists():
+        return []
+    rows = []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        carry = b""
+        done = False
+        while pos > 0 and not done:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + carry
+            lines = data.split(b"\n")
+            # the first piece may be a partial line unless we reached the start
+            carry = lines.pop(0) if pos > 0 else b""
+            for raw in reversed(lines):
+                row = _parse_line(raw)
+                if row is None:
+                    continue
+                if row[0] < date_str:
+                    done = True
+                    break
+                rows.append(row)
+    rows.reverse()
+    return rows
+
+
+def _parse_line(raw: bytes):
+    line = raw.decode("utf-8", errors="ignore").strip("\r")
+    if not line or line == HEADER.strip():
+        return None
+    try:
+        row = next(csv.reader([line]))
+        return [row[0], row[1], int(row[2]), row[3]]
+    except (StopIteration, IndexError, ValueError):
+        return None
+
+
+def _row_key(raw: bytes):
+    """b"date,time,id" of a raw CSV line (names with commas or quotes are quoted)."""
+    if raw.endswith(b'"'):
+        row = _parse_line(raw)
+        return f"{row[0]},{row[1]},{row[2]}".encode() if row else b""
+    return raw.rpartition(b",")[0]
+
+
+def delete_rows(path, keys=None, start: str = None, end: str = None, pid: int = None):
+    """
+    Rewrite attendance.csv without the rows whose (date, time, id) is in `keys`
+    or - when keys is None - that fall in the date range / belong to `pid`.
+    Works on raw lines with a hashed key set, so nothing is parsed into a
+    DataFrame. Returns the number of rows removed.
+    """
+    path = Path(path)
+    if not path.exists():
+        return 0
+    with open(path, "rb") as f:
+        lines = f.read().splitlines()
+    header, body = lines[:1], [ln for ln in lines[1:] if ln]
+    if keys is not None:
+        wanted = {f"{d},{t},{int(i)}".encode() for d, t, i in keys}
+        kept = [ln for ln in body
+                if (ln.rpartition(b",")[0] if not ln.endswith(b'"') else _row_key(ln)) not in wanted]
+    else:
+        lo = start.encode() if start is not None else None
+        hi = end.encode() if end is not None else None
+        who = str(int(pid)).encode() if pid is not None else None
+        kept = []
+        for ln in body:
+            k = _row_key(ln)
+            d = k.partition(b",")[0]
+            if ((lo is None or d >= lo) and (hi is None or d <= hi)
+                    and (who is None or k.rpartition(b",")[2] == who)):
+                continue
+            kept.append(ln)
+    removed = len(body) - len(kept)
+    if removed:
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"\n".join((header or [HEADER.strip().encode()]) + kept) + b"\n")
+        os.replace(tmp, path)
+    return removed
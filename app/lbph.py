@@ -0,0 +1,274 @@
+import math
+import numpy as np
+
+from .config import LBPH_RADIUS, LBPH_NEIGHBORS, LBPH_GRID_X, LBPH_GRID_Y
+
+_EPS32 = np.finfo(np.float32).eps
+
+
+def elbp(images, radius: int = LBPH_RADIUS, neighbors: int = LBPH_NEIGHBORS):
+    """
+    Extended (circular) LBP codes for a batch of equally sized grayscale images,
+    shape (B, H, W) -> (B, H-2r, W-2r) int32. Same float32 bilinear
+    interpolation and tie rule as OpenCV's LBPHFaceRecognizer, so codes match.
+    """
+    src = np.asarray(images)
+    if src.ndim == 2:
+        src = src[None]
+    _, H, W = src.shape
+    srcf = src.astype(np.float32)
+    center = srcf[:, radius:H-radius, radius:W-radius]
+    out = np.zeros(center.shape, np.int32)
+
+    def shifted(dy, dx):
+        return srcf[:, radius+dy:H-radius+dy, radius+dx:W-radius+dx]
+
+    for n in range(neighbors):
+        x = float(np.float32(radius * math.cos(2.0 * math.pi * n / float(neighbors))))
+        y = float(np.float32(-radius * math.sin(2.0 * math.pi * n / float(neighbors))))
+        fx, fy = math.floor(x), math.floor(y)
+        cx, cy = math.ceil(x), math.ceil(y)
+        tx, ty = np.float32(x - fx), np.float32(y - fy)
+        one = np.float32(1.0)
+        w1 = (one - tx) * (one - ty)
+        w2 = tx * (one - ty)
+        w3 = (one - tx) * ty
+        w4 = tx * ty
+        t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx) + w3 * shifted(cy, fx) + w4 * shifted(cy, cx)
+        bit = (t > center) | (np.abs(t - center) < _EPS32)
+        out |= bit.astype(np.int32) << n
+    return out
+
+
+def spatial_histograms(codes, num_patterns: int, grid_x: int = LBPH_GRID_X,
+                       grid_y: int = LBPH_GRID_Y):
+    """
+    Per-cell normalized histograms of LBP codes, (B, h, w) -> (B, grid_x*grid_y*num_patterns)
+    float32, laid out row-major by cell exactly like OpenCV's spatial_histogram.
+    """
+    codes = np.asarray(codes)
+    B, h, w = codes.shape
+    ch, cw = h // grid_y, w // grid_x
+    cells = codes[:, :grid_y*ch, :grid_x*cw].reshape(B, grid_y, ch, grid_x, cw)
+    cells = cells.transpose(0, 1, 3, 2, 4).reshape(B, grid_y*grid_x, ch*cw)
+    offsets = (np.arange(B * grid_y * grid_x, dtype=np.int64) * num_patterns).reshape(B, -1, 1)
+    counts = np.bincount((cells + offsets).ravel(), minlength=B * grid_y * grid_x * num_patterns)
+    hist = counts.reshape(B, grid_y * grid_x * num_patterns).astype(np.float32)
+    hist /= np.float32(ch * cw)
+    return hist
+
+
+class LBPHEngine:
+    """
+    NumPy LBPH recognizer with the same results as cv2.face.LBPHFaceRecognizer.
+
+    LBPH histogram bins are exactly count / cell_area, so the gallery is kept
+    losslessly as integer counts in one contiguous uint16 matrix `counts`
+    of shape (bins, templates) - half the size of float32 and laid out so
+    that the bins a query actually uses are contiguous rows. `labels` holds
+    the matching int32 labels.
+
+    Chi-square (HISTCMP_CHISQR_ALT) scoring uses
+        sum_j (q-t)^2/(q+t) = sum_all t + sum_{q_j>0} q(q-3t)/(q+t)
+    so only the query's non-zero bins are visited, and each visit is a
+    table lookup over every template at once. Queries are scored one at a
+    time: batching them does not share any work, because the lookups of
+    different queries hit different table entries. The kernel is bound by
+    memory traffic, and on one core it is about 1.1-1.5x slower per face
+    than OpenCV's C++ loop (benchmarks/check_lbph_parity.py). Templates
+    can be split over `workers` threads, since NumPy releases the GIL,
+    which is where the engine gains. predict() has the cv2 signature, so
+    the engine can stand in for the OpenCV recognizer.
+    """
+
+    def __init__(self, radius: int = LBPH_RADIUS, neighbors: int = LBPH_NEIGHBORS,
+                 grid_x: int = LBPH_GRID_X, grid_y: int = LBPH_GRID_Y,
+                 face_size=(200, 200), threshold: float = float("inf"),
+                 workers: int = 1):
+        self.radius = int(radius)
+        self.neighbors = int(neighbors)
+        self.grid_x = int(grid_x)
+        self.grid_y = int(grid_y)
+        self.face_size = tuple(face_size)
+        self.threshold = float(threshold)
+        self.workers = max(1, int(workers))
+        self.counts = np.zeros((self.dim, 0), np.uint16)
+        self.labels = np.zeros(0, np.int32)
+        self._row_sums = np.zeros(0, np.float64)
+        self._width = None     # counts.max() + 1, computed on first use
+
+    @property
+    def num_patterns(self):
+        return 2 ** self.neighbors
+
+    @property
+    def dim(self):
+        return self.grid_x * self.grid_y * self.num_patterns
+
+    @property
+    def cell_area(self):
+        w, h = self.face_size
+        return ((h - 2*self.radius) // self.grid_y) * ((w - 2*self.radius) // self.grid_x)
+
+    @property
+    def templates(self):
+        """Gallery as float32 histograms, one row per sample (same values cv2 stores)."""
+        return (self.counts.T.astype(np.float32) / np.float32(self.cell_area))
+
+    def __len__(self):
+        return len(self.labels)
+
+    # ----- construction -----
+
+    @classmethod
+    def from_recognizer(cls, recognizer, face_size=(200, 200)):
+        """Copy parameters, histograms and labels out of a trained cv2 LBPH recognizer."""
+        eng = cls(recognizer.getRadius(), recognizer.getNeighbors(),
+                  recognizer.getGridX(), recognizer.getGridY(),
+                  face_size=face_size, threshold=recognizer.getThreshold())
+        hists = recognizer.getHistograms()
+        if hists:
+            mat = np.concatenate([np.asarray(h, np.float32).reshape(1, -1) for h in hists])
+            eng.add_histograms(mat, np.asarray(recognizer.getLabels(), np.int32).ravel())
+        return eng
+
+    @classmethod
+    def from_counts(cls, counts, labels, row_sums=None, max_count=None, **params):
+        """
+        Engine over an existing (bins, templates) uint16 count matrix, used
+        as-is - e.g. a read-only memmap of a binary model file (model_store.py).
+        `row_sums` / `max_count` can be passed so the matrix is not scanned.
+        """
+        eng = cls(**params)
+        if counts.shape[0] != eng.dim:
+            raise ValueError(f"count matrix has {counts.shape[0]} bins, parameters give {eng.dim}")
+        eng.counts = counts
+        eng.labels = np.asarray(labels, np.int32).ravel()
+        eng._row_sums = (np.asarray(row_sums, np.float64) if row_sums is not None
+                         else counts.sum(axis=0, dtype=np.float64) / eng.cell_area)
+        if max_count is not None:
+            eng._width = int(max_count) + 1
+        return eng
+
+    def histograms(self, faces, batch: int = 64):
+        """LBPH feature vectors for grayscale faces of `face_size`, (B, D) float32."""
+        faces = np.asarray(faces)
+        if faces.ndim == 2:
+            faces = faces[None]
+        out = np.empty((len(faces), self.dim), np.float32)
+        for i in range(0, len(faces), batch):
+            codes = elbp(faces[i:i+batch], self.radius, self.neighbors)
+            out[i:i+batch] = spatial_histograms(codes, self.num_patterns, self.grid_x, self.grid_y)
+        return out
+
+    def to_counts(self, hists):
+        """Float histograms -> integer bin counts; raises if they are not from `face_size` faces."""
+        hists = np.asarray(hists, np.float32).reshape(-1, self.dim)
+        scaled = hists.astype(np.float64) * self.cell_area
+        counts = np.rint(scaled)
+        if len(counts) and np.abs(scaled - counts).max() > 1e-3:
+            raise ValueError(f"histograms do not match {self.face_size} faces "
+                             f"(cell area {self.cell_area}); pass the training face_size")
+        return counts.astype(np.uint16)
+
+    def train(self, faces, labels):
+        self.counts = np.zeros((self.dim, 0), np.uint16)
+        self.labels = np.zeros(0, np.int32)
+        self._row_sums = np.zeros(0, np.float64)
+        self._width = None
+        self.update(faces, labels)
+
+    def update(self, faces, labels):
+        """Append samples to the gallery (like cv2 LBPHFaceRecognizer.update)."""
+        self.add_histograms(self.histograms(faces), labels)
+
+    def add_histograms(self, hists, labels):
+        self.add_counts(self.to_counts(hists), labels)
+
+    def add_counts(self, counts, labels):
+        """Append (n, D) integer bin counts with their labels."""
+        counts = np.asarray(counts, np.uint16).reshape(-1, self.dim)
+        self.counts = np.ascontiguousarray(np.concatenate([self.counts, counts.T], axis=1))
+        self.labels = np.concatenate([self.labels, np.asarray(labels, np.int32).ravel()])
+        self._row_sums = np.concatenate(
+            [self._row_sums, counts.sum(axis=1, dtype=np.float64) / self.cell_area])
+        self._width = None
+
+    # ----- prediction -----
+
+    def distances(self, hists):
+        """Chi-square (alt) distance of every histogram row to every template, (B, N) float64."""
+        return self.count_distances(self.to_counts(hists))
+
+    def count_distances(self, qcounts, cols=None):
+        """Like distances() for integer bin counts; `cols` restricts scoring to those templates."""
+        qcounts = np.atleast_2d(qcounts)
+        n = len(self.labels) if cols is None else len(cols)
+        out = np.empty((len(qcounts), n), np.float64)
+        for b, q in enumerate(qcounts):
+            out[b] = self._distances_one(q, cols)
+        return out
+
+    def _distances_one(self, q, cols=None):
+        N = len(self.labels) if cols is None else len(cols)
+        nz = np.flatnonzero(q)
+        uniq, inv = np.unique(q[nz], return_inverse=True)
+        if self._width is None:
+            self._width = int(self.counts.max(initial=0)) + 1
+        width = self._width
+        qa = uniq.astype(np.float64)[:, None]
+        tb = np.arange(width, dtype=np.float64)[None, :]
+        table = (qa * (qa - 3.0 * tb) / (qa + tb) / self.cell_area).ravel()   # q > 0: never 0/0
+        base = (inv.ravel() * width).astype(np.intp)[:, None]
+
+        def work(sl):
+            n = sl.stop - sl.start
+            acc = np.zeros(n, np.float64)
+            k = max(1, (32 << 10) // max(1, n))   # bins per step, ~32k lookups at a time
+            for s in range(0, len(nz), k):
+                if cols is None:
+                    idx = self.counts[nz[s:s+k], sl].astype(np.intp)
+                else:
+                    idx = self.counts[np.ix_(nz[s:s+k], cols[sl])].astype(np.intp)
+                idx += base[s:s+k]
+                acc += table.take(idx).sum(axis=0)
+            return acc
+
+        if self.workers > 1 and N >= 256 * self.workers:
+            step = -(-N // self.workers)
+            slices = [slice(s, min(N, s + step)) for s in range(0, N, step)]
+            inner = np.concatenate(list(_pool(self.workers).map(work, slices)))
+        else:
+            inner = work(slice(0, N))
+        row_sums = self._row_sums if cols is None else self._row_sums[cols]
+        return np.maximum(2.0 * (row_sums + inner), 0.0)
+
+    def predict_histograms(self, hists):
+        """Nearest template for each histogram row -> (labels, confidences)."""
+        hists = np.atleast_2d(hists)
+        if len(self.labels) == 0:
+            return np.full(len(hists), -1, np.int32), np.full(len(hists), np.finfo(np.float64).max)
+        dist = self.distances(hists)
+        best = dist.argmin(axis=1)   # first minimum wins, as in OpenCV
+        conf = dist[np.arange(len(best)), best]
+        labels = self.labels[best].copy()
+        reject = conf >= self.threshold
+        labels[reject] = -1
+        conf[reject] = np.finfo(np.float64).max
+        return labels, conf
+
+    def predict_batch(self, faces):
+        return self.predict_histograms(self.histograms(faces))
+
+    def predict(self, face):
+        labels, conf = self.predict_batch(face)
+        return int(labels[0]), float(conf[0])
+
+
+_pools = {}
+
+def _pool(workers: int):
+    from concurrent.futures import ThreadPoolExecutor
+    if workers not in _pools:
+        _pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lbph")
+    return _pools[workers]
@@ -0,0 +1,286 @@
+import bisect, json, threading, time
+from array import array
+from collections import deque
+from pathlib import Path
+
+from .config import (
+    LOG_LEVEL, METRICS_WINDOW, METRICS_EVENTS, METRICS_CONFIDENCE_BUCKETS,
+    METRICS_PORT, METRICS_PROFILE_DIR
+)
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+
+
+class Logger:
+    """
+    "[LEVEL] message" lines on stdout, like the prints it replaces, but
+    dropped below `level`. Pass %-style args instead of an f-string on hot
+    paths, so a disabled debug line costs one comparison and no formatting.
+    """
+
+    def __init__(self, level: str = LOG_LEVEL):
+        self.set_level(level)
+
+    def set_level(self, level: str):
+        self.level = LEVELS[level.upper()]
+
+    def enabled(self, level: str):
+        return LEVELS[level] >= self.level
+
+    def log(self, level: str, msg: str, *args):
+        if LEVELS[level] >= self.level:
+            print(f"[{level}] " + (msg % args if args else msg))
+
+    def debug(self, msg, *args):
+        if self.level <= 10:
+            self.log("DEBUG", msg, *args)
+
+    def info(self, msg, *args):
+        self.log("INFO", msg, *args)
+
+    def warn(self, msg, *args):
+        self.log("WARN", msg, *args)
+
+    def error(self, msg, *args):
+        self.log("ERROR", msg, *args)
+
+
+log = Logger()
+
+
+class Timer:
+    """Durations of one stage: totals since start plus the last `window` values in a ring."""
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.ring = array("d", bytes(8 * max(1, int(window))))   # numpy is only needed for snapshots
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.ring[self.count % len(self.ring)] = seconds
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self):
+        with self._lock:
+            recent = self.ring[:min(self.count, len(self.ring))]
+            count, total, mx = self.count, self.total, self.max
+        out = {"count": count, "total_s": round(total, 6),
+               "mean_ms": round(total / count * 1000.0, 4) if count else 0.0, "max_ms": round(mx * 1000.0, 4)}
+        if len(recent):
+            import numpy as np
+            for q, v in zip((50, 95, 99), np.percentile(recent, (50, 95, 99))):
+                out[f"p{q}_ms"] = round(float(v) * 1000.0, 4)
+        return out
+
+
+class _Timing:
+    __slots__ = ("timer", "t0")
+
+    def __init__(self, timer: Timer):
+        self.timer = timer
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.observe(time.perf_counter() - self.t0)
+        return False
+
+
+class Histogram:
+    """Bucketed values (Prometheus style: upper bounds plus +Inf)."""
+
+    def __init__(self, bounds):
+        self.bounds = sorted(float(b) for b in bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        cumulative, acc = [], 0
+        for le, c in zip(self.bounds + [float("inf")], counts):
+            acc += c
+            cumulative.append(["+Inf" if le == float("inf") else le, acc])
+        return {"buckets": cumulative, "sum": round(total, 4), "count": n}
+
+
+class Metrics:
+    """
+    Per-stage timers, counters, histograms and a ring of recent recognition
+    events for the camera hot paths. Recording is a lock and a few adds, so
+    it stays on all the time; snapshot() / prometheus() format it for the
+    JSON and Prometheus-text endpoints (serve_metrics()).
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW, events: int = METRICS_EVENTS):
+        self.window = window
+        self.started = time.time()
+        self.timers = {}
+        self.counters = {}
+        self.histograms = {}
+        self.events = deque(maxlen=events)
+        self._lock = threading.Lock()
+
+    def timer(self, name: str) -> Timer:
+        t = self.timers.get(name)
+        if t is None:
+            with self._lock:
+                t = self.timers.setdefault(name, Timer(self.window))
+        return t
+
+    def time(self, name: str):
+        """`with metrics().time("detect"): ...` records the block's duration."""
+        return _Timing(self.timer(name))
+
+    def observe(self, name: str, seconds: float):
+        self.timer(name).observe(seconds)
+
+    def inc(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def histogram(self, name: str, bounds=METRICS_CONFIDENCE_BUCKETS) -> Histogram:
+        h = self.histograms.get(name)
+        if h is None:
+            with self._lock:
+                h = self.histograms.setdefault(name, Histogram(bounds))
+        return h
+
+    def event(self, **fields):
+        fields["t"] = round(time.time(), 3)
+        self.events.append(fields)
+
+    def reset(self):
+        with self._lock:
+            self.timers, self.counters, self.histograms = {}, {}, {}
+            self.events.clear()
+            self.started = time.time()
+
+    # ----- export -----
+
+    def snapshot(self, events: bool = True):
+        with self._lock:
+            timers, counters, hists = dict(self.timers), dict(self.counters), dict(self.histograms)
+        out = {"uptime_s": round(time.time() - self.started, 3),
+               "timers": {k: v.snapshot() for k, v in sorted(timers.items())},
+               "counters": dict(sorted(counters.items())),
+               "histograms": {k: v.snapshot() for k, v in sorted(hists.items())}}
+        if events:
+            out["events"] = list(self.events)
+        return out
+
+    def prometheus(self, prefix: str = "attendance"):
+        snap = self.snapshot(events=False)
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, t in snap["timers"].items():
+            for q in (50, 95, 99):
+                if f"p{q}_ms" in t:
+                    lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q / 100:g}"}} {t[f"p{q}_ms"] / 1000.0:.6g}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {t["total_s"]:.6g}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {t["count"]}')
+        for name, v in snap["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {v}")
+        for name, h in snap["histograms"].items():
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for le, c in h["buckets"]:
+                lines.append(f'{prefix}_{name}_bucket{{le="{le if isinstance(le, str) else f"{le:g}"}"}} {c}')
+            lines.append(f"{prefix}_{name}_sum {h['sum']}")
+            lines.append(f"{prefix}_{name}_count {h['count']}")
+        lines.append(f"{prefix}_uptime_seconds {snap['uptime_s']}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+def metrics() -> Metrics:
+    """Process-wide metrics registry."""
+    return _metrics
+
+
+# ----- local endpoint -----
+
+_server = None
+
+def serve_metrics(port: int = METRICS_PORT, host: str = "127.0.0.1"):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json on a daemon thread.
+    Does nothing when `port` is None; returns the server otherwise.
+    """
+    global _server
+    if port is None or _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, ctype = json.dumps(metrics().snapshot()).encode(), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, ctype = metrics().prometheus().encode(), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, int(port)), Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    log.info("Metrics on http://%s:%d/metrics (and /metrics.json)", host, _server.server_address[1])
+    return _server
+
+
+# ----- profiling -----
+
+class profiled:
+    """
+    `with profiled("kiosk"):` runs the block under cProfile and writes
+    <METRICS_PROFILE_DIR>/<name>-<timestamp>.prof (open with pstats or
+    snakeviz). A no-op unless a directory is configured. Only the calling
+    thread is profiled.
+    """
+
+    def __init__(self, name: str, directory=METRICS_PROFILE_DIR):
+        self.name = name
+        self.directory = directory
+        self.profile = None
+
+    def __enter__(self):
+        if self.directory is not None:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.disable()
+            out = Path(self.directory)
+            out.mkdir(parents=True, exist_ok=True)
+            path = out / f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+            self.profile.dump_stats(str(path))
+            log.info("Profile written to %s", path)
+        return False
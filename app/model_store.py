@@ -0,0 +1,236 @@
+import json, struct
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .config import (
+    DATASET_DIR, MODELS_DIR, LBPH_RADIUS, LBPH_NEIGHBORS, LBPH_GRID_X, LBPH_GRID_Y, MODEL_FORMAT
+)
+from .lbph import LBPHEngine
+from .metrics import log
+
+MODEL_PATH = MODELS_DIR / ("lbph_model.bin" if MODEL_FORMAT == "binary" else "lbph_model.yml")
+BINARY_MAGIC = b"LBPHBIN\0"
+BINARY_VERSION = 1
+DBL_MAX = float(np.finfo(np.float64).max)   # LBPH default threshold
+MANIFEST_PATH = MODELS_DIR / "manifest.json"
+
+
+def lbph_params():
+    return {"radius": LBPH_RADIUS, "neighbors": LBPH_NEIGHBORS,
+            "grid_x": LBPH_GRID_X, "grid_y": LBPH_GRID_Y}
+
+
+# ---------- dataset state ----------
+
+def folder_label(name: str):
+    """Parse the user ID from a dataset folder name like "180_Alex_Raji", or None."""
+    try:
+        return int(str(name).split("_", 1)[0])
+    except Exception:
+        return None
+
+
+def scan_dataset(valid_ids, dataset_dir: Path = DATASET_DIR, verbose: bool = True):
+    """
+    Describe the trainable part of the dataset:
+    {folder name: {"id": label, "files": {png name: mtime_ns}}} for folders whose
+    ID is in `valid_ids`. Only directory listings and stat() - no image decoding.
+    """
+    state = {}
+    if not Path(dataset_dir).exists():
+        return state
+    for person_dir in sorted(Path(dataset_dir).iterdir()):
+        if not person_dir.is_dir():
+            continue
+        label = folder_label(person_dir.name)
+        if label is None:
+            if verbose:
+                log.warn("Skipping folder (cannot parse ID): %s", person_dir.name)
+            continue
+        if label not in valid_ids:
+            if verbose:
+                log.warn("Skipping folder not in users.csv: %s", person_dir.name)
+            continue
+        files = {p.name: p.stat().st_mtime_ns for p in sorted(person_dir.glob("*.png"))}
+        state[person_dir.name] = {"id": label, "files": files}
+    return state
+
+
+def changed_labels(old: dict, new: dict):
+    """IDs whose set of folders, files or file mtimes differs between two scan_dataset() states."""
+    def by_label(state):
+        out = {}
+        for folder, info in state.items():
+            out.setdefault(int(info["id"]), {})[folder] = info["files"]
+        return out
+    a, b = by_label(old), by_label(new)
+    return {lbl for lbl in set(a) | set(b) if a.get(lbl) != b.get(lbl)}
+
+
+# ---------- manifest ----------
+
+def load_manifest(path: Path = MANIFEST_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(folders: dict, samples: int, labels, previous=None, path: Path = MANIFEST_PATH):
+    """
+    Record which dataset folders (and file mtimes) the saved model was built from.
+    The version increases by one on every save.
+    """
+    manifest = {
+        "version": (previous or {}).get("version", 0) + 1,
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "params": lbph_params(),
+        "samples": int(samples),
+        "labels": sorted(int(x) for x in set(labels)),
+        "folders": folders,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    tmp.replace(path)
+    return manifest
+
+
+# ---------- model file ----------
+
+def write_lbph_model(path, hists, labels, params: dict = None, threshold: float = DBL_MAX):
+    """
+    Write an LBPH model file in OpenCV's own YAML layout from raw histograms
+    (what LBPHFaceRecognizer.save() produces), so models can be assembled,
+    merged or pruned without re-extracting features.
+    """
+    params = params or lbph_params()
+    fs = cv2.FileStorage(str(path), cv2.FILE_STORAGE_WRITE)
+    fs.startWriteStruct("opencv_lbphfaces", cv2.FILE_NODE_MAP)
+    fs.write("threshold", float(threshold))
+    for key in ("radius", "neighbors", "grid_x", "grid_y"):
+        fs.write(key, int(params[key]))
+    fs.startWriteStruct("histograms", cv2.FILE_NODE_SEQ)
+    for h in hists:
+        fs.write("", np.asarray(h, np.float32).reshape(1, -1))
+    fs.endWriteStruct()
+    fs.write("labels", np.asarray(labels, np.int32).reshape(-1, 1))
+    fs.startWriteStruct("labelsInfo", cv2.FILE_NODE_SEQ)
+    fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.release()
+
+
+def _align(n: int, to: int = 64):
+    return -(-n // to) * to
+
+
+def is_binary_model(path):
+    return Path(path).suffix == ".bin"
+
+
+def write_binary_model(path, hists, labels, params: dict = None, threshold: float = DBL_MAX,
+                       face_size=(200, 200)):
+    """
+    Write a model in the binary layout: magic, format version and a JSON
+    header (LBPH parameters, face size, threshold, sample count), then -
+    each 64-byte aligned - the labels (int32), per-template histogram sums
+    (float64) and the (bins, templates) uint16 bin-count matrix the numpy
+    engine searches. Counts are exact (histograms are count / cell area),
+    so nothing is lost against the YAML file at a quarter of the size or less.
+    """
+    params = params or lbph_params()
+    engine = LBPHEngine(params["radius"], params["neighbors"], params["grid_x"], params["grid_y"],
+                        face_size=face_size)
+    hists = list(hists)
+    counts = engine.to_counts(np.concatenate([np.asarray(h, np.float32).reshape(1, -1) for h in hists])
+                              if hists else np.zeros((0, engine.dim), np.float32))
+    labels = np.asarray(labels, np.int32).ravel()
+    header = json.dumps({
+        "params": {k: int(params[k]) for k in ("radius", "neighbors", "grid_x", "grid_y")},
+        "face_size": list(face_size), "threshold": float(threshold),
+        "samples": int(len(labels)), "dim": int(engine.dim),
+        "max_count": int(counts.max(initial=0)),
+    }).encode("utf-8")
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(BINARY_MAGIC + struct.pack("<II", BINARY_VERSION, len(header)) + header)
+        for arr in (labels, counts.sum(axis=1, dtype=np.float64) / engine.cell_area, counts.T):
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+    # a new file, not an in-place rewrite: processes that mapped the old one keep a valid view
+    # (on Windows a mapped file cannot be replaced - other processes must have let go of it)
+    tmp.replace(path)
+
+
+def load_binary_model(path, mmap: bool = True):
+    """
+    LBPHEngine over a binary model file. With `mmap` the count matrix is a
+    read-only np.memmap, so loading costs only the header and the pages
+    actually touched, and several processes share one page-cached copy.
+    """
+    with open(path, "rb") as f:
+        head = f.read(16)
+        if len(head) < 16 or head[:8] != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary LBPH model")
+        version, size = struct.unpack("<II", head[8:])
+        if version != BINARY_VERSION:
+            raise ValueError(f"{path}: unsupported model format version {version}")
+        header = json.loads(f.read(size).decode("utf-8"))
+    n, dim = header["samples"], header["dim"]
+    p = header["params"]
+    params = dict(radius=p["radius"], neighbors=p["neighbors"], grid_x=p["grid_x"], grid_y=p["grid_y"],
+                  face_size=tuple(header["face_size"]), threshold=header["threshold"])
+    if n == 0:
+        return LBPHEngine(**params)
+
+    def array(offset, dtype, shape):
+        if mmap:
+            return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+    off = _align(16 + size)
+    labels = np.array(array(off, np.int32, (n,)))
+    off = _align(off + 4 * n)
+    row_sums = np.array(array(off, np.float64, (n,)))
+    off = _align(off + 8 * n)
+    counts = array(off, np.uint16, (dim, n))
+    return LBPHEngine.from_counts(counts, labels, row_sums, max_count=header["max_count"], **params)
+
+
+def write_model(path, hists, labels, params: dict = None, threshold: float = DBL_MAX):
+    """Write a model in the format its file name asks for (.bin binary, else OpenCV YAML)."""
+    if is_binary_model(path):
+        write_binary_model(path, hists, labels, params, threshold)
+    else:
+        write_lbph_model(path, hists, labels, params, threshold)
+
+
+def read_lbph_model(path: Path = MODEL_PATH):
+    """(histograms list, labels array) of a saved model (YAML or binary)."""
+    if is_binary_model(path):
+        engine = load_binary_model(path, mmap=False)
+        return list(engine.templates), engine.labels.copy()
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(str(path))
+    return list(recognizer.getHistograms()), np.asarray(recognizer.getLabels(), np.int32).ravel()
+
+
+if __name__ == "__main__":
+    # python -m app.model_store <src> <dst>  -> convert a model between .yml and .bin
+    import sys
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.model_store <src .yml|.bin> <dst .yml|.bin>")
+    src, dst = Path(sys.argv[1]), Path(sys.argv[2])
+    hists, labels = read_lbph_model(src)
+    write_model(dst, hists, labels)
+    log.info("Wrote %d samples to %s (%.1f MB, was %.1f MB)",
+             len(labels), dst, dst.stat().st_size / 1e6, src.stat().st_size / 1e6)
@@ -0,0 +1,211 @@
+import queue, threading, time
+
+import cv2
+
+from .config import DETECT_ADAPTIVE
+from .backend import detect_faces, predict_faces, classify_prediction, draw_face
+from .utils import get_cascade, log_attendance
+from .metrics import metrics
+from .detection import AdaptiveDetector
+
+
+class StageStats:
+    """Counters and timings for one pipeline stage."""
+
+    def __init__(self, name: str, q: "queue.Queue" = None):
+        self.name = name
+        self.queue = q
+        self.count = 0
+        self.dropped = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def drop(self, n: int = 1):
+        with self._lock:
+            self.dropped += n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "queue": self.queue.qsize() if self.queue is not None else 0,
+                "count": self.count,
+                "dropped": self.dropped,
+                "avg_ms": (self.total / self.count * 1000.0) if self.count else 0.0,
+                "max_ms": self.max * 1000.0,
+            }
+
+
+def put_latest(q: "queue.Queue", item, stats: StageStats = None):
+    """Put `item`, discarding the oldest queued item if the queue is full (drop stale frames)."""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+                if stats is not None:
+                    stats.drop()
+            except queue.Empty:
+                pass
+
+
+class RecognitionPipeline:
+    """
+    Capture -> detect -> recognize, each stage on its own thread(s).
+
+      grabber      1 thread   cap.read()
+      detection    N threads  cvtColor + detectMultiScale + crop/resize
+      recognition  1 thread   batched predict + attendance logging
+
+    Stages are joined by bounded queues. When detection falls behind, the
+    grabber drops the oldest queued frame instead of blocking, and the
+    recognizer skips frames older than the last one it handled, so latency
+    stays bounded by the queue sizes. OpenCV releases the GIL inside
+    read/cvtColor/detectMultiScale/predict, so the stages overlap on
+    multi-core machines.
+
+    Annotated frames are handed to the caller through latest_frame(); only
+    the caller's thread should call cv2.imshow(). With `adaptive`, each
+    detection thread runs its own AdaptiveDetector (detection.py).
+    Attendance rows are logged through `write(id, name)`.
+    """
+
+    def __init__(self, cap, recognizer, face_cascade, id_to_name, presence,
+                 detect_workers: int = 2, queue_size: int = 4,
+                 on_result=None, on_frame=None, adaptive: bool = DETECT_ADAPTIVE,
+                 write=log_attendance):
+        self.cap = cap
+        self.recognizer = recognizer
+        self.face_cascade = face_cascade
+        self.id_to_name = id_to_name
+        self.presence = presence
+        self.detect_workers = max(1, int(detect_workers))
+        self.on_result = on_result
+        self.on_frame = on_frame
+        self.adaptive = adaptive
+        self.write = write
+
+        self.frame_q = queue.Queue(maxsize=max(1, queue_size))
+        self.face_q = queue.Queue(maxsize=max(1, queue_size))
+        self.out_q = queue.Queue(maxsize=1)
+
+        self.stats = {
+            "capture": StageStats("capture", self.frame_q),
+            "detect": StageStats("detect", self.face_q),
+            "recognize": StageStats("recognize", self.out_q),
+        }
+        self._stop = threading.Event()
+        self._eof = threading.Event()
+        self._threads = []
+        self._detectors = []
+        self._last_seq = -1
+
+    # ----- lifecycle -----
+
+    def start(self):
+        self._stop.clear()
+        self._eof.clear()
+        self._detectors = [threading.Thread(target=self._detect, args=(i,), name=f"pipeline-detect-{i}", daemon=True)
+                           for i in range(self.detect_workers)]
+        self._threads = [threading.Thread(target=self._grab, name="pipeline-grab", daemon=True)]
+        self._threads += self._detectors
+        self._threads.append(threading.Thread(target=self._recognize, name="pipeline-recognize", daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._threads = []
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def latest_frame(self, timeout: float = 0.1):
+        """Most recent annotated frame, or None if nothing new arrived within `timeout`."""
+        try:
+            return self.out_q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def snapshot(self):
+        """Per-stage queue depth, processed/dropped counts and timings."""
+        return {name: st.snapshot() for name, st in self.stats.items()}
+
+    # ----- stages -----
+
+    def _grab(self):
+        seq = 0
+        st = self.stats["capture"]
+        timer = metrics().timer("capture")
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            dt = time.perf_counter() - t0
+            st.add(dt)
+            timer.observe(dt)
+            put_latest(self.frame_q, (seq, frame), st)
+            seq += 1
+        self._eof.set()
+
+    def _detect(self, index: int):
+        st = self.stats["detect"]
+        # CascadeClassifier is not safe to share between threads; extra workers load their own
+        face_cascade = self.face_cascade if index == 0 else get_cascade()
+        if self.adaptive:
+            face_cascade = AdaptiveDetector(face_cascade)
+        m = metrics()
+        while not self._stop.is_set():
+            try:
+                seq, frame = self.frame_q.get(timeout=0.1)
+            except queue.Empty:
+                if self._eof.is_set():
+                    break
+                continue
+            t0 = time.perf_counter()
+            with m.time("cvtColor"):
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            boxes = detect_faces(face_cascade, gray)
+            with m.time("resize"):
+                faces = [cv2.resize(gray[y:y+h, x:x+w], (200, 200)) for (x, y, w, h) in boxes]
+            st.add(time.perf_counter() - t0)
+            put_latest(self.face_q, (seq, frame, boxes, faces), st)
+
+    def _recognize(self):
+        st = self.stats["recognize"]
+        while not self._stop.is_set():
+            try:
+                seq, frame, boxes, faces = self.face_q.get(timeout=0.1)
+            except queue.Empty:
+                if self._eof.is_set() and not any(t.is_alive() for t in self._detectors):
+                    break
+                continue
+            if seq <= self._last_seq:
+                st.drop()   # a newer frame was already handled by a faster detector
+                continue
+            self._last_seq = seq
+            t0 = time.perf_counter()
+            for box, (label, confidence) in zip(boxes, predict_faces(self.recognizer, faces)):
+                result, tag, clr = classify_prediction(label, confidence, self.id_to_name, self.presence,
+                                                       self.write)
+                draw_face(frame, box, tag, clr)
+                if self.on_result is not None:
+                    self.on_result(result)
+            st.add(time.perf_counter() - t0)
+            if self.on_frame is not None:
+                self.on_frame(frame)
+            put_latest(self.out_q, frame)
@@ -0,0 +1,105 @@
+import threading
+from datetime import datetime
+
+from .config import ATTENDANCE_COOLDOWN_SEC, ATTENDANCE_ONCE_PER_DAY
+from .storage import storage
+
+
+class PresenceCache:
+    """
+    In-memory record of when each user ID was last logged today.
+
+    take_attendance() asks this cache before writing a row, so repeat
+    sightings of the same person cost a dict lookup instead of disk I/O
+    and duplicate attendance rows.
+
+    once_per_day=True  -> a person is logged at most once per calendar day
+    once_per_day=False -> a person is logged again once `cooldown_sec` has
+                          passed since their last row
+    """
+
+    def __init__(self, cooldown_sec: float = ATTENDANCE_COOLDOWN_SEC,
+                 once_per_day: bool = ATTENDANCE_ONCE_PER_DAY):
+        self.cooldown_sec = float(cooldown_sec)
+        self.once_per_day = bool(once_per_day)
+        self._lock = threading.Lock()
+        self._day = None
+        self._last_seen = {}   # id -> datetime of last logged row
+
+    def rebuild(self, rows=None, now: datetime = None):
+        """
+        Reload today's rows (called at startup and after deletions). `rows` are
+        (date, time, id, name) tuples; by default they come from storage().
+        """
+        now = now or datetime.now()
+        day = now.strftime("%Y-%m-%d")
+        if rows is None:
+            rows = storage().rows_since(day)
+        last_seen = {}
+        for date_str, time_str, pid, _ in rows:
+            if date_str != day:
+                continue
+            try:
+                ts = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                continue
+            if pid not in last_seen or ts > last_seen[pid]:
+                last_seen[pid] = ts
+        with self._lock:
+            self._day = day
+            self._last_seen = last_seen
+
+    def _roll_day(self, now: datetime):
+        day = now.strftime("%Y-%m-%d")
+        if day != self._day:
+            self._day = day
+            self._last_seen = {}
+
+    def is_present(self, pid: int, now: datetime = None) -> bool:
+        """True if `pid` has a row today."""
+        now = now or datetime.now()
+        with self._lock:
+            self._roll_day(now)
+            return int(pid) in self._last_seen
+
+    def check_and_mark(self, pid: int, now: datetime = None) -> bool:
+        """
+        Return True (and remember the time) if a new row should be logged for `pid`,
+        False if the person is inside the cooldown window / already present today.
+        """
+        now = now or datetime.now()
+        pid = int(pid)
+        with self._lock:
+            self._roll_day(now)
+            last = self._last_seen.get(pid)
+            if last is not None:
+                if self.once_per_day:
+                    return False
+                if (now - last).total_seconds() < self.cooldown_sec:
+                    return False
+            self._last_seen[pid] = now
+            return True
+
+    def forget(self, pid: int):
+        with self._lock:
+            self._last_seen.pop(int(pid), None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def presence_cache() -> PresenceCache:
+    """Process-wide presence cache, built from today's attendance rows on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PresenceCache()
+            _cache.rebuild()
+        return _cache
+
+def invalidate_presence():
+    """Rebuild the cache from disk, e.g. after attendance rows were deleted."""
+    with _cache_lock:
+        cache = _cache
+    if cache is not None:
+        cache.rebuild()
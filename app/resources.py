@@ -0,0 +1,88 @@
+import threading, time
+from pathlib import Path
+
+from .config import RESOURCE_CHECK_INTERVAL
+from .model_store import MODEL_PATH
+from .directory import user_directory, _stamp
+from .utils import get_cascade
+from .metrics import log
+
+
+class SharedResources:
+    """
+    Recognizer, face cascade and user index shared by every camera session.
+
+    The model is parsed once and handed to each take_attendance / kiosk
+    session; it is reloaded when lbph_model.yml (or prototypes.npz next to
+    it) changes on disk - size + mtime, checked at most every
+    `check_interval` seconds - or right away after invalidate(), which
+    training and forget_user() call. Cascades are kept per thread, since a
+    CascadeClassifier is not safe to share between threads. Names come from
+    the user directory index, which reloads itself when users.csv changes;
+    id_to_name() hands out its mapping without copying it.
+    """
+
+    def __init__(self, model_path: Path = MODEL_PATH,
+                 check_interval: float = RESOURCE_CHECK_INTERVAL):
+        self.model_path = Path(model_path)
+        self.check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._recognizer = None
+        self._stamps = None
+        self._checked = 0.0
+        self.loads = 0
+
+    def invalidate(self):
+        """Drop the loaded model; the next recognizer() call reads it again."""
+        with self._lock:
+            self._recognizer = None   # also unmaps a binary model, so it can be replaced on Windows
+            self._stamps = None
+
+    def _model_stamps(self):
+        return _stamp(self.model_path), _stamp(self.model_path.parent / "prototypes.npz")
+
+    def recognizer(self):
+        """The loaded model (None until one is trained), reloaded if its files changed."""
+        from .backend import load_recognizer
+        with self._lock:
+            now = time.monotonic()
+            if self._stamps is not None and now - self._checked < self.check_interval:
+                return self._recognizer
+            self._checked = now
+            stamps = self._model_stamps()
+            if stamps != self._stamps:
+                t0 = time.perf_counter()
+                self._recognizer = load_recognizer(self.model_path) if stamps[0] else None
+                self._stamps = stamps
+                self.loads += 1
+                if self._recognizer is not None:
+                    log.info("Model loaded in %.2fs", time.perf_counter() - t0)
+            return self._recognizer
+
+    def cascade(self):
+        """Haar cascade for the calling thread."""
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = self._local.cascade = get_cascade()
+        return cascade
+
+    def id_to_name(self):
+        return user_directory().id_to_name()
+
+
+_resources = None
+_resources_lock = threading.Lock()
+
+def resources() -> SharedResources:
+    """Process-wide shared resources (nothing is loaded until first asked for)."""
+    global _resources
+    with _resources_lock:
+        if _resources is None:
+            _resources = SharedResources()
+        return _resources
+
+def invalidate_resources():
+    """Reload the model on next use, e.g. right after it was retrained."""
+    if _resources is not None:
+        _resources.invalidate()
@@ -0,0 +1,264 @@
+import atexit, json, threading
+from contextlib import nullcontext
+from pathlib import Path
+
+from .config import ROLLUPS_DIR, ROLLUPS_SAVE_INTERVAL
+from .metrics import log
+from .storage import storage
+
+
+class AttendanceRollups:
+    """
+    Per-day, per-user attendance aggregates kept up to date as rows are logged.
+
+    For every day the rollup holds {id: [rows, first time, last time]}, so
+    "who was in on day X, when did they arrive and leave, who is missing"
+    and per-day / per-user / per-department counts are answered from one
+    small dict per day instead of a scan of the history.
+
+    add() is called for every logged row and only marks its day changed. A
+    background thread (start()) persists the changed days every
+    `save_interval` seconds - one small JSON file per day in `path`, then
+    stamp.json with storage().attendance_stamp() - so the cost of a save
+    does not grow with the history and never lands on the logging thread.
+    If the stamp no longer matches when the rollup is loaded (rows written
+    by another process, crash before the last save), it is rebuilt with one
+    pass over storage. Deletions recompute only the affected days.
+
+    `guard`, when set, is the lock writers hold around "append to storage,
+    then add()"; save() takes it while it reads the stamp and copies the
+    changed days, so a saved stamp never covers a row the saved days lack.
+    """
+
+    def __init__(self, path: Path = ROLLUPS_DIR, store=None,
+                 save_interval: float = ROLLUPS_SAVE_INTERVAL):
+        self.path = Path(path)
+        self.store = store
+        self.save_interval = float(save_interval)
+        self.guard = None
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._days = {}        # "YYYY-MM-DD" -> {id: [rows, first, last]}
+        self._changed = set()  # days not saved since they changed
+        self._stop = threading.Event()
+        self._thread = None
+        self.rebuilds = 0
+
+    def _store(self):
+        return self.store or storage()
+
+    # ----- loading / persistence -----
+
+    def load(self):
+        """Load the saved rollup, rebuilding it if it is missing or out of date."""
+        try:
+            with open(self.path / "stamp.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != 2 or meta.get("stamp") != self._store().attendance_stamp():
+                meta = None
+            else:
+                days = {}
+                for file in self.path.glob("????-??-??.json"):
+                    with open(file, "r", encoding="utf-8") as f:
+                        days[file.stem] = {int(k): v for k, v in json.load(f).items()}
+        except (OSError, ValueError):
+            meta = None
+        if meta is None:
+            self.rebuild()
+            return self
+        with self._lock:
+            self._days = days
+            self._changed = set()
+        return self
+
+    def rebuild(self, start: str = None, end: str = None):
+        """Recompute all days (or the days start..end) from storage."""
+        days = {}
+        for rows in self._store().iter_attendance(start, end):
+            for date_str, time_str, pid, _ in rows:
+                _add(days, date_str, time_str, int(pid))
+        with self._lock:
+            old = [d for d in self._days if (start is None or d >= start) and (end is None or d <= end)]
+            for d in old:
+                del self._days[d]
+            self._days.update(days)
+            self._changed.update(old, days)
+            self.rebuilds += 1
+
+    def save(self):
+        """Write the days changed since the last save, then the stamp."""
+        with self._save_lock:
+            with self.guard or nullcontext(), self._lock:
+                if not self._changed:
+                    return
+                stamp = self._store().attendance_stamp()
+                changed = {d: ({str(k): v[:] for k, v in self._days[d].items()} if d in self._days else None)
+                           for d in self._changed}
+                self._changed = set()
+            try:
+                self.path.mkdir(parents=True, exist_ok=True)
+                (self.path / "stamp.json").unlink(missing_ok=True)   # day files and stamp change together
+                for d, users in changed.items():
+                    file = self.path / f"{d}.json"
+                    if users is None:
+                        file.unlink(missing_ok=True)
+                    else:
+                        _write_json(file, users)
+                _write_json(self.path / "stamp.json", {"version": 2, "stamp": stamp})
+            except OSError:
+                with self._lock:
+                    self._changed.update(changed)   # retried by the next save
+                raise
+
+    def start(self):
+        """Save changed days every `save_interval` seconds on a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._save_loop, name="rollups-save", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the save thread and save what changed."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        self.save()
+
+    def _save_loop(self):
+        while not self._stop.wait(self.save_interval):
+            try:
+                self.save()
+            except Exception as e:
+                log.error("Could not save the attendance rollups: %s", e)
+
+    # ----- updates -----
+
+    def add(self, date_str: str, time_str: str, pid: int):
+        """Account for one newly logged row."""
+        with self._lock:
+            _add(self._days, date_str, time_str, int(pid))
+            self._changed.add(date_str)
+
+    def refresh_days(self, days):
+        """
+        Recompute the given days from storage (after rows of those days were
+        deleted) with one pass over min(days)..max(days).
+        """
+        days = {str(d) for d in days}
+        if not days:
+            return
+        fresh = {}
+        for rows in self._store().iter_attendance(min(days), max(days)):
+            for date_str, time_str, pid, _ in rows:
+                if date_str in days:
+                    _add(fresh, date_str, time_str, int(pid))
+        with self._lock:
+            for d in days:
+                self._days.pop(d, None)
+            self._days.update(fresh)
+            self._changed.update(days)
+            self.rebuilds += 1
+
+    def refresh_recent(self, days):
+        """
+        Like refresh_days() for days at the end of the history: reads only
+        storage().rows_since(min(days)), a tail scan.
+        """
+        days = {str(d) for d in days}
+        if not days:
+            return
+        fresh = {}
+        for date_str, time_str, pid, _ in self._store().rows_since(min(days)):
+            if date_str in days:
+                _add(fresh, date_str, time_str, int(pid))
+        with self._lock:
+            for d in days:
+                self._days.pop(d, None)
+            self._days.update(fresh)
+            self._changed.update(days)
+
+    # ----- queries -----
+
+    def day(self, date_str: str):
+        """{id: (rows, first time, last time)} for one day."""
+        with self._lock:
+            return {pid: tuple(v) for pid, v in self._days.get(date_str, {}).items()}
+
+    def dates(self, start: str = None, end: str = None):
+        with self._lock:
+            return sorted(d for d in self._days if (start is None or d >= start) and (end is None or d <= end))
+
+    def daily_counts(self, start: str = None, end: str = None, roster=None):
+        """
+        [(date, present users, rows, absent users)] per day; absent is counted
+        against `roster` (a set of registered ids) when given.
+        """
+        out = []
+        with self._lock:
+            for d in self.dates(start, end):
+                users = self._days[d]
+                rows = sum(v[0] for v in users.values())
+                absent = len(set(roster) - set(users)) if roster is not None else None
+                out.append((d, len(users), rows, absent))
+        return out
+
+    def user_stats(self, pid: int, start: str = None, end: str = None):
+        """Days present, rows, and first/last (date, time) seen for one user."""
+        pid = int(pid)
+        days, rows, first, last = 0, 0, None, None
+        with self._lock:
+            for d in self.dates(start, end):
+                v = self._days[d].get(pid)
+                if v is None:
+                    continue
+                days += 1
+                rows += v[0]
+                first = first or (d, v[1])
+                last = (d, v[2])
+        return {"id": pid, "days": days, "rows": rows, "first": first, "last": last}
+
+    def department_counts(self, date_str: str, departments: dict):
+        """{department: present users} for one day; `departments` maps id -> department."""
+        out = {}
+        for pid in self.day(date_str):
+            dept = departments.get(pid, "")
+            out[dept] = out.get(dept, 0) + 1
+        return out
+
+    def absentees(self, date_str: str, roster):
+        """Registered ids (from `roster`) with no row on that day, sorted."""
+        present = self.day(date_str)
+        return sorted(pid for pid in roster if pid not in present)
+
+
+def _write_json(path: Path, data):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    tmp.replace(path)
+
+
+def _add(days: dict, date_str: str, time_str: str, pid: int):
+    entry = days.setdefault(date_str, {}).get(pid)
+    if entry is None:
+        days[date_str][pid] = [1, time_str, time_str]
+    else:
+        entry[0] += 1
+        if time_str < entry[1]:
+            entry[1] = time_str
+        if time_str > entry[2]:
+            entry[2] = time_str
+
+
+_rollups = None
+_rollups_lock = threading.Lock()
+
+def attendance_rollups() -> AttendanceRollups:
+    """Process-wide rollups, loaded (or rebuilt) on first use, saved in the background and at exit."""
+    global _rollups
+    with _rollups_lock:
+        if _rollups is None:
+            _rollups = AttendanceRollups().load().start()
+            atexit.register(_rollups.stop)
+        return _rollups
@@ -0,0 +1,331 @@
+"""
+Recognition server: several cameras (or video files, image folders,
+synthetic streams) recognized by one process, without windows.
+
+    python -m app.server                          # SERVER_SOURCES from config.py
+    python -m app.server 0 1 entrance.mp4 --workers 6
+    python -m app.server synthetic synthetic synthetic synthetic --seconds 60
+"""
+import argparse, queue, threading, time
+from collections import deque
+from datetime import datetime
+
+from .config import (
+    SERVER_SOURCES, SERVER_DETECT_WORKERS, SERVER_SOURCE_FPS, SERVER_LOOP,
+    SERVER_WRITE_BATCH, SERVER_WRITE_INTERVAL, SERVER_STATS_INTERVAL
+)
+from .backend import RecognitionSession, open_camera
+from .resources import resources
+from .presence import presence_cache
+from .utils import get_cascade, log_attendance_rows
+from .metrics import log, metrics, serve_metrics, profiled
+
+
+class AttendanceWriter:
+    """
+    The one thread that stores attendance for every camera. submit() stamps
+    the row with the current time and queues it; the writer stores up to
+    `batch` rows per call (one journal write or one SQLite transaction), at
+    most `interval` seconds after the first of them was queued.
+    """
+
+    def __init__(self, batch: int = SERVER_WRITE_BATCH, interval: float = SERVER_WRITE_INTERVAL):
+        self.batch = max(1, int(batch))
+        self.interval = float(interval)
+        self.rows = 0
+        self.batches = 0
+        self._q = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, pid: int, name: str):
+        """Queue one row (same signature as utils.log_attendance)."""
+        now = datetime.now()
+        self._q.put((now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"), int(pid), name))
+        return True
+
+    def stop(self):
+        """Write whatever is queued, then end the thread."""
+        if self._thread is not None:
+            self._q.put(None)
+            self._thread.join(timeout=10.0)
+            self._thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._q.get()
+            if item is None:
+                break
+            rows = [item]
+            deadline = time.monotonic() + self.interval
+            while len(rows) < self.batch:
+                try:
+                    item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                rows.append(item)
+            self._write(rows)
+
+    def _write(self, rows):
+        rows.sort(key=lambda r: (r[0], r[1], r[2]))   # keep the journal in key order
+        try:
+            with metrics().time("write_batch"):
+                log_attendance_rows(rows)
+            self.rows += len(rows)
+            self.batches += 1
+        except Exception as e:
+            log.error("Could not write %d attendance rows: %s", len(rows), e)
+
+
+class CameraStream:
+    """
+    One frame source of the server: a grabber thread that keeps only the
+    newest frame, and a headless RecognitionSession holding the source's
+    tracker, event rate limits and throughput counters.
+    """
+
+    def __init__(self, name: str, spec, server: "RecognitionServer"):
+        self.name = name
+        self.spec = spec
+        self.server = server
+        self.camera = isinstance(spec, int) or str(spec).isdigit()
+        self.cascade = get_cascade()   # used by one worker at a time (see RecognitionServer)
+        self.session = RecognitionSession(
+            on_result=lambda result: server._result(self, result), show_window=False,
+            source=spec, pipelined=False, write=server.writer.submit,
+        )
+        self.frame = None      # newest frame not yet handed to a worker
+        self.queued = False    # waiting in the server's ready queue
+        self.busy = False      # a worker is processing one of its frames
+        self.grabbed = 0
+        self.dropped = 0
+        self.finished = False
+        self._thread = None
+
+    def start(self):
+        self.session.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._grab, name=f"grab-{self.name}", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: float = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _grab(self):
+        server = self.server
+        pace = None if self.camera or not server.fps else 1.0 / server.fps
+        cap = open_camera(self.spec)
+        if not cap.isOpened():
+            log.error("%s: cannot open source %r", self.name, self.spec)
+        next_t = time.monotonic()
+        reopened = False
+        while cap.isOpened() and not server._stop.is_set():
+            ok, frame = cap.read()
+            if not ok:
+                if not server.loop or self.camera or reopened:
+                    break
+                cap.release()
+                cap = open_camera(self.spec)
+                reopened = True    # a source that ends right after reopening is not retried
+                continue
+            reopened = False
+            self.grabbed += 1
+            server._offer(self, frame)
+            if pace:
+                next_t = max(next_t + pace, time.monotonic())
+                server._stop.wait(next_t - time.monotonic())
+        cap.release()
+        self.finished = True
+        server._wake()
+
+    def stats(self):
+        return {"source": str(self.spec), "grabbed": self.grabbed, "processed": self.session.frames,
+                "dropped": self.dropped, "fps": round(self.session.fps(), 2),
+                "people_per_min": round(self.session.people_per_minute(), 2)}
+
+
+class RecognitionServer:
+    """
+    Recognize faces from several frame sources in one process.
+
+    Every source gets a grabber thread; a pool of `workers` threads does
+    the detection and recognition. A source whose newest frame is waiting
+    sits in one FIFO ready queue at most once, and a source is processed by
+    one worker at a time, so sources are served round-robin: a fast camera
+    cannot starve a slow one, and when the workers fall behind each source
+    drops its own stale frames instead of queueing them. OpenCV releases
+    the GIL in cvtColor / detectMultiScale / predict, so the workers use
+    several cores.
+
+    All sources share the recognizer, cascade file, user index and
+    presence cache (resources.py, presence.py); retraining is picked up
+    without a restart. Attendance rows of every source go through one
+    AttendanceWriter. `on_result(source_name, result)` is called from the
+    worker threads with the same events as RecognitionSession.
+    """
+
+    def __init__(self, sources=SERVER_SOURCES, workers: int = SERVER_DETECT_WORKERS,
+                 fps: float = SERVER_SOURCE_FPS, loop: bool = SERVER_LOOP, on_result=None):
+        self.workers = max(1, int(workers))
+        self.fps = fps
+        self.loop = loop
+        self.on_result = on_result
+        self.writer = AttendanceWriter()
+        self.streams = [CameraStream(f"cam{i}", spec, self) for i, spec in enumerate(sources)]
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+
+    # ----- scheduling -----
+
+    def _offer(self, stream: CameraStream, frame):
+        with self._cond:
+            if stream.frame is not None:
+                stream.dropped += 1
+            stream.frame = frame
+            if not stream.queued and not stream.busy:
+                stream.queued = True
+                self._ready.append(stream)
+                self._cond.notify()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _next(self):
+        """The next source with a waiting frame, or None once the server stops."""
+        with self._cond:
+            while not self._ready:
+                if self._stop.is_set():
+                    return None, None
+                self._cond.wait(0.5)
+            stream = self._ready.popleft()
+            stream.queued = False
+            stream.busy = True
+            frame, stream.frame = stream.frame, None
+            return stream, frame
+
+    def _done(self, stream: CameraStream):
+        with self._cond:
+            stream.busy = False
+            if stream.frame is not None and not stream.queued:
+                stream.queued = True
+                self._ready.append(stream)
+                self._cond.notify()
+
+    def _work(self):
+        shared = resources()
+        presence = presence_cache()
+        m = metrics()
+        while True:
+            stream, frame = self._next()
+            if stream is None:
+                return
+            try:
+                recognizer = shared.recognizer()
+                if recognizer is not None:
+                    with m.time("server_frame"):
+                        stream.session.process_frame(frame, recognizer, stream.cascade,
+                                                     shared.id_to_name(), presence)
+            except Exception as e:
+                log.error("%s: frame failed: %s", stream.name, e)
+            finally:
+                self._done(stream)
+
+    def _result(self, stream: CameraStream, result):
+        if self.on_result is not None:
+            self.on_result(stream.name, result)
+
+    # ----- lifecycle -----
+
+    def run(self, seconds: float = None):
+        """
+        Blocking: serve until stop(), `seconds` elapse or every source has
+        ended. Returns "no_model" or the final stats().
+        """
+        if resources().recognizer() is None:
+            return "no_model"
+        self._stop.clear()
+        self.writer.start()
+        self._threads = [threading.Thread(target=self._work, name=f"server-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+        for s in self.streams:
+            s.start()
+        log.info("Serving %d sources with %d workers", len(self.streams), self.workers)
+
+        started = time.monotonic()
+        next_stats = started + SERVER_STATS_INTERVAL if SERVER_STATS_INTERVAL else None
+        try:
+            while not self._stop.wait(0.2):
+                now = time.monotonic()
+                if all(s.finished for s in self.streams):
+                    break
+                if seconds is not None and now - started >= seconds:
+                    break
+                if next_stats is not None and now >= next_stats:
+                    next_stats = now + SERVER_STATS_INTERVAL
+                    self.log_stats()
+        finally:
+            self.stop()
+        return self.stats()
+
+    def stop(self):
+        """Stop grabbing, let the workers finish their frames and flush the writer."""
+        self._stop.set()
+        self._wake()
+        for s in self.streams:
+            s.join(timeout=5.0)
+        for t in self._threads:
+            t.join(timeout=5.0)
+        self._threads = []
+        self.writer.stop()
+
+    def stats(self):
+        return {"sources": {s.name: s.stats() for s in self.streams},
+                "total_fps": round(sum(s.session.fps() for s in self.streams), 2),
+                "rows_written": self.writer.rows, "write_batches": self.writer.batches}
+
+    def log_stats(self):
+        for name, st in self.stats()["sources"].items():
+            log.info("%s: %.1f fps, %d frames, %d dropped, %.1f people/min",
+                     name, st["fps"], st["processed"], st["dropped"], st["people_per_min"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("sources", nargs="*", help="frame sources (default: SERVER_SOURCES)")
+    ap.add_argument("--workers", type=int, default=SERVER_DETECT_WORKERS)
+    ap.add_argument("--fps", type=float, default=SERVER_SOURCE_FPS, help="pace of non-camera sources (0: unpaced)")
+    ap.add_argument("--no-loop", action="store_true", help="stop when video files / folders end")
+    ap.add_argument("--seconds", type=float, help="stop after this long")
+    args = ap.parse_args()
+
+    serve_metrics()
+    server = RecognitionServer(args.sources or SERVER_SOURCES, workers=args.workers,
+                               fps=args.fps or None, loop=not args.no_loop)
+    try:
+        with profiled("server"):
+            result = server.run(args.seconds)
+    except KeyboardInterrupt:
+        result = server.stats()   # run() already stopped the server
+    if result == "no_model":
+        log.error("No trained model. Train one first.")
+        return
+    server.log_stats()
+    log.info("Total %.1f fps; %d rows in %d writes",
+             result["total_fps"], result["rows_written"], result["write_batches"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .config import FRAME_WIDTH, FRAME_HEIGHT
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp"}
+
+
+class FrameSource(ABC):
+    """
+    Base for non-camera frame sources. Implements the part of the
+    cv2.VideoCapture interface the app uses - read(), isOpened(), set(),
+    get(), release() - so a source can stand in for the webcam anywhere.
+    `fps` paces read() like a real camera; None returns frames as fast as
+    they can be produced (benchmarks).
+    """
+
+    def __init__(self, fps: float = None, width: int = FRAME_WIDTH, height: int = FRAME_HEIGHT):
+        self.fps = fps
+        self.width, self.height = int(width), int(height)
+        self.frames = 0
+        self._next = None
+        self._open = True
+
+    def isOpened(self):
+        return self._open
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps or 0)
+        return 0.0
+
+    def release(self):
+        self._open = False
+
+    def read(self):
+        if not self._open:
+            return False, None
+        if self.fps:
+            now = time.perf_counter()
+            if self._next is not None and now < self._next:
+                time.sleep(self._next - now)
+            self._next = max(now, self._next or now) + 1.0 / self.fps
+        frame = self._frame()
+        if frame is None:
+            return False, None
+        self.frames += 1
+        return True, frame
+
+    @abstractmethod
+    def _frame(self):
+        """The next frame, or None when the source has ended."""
+
+
+class ImageSequenceSource(FrameSource):
+    """Frames from the images of a directory (sorted by name); `loop` restarts at the end."""
+
+    def __init__(self, directory, loop: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.paths = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        self.loop = loop
+        self._i = 0
+        self._open = bool(self.paths)
+
+    def _frame(self):
+        if self._i >= len(self.paths):
+            if not self.loop:
+                return None
+            self._i = 0
+        img = cv2.imread(str(self.paths[self._i]), cv2.IMREAD_COLOR)
+        self._i += 1
+        return img
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generated frames: a textured background with `faces` face images pasted
+    at slowly drifting positions, `count` frames long (None = endless).
+    `images` are 200x200 grayscale faces (synthetic by default); `truth`
+    holds the (x, y, w, h) boxes of the last frame, so recognition can be
+    timed even when the Haar cascade finds nothing in synthetic faces.
+    """
+
+    def __init__(self, count: int = None, faces: int = 1, images=None, face_px: int = 160,
+                 seed: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.count = count
+        self.faces = max(0, int(faces))
+        self.face_px = int(face_px)
+        self.rng = np.random.default_rng(seed)
+        if images is None:
+            images = _synthetic_faces(8, seed)
+        self.images = [cv2.resize(np.asarray(img, np.uint8), (self.face_px, self.face_px)) for img in images]
+        bg = cv2.GaussianBlur(self.rng.integers(0, 256, (self.height, self.width), dtype=np.uint8), (31, 31), 0)
+        self.background = cv2.cvtColor(bg, cv2.COLOR_GRAY2BGR)
+        self._pos = [self._random_pos() for _ in range(self.faces)]
+        self._who = [int(self.rng.integers(len(self.images))) for _ in range(self.faces)]
+        self.truth = []
+
+    def _random_pos(self):
+        return [float(self.rng.uniform(0, max(1, self.width - self.face_px))),
+                float(self.rng.uniform(0, max(1, self.height - self.face_px)))]
+
+    def _frame(self):
+        if self.count is not None and self.frames >= self.count:
+            return None
+        frame = self.background.copy()
+        self.truth = []
+        for i, (pos, who) in enumerate(zip(self._pos, self._who)):
+            pos[0] = min(max(0.0, pos[0] + self.rng.normal(0, 3)), self.width - self.face_px)
+            pos[1] = min(max(0.0, pos[1] + self.rng.normal(0, 3)), self.height - self.face_px)
+            x, y, s = int(pos[0]), int(pos[1]), self.face_px
+            frame[y:y+s, x:x+s] = self.images[who][..., None]
+            self.truth.append((x, y, s, s))
+        noise = self.rng.integers(-6, 7, frame.shape, dtype=np.int16)
+        return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def _synthetic_faces(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return [cv2.GaussianBlur(rng.integers(0, 256, (200, 200), dtype=np.uint8), (15, 15), 0) for _ in range(n)]
+
+
+def open_source(spec, fps: float = None, loop: bool = False):
+    """
+    Open a frame source from a spec:
+      0, "1"            - camera index (cv2.VideoCapture)
+      "synthetic[:N]"   - SyntheticSource, N frames (endless without N)
+      a directory       - ImageSequenceSource over its images
+      anything else     - a video file or stream URL (cv2.VideoCapture)
+    """
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return cv2.VideoCapture(int(spec))
+    spec = str(spec)
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        count = spec.split(":", 1)[1] if ":" in spec else ""
+        return SyntheticSource(count=int(count) if count else None, fps=fps)
+    if Path(spec).is_dir():
+        return ImageSequenceSource(spec, loop=loop, fps=fps)
+    return cv2.VideoCapture(spec)
@@ -0,0 +1,53 @@
+import queue, threading
+
+from .config import SPEECH_RATE, SPEECH_MAX_PENDING
+from .metrics import log
+
+
+class SpeechWorker:
+    """
+    Text-to-speech on its own thread.
+
+    say() only queues the text, so callers (the Tk thread) never wait for
+    runAndWait(). The pyttsx3 engine is created and driven by the worker
+    thread alone. When more than `max_pending` messages are waiting, the
+    oldest are dropped - stale prompts are worse than none.
+    """
+
+    def __init__(self, rate: int = SPEECH_RATE, max_pending: int = SPEECH_MAX_PENDING):
+        self.rate = rate
+        self.max_pending = max(1, int(max_pending))
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+
+    def say(self, text: str):
+        while self._queue.qsize() >= self.max_pending:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put(text)
+
+    def stop(self):
+        self._queue.put(None)
+
+    def _run(self):
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+            engine.setProperty("rate", self.rate)
+        except Exception as e:
+            log.warn("Text-to-speech unavailable: %s", e)
+            engine = None
+        while True:
+            text = self._queue.get()
+            if text is None:
+                break
+            if engine is None:
+                continue
+            try:
+                engine.say(text)
+                engine.runAndWait()
+            except Exception:
+                pass
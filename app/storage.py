@@ -0,0 +1,503 @@
+import atexit, csv, sqlite3, threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:   # pandas is imported on first use; it costs ~0.5s at startup
+    import pandas as pd
+
+from .config import (
+    USERS_CSV, ATTENDANCE_CSV, STORAGE_BACKEND, STORAGE_DB,
+    JOURNAL_FSYNC_POLICY, JOURNAL_FSYNC_EVERY, JOURNAL_FSYNC_INTERVAL,
+    JOURNAL_COMPACT_INTERVAL
+)
+from .journal import AttendanceJournal, rows_since, delete_rows
+from .metrics import log
+
+USER_FIELDS = ["id", "name", "sex", "department"]
+ATTENDANCE_FIELDS = ["date", "time", "id", "name"]
+USER_DTYPES = {"id": int, "name": str, "sex": str, "department": str}
+ATTENDANCE_DTYPES = {"date": str, "time": str, "id": int, "name": str}
+
+
+def _stamp(path: Path):
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class CsvStorage:
+    """
+    users.csv + attendance.csv (the original layout). Attendance rows are
+    appended through AttendanceJournal; reads re-parse the whole file.
+    """
+
+    name = "csv"
+
+    def __init__(self, users_csv: Path = USERS_CSV, attendance_csv: Path = ATTENDANCE_CSV):
+        self.users_csv = Path(users_csv)
+        self.attendance_csv = Path(attendance_csv)
+        self._journal = None
+        self._lock = threading.Lock()
+        self._views = {}          # query -> sorted/filtered frame, valid for self._view_stamp
+        self._view_stamp = None
+
+    def journal(self) -> AttendanceJournal:
+        with self._lock:
+            if self._journal is None:
+                self._journal = AttendanceJournal(
+                    self.attendance_csv,
+                    fsync_policy=JOURNAL_FSYNC_POLICY,
+                    fsync_every=JOURNAL_FSYNC_EVERY,
+                    fsync_interval=JOURNAL_FSYNC_INTERVAL,
+                    compact_interval=JOURNAL_COMPACT_INTERVAL,
+                )
+            return self._journal
+
+    # ----- users -----
+
+    def users_df(self):
+        import pandas as pd
+        if not self.users_csv.exists():
+            pd.DataFrame(columns=USER_FIELDS).to_csv(self.users_csv, index=False)
+        return pd.read_csv(self.users_csv, dtype=USER_DTYPES)
+
+    def save_users_df(self, df: "pd.DataFrame"):
+        df.to_csv(self.users_csv, index=False)
+
+    def user_records(self):
+        """(id, name, sex, department) tuples with "" for missing values, in file order."""
+        if not self.users_csv.exists():
+            return []
+        out = []
+        try:
+            with open(self.users_csv, "r", newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        pid = int(str(row.get("id") or "").strip())
+                    except ValueError:
+                        continue
+                    out.append((pid, row.get("name") or "", row.get("sex") or "", row.get("department") or ""))
+        except (OSError, ValueError):
+            return []
+        return out
+
+    def users_version(self):
+        """Changes whenever the users table changes."""
+        return _stamp(self.users_csv)
+
+    def attendance_stamp(self):
+        """Changes whenever attendance rows are added or removed (file size + mtime)."""
+        stamp = _stamp(self.attendance_csv)
+        return list(stamp) if stamp else None
+
+    # ----- attendance -----
+
+    def attendance_df(self):
+        import pandas as pd
+        if not self.attendance_csv.exists():
+            pd.DataFrame(columns=ATTENDANCE_FIELDS).to_csv(self.attendance_csv, index=False)
+        return pd.read_csv(self.attendance_csv, dtype=ATTENDANCE_DTYPES)
+
+    def save_attendance_df(self, df: "pd.DataFrame"):
+        """Rewrite attendance.csv (used for deletions); the journal reopens on its next append."""
+        with self.journal().exclusive():
+            df.to_csv(self.attendance_csv, index=False)
+
+    def append_attendance(self, date_str: str, time_str: str, pid: int, name: str):
+        self.journal().append(date_str, time_str, int(pid), name)
+
+    def append_attendance_many(self, rows):
+        """Append (date, time, id, name) rows in one journal write."""
+        self.journal().append_many(rows)
+
+    def delete_attendance(self, keys=None, start: str = None, end: str = None, pid: int = None):
+        """
+        Delete rows matching any (date, time, id) in `keys`, or - when keys is
+        None - every row inside the optional date range / of user `pid`.
+        One pass over the raw file with a hashed key set (journal.delete_rows).
+        Returns the number of rows deleted.
+        """
+        with self.journal().exclusive():
+            return delete_rows(self.attendance_csv, keys, start=start, end=end, pid=pid)
+
+    def attendance_between(self, start: str = None, end: str = None):
+        """Rows with start <= date <= end (inclusive "YYYY-MM-DD" strings; None = open)."""
+        df = self.attendance_df()
+        if start is not None:
+            df = df[df["date"] >= start]
+        if end is not None:
+            df = df[df["date"] <= end]
+        return df.reset_index(drop=True)
+
+    def rows_since(self, date_str: str):
+        """(date, time, id, name) rows dated `date_str` or later (tail scan of the journal)."""
+        return rows_since(self.attendance_csv, date_str)
+
+    def query_attendance(self, offset: int = 0, limit: int = 100, sort: str = "date", desc: bool = False,
+                         start: str = None, end: str = None, pid: int = None, department: str = None):
+        """
+        One page of attendance rows as (date, time, id, name) tuples plus the
+        total number of matching rows. The file is parsed once per change and
+        each filtered, sorted view is kept, so paging through it is a slice.
+        """
+        key = (sort, bool(desc), start, end, pid, department)
+        with self._lock:
+            stamp = (_stamp(self.attendance_csv), self.users_version())
+            if stamp != self._view_stamp:
+                self._views, self._view_stamp = {}, stamp
+            view = self._views.get(key)
+        if view is None:
+            df = self.attendance_between(start, end)
+            if pid is not None:
+                df = df[df["id"] == int(pid)]
+            if department is not None:
+                ids = {u[0] for u in self.user_records() if u[3] == department}
+                df = df[df["id"].isin(ids)]
+            df = df.sort_values(_sort_columns(sort), ascending=not desc, kind="stable")
+            view = df[ATTENDANCE_FIELDS].reset_index(drop=True)
+            with self._lock:
+                if self._view_stamp == stamp:
+                    if len(self._views) >= 8:
+                        self._views.pop(next(iter(self._views)))
+                    self._views[key] = view
+        page = view.iloc[offset:offset + limit]
+        return list(page.itertuples(index=False, name=None)), len(view)
+
+    def iter_attendance(self, start: str = None, end: str = None, pid: int = None,
+                        department: str = None, chunk: int = 50000):
+        """
+        Yield lists of (date, time, id, name) rows in date/time order, at most
+        `chunk` rows per list, reading the file in chunks so memory does not
+        grow with the history. The journal keeps attendance.csv chronological,
+        so each chunk only needs a local sort.
+        """
+        for df in self._filtered_chunks(start, end, pid, department, chunk):
+            df = df.sort_values(["date", "time", "name"], kind="stable")
+            yield list(df[ATTENDANCE_FIELDS].itertuples(index=False, name=None))
+
+    def count_attendance(self, start: str = None, end: str = None, pid: int = None, department: str = None):
+        return sum(len(df) for df in self._filtered_chunks(start, end, pid, department))
+
+    def _filtered_chunks(self, start=None, end=None, pid=None, department=None, chunk: int = 50000):
+        if not self.attendance_csv.exists():
+            return
+        ids = None
+        if department is not None:
+            ids = {u[0] for u in self.user_records() if u[3] == department}
+        import pandas as pd
+        for df in pd.read_csv(self.attendance_csv, dtype=ATTENDANCE_DTYPES, chunksize=chunk):
+            if start is not None:
+                df = df[df["date"] >= start]
+            if end is not None:
+                df = df[df["date"] <= end]
+            if pid is not None:
+                df = df[df["id"] == int(pid)]
+            if ids is not None:
+                df = df[df["id"].isin(ids)]
+            if len(df):
+                yield df
+
+    def query_users(self, offset: int = 0, limit: int = 100, sort: str = "id", desc: bool = False,
+                    department: str = None, search: str = None):
+        """One page of (id, name, sex, department) tuples plus the matching total."""
+        rows = _filter_users(self.user_records(), department, search)
+        col = USER_FIELDS.index(sort) if sort in USER_FIELDS else 0
+        rows.sort(key=lambda r: (str(r[col]).lower() if col else r[0]), reverse=desc)
+        return rows[offset:offset + limit], len(rows)
+
+    def departments(self):
+        return sorted({u[3] for u in self.user_records() if u[3]})
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.stop()
+
+
+class SqliteStorage:
+    """
+    users + attendance in one SQLite database.
+
+    WAL mode lets a recognition process append while the UI reads or
+    deletes. Attendance is indexed on (date, id) and on id, so "today's
+    rows", date ranges and one user's history are index range scans.
+    Statements are parameterized and reused from sqlite3's statement cache,
+    and each thread gets its own connection.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL DEFAULT '',
+        sex TEXT NOT NULL DEFAULT '',
+        department TEXT NOT NULL DEFAULT ''
+    );
+    CREATE TABLE IF NOT EXISTS attendance (
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        name TEXT NOT NULL DEFAULT ''
+    );
+    CREATE INDEX IF NOT EXISTS attendance_date_id ON attendance(date, id);
+    CREATE INDEX IF NOT EXISTS attendance_id ON attendance(id);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    INSERT OR IGNORE INTO meta VALUES ('users_version', 0);
+    CREATE TRIGGER IF NOT EXISTS users_ins AFTER INSERT ON users BEGIN
+        UPDATE meta SET value = value + 1 WHERE key = 'users_version'; END;
+    CREATE TRIGGER IF NOT EXISTS users_upd AFTER UPDATE ON users BEGIN
+        UPDATE meta SET value = value + 1 WHERE key = 'users_version'; END;
+    CREATE TRIGGER IF NOT EXISTS users_del AFTER DELETE ON users BEGIN
+        UPDATE meta SET value = value + 1 WHERE key = 'users_version'; END;
+    """
+
+    def __init__(self, path: Path = STORAGE_DB, timeout: float = 10.0):
+        self.path = Path(path)
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        self._conns = []
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as con:
+            con.executescript(self.SCHEMA)
+
+    def _conn(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(str(self.path), timeout=self.timeout, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+            with self._lock:
+                self._conns.append(con)
+        return con
+
+    # ----- users -----
+
+    def users_df(self):
+        import pandas as pd
+        df = pd.read_sql_query("SELECT id, name, sex, department FROM users ORDER BY id", self._conn())
+        return df.astype({"id": int})
+
+    def save_users_df(self, df: "pd.DataFrame"):
+        rows = [(int(r["id"]), _text(r.get("name")), _text(r.get("sex")), _text(r.get("department")))
+                for r in df.to_dict("records")]
+        with self._conn() as con:
+            con.execute("DELETE FROM users")
+            con.executemany("INSERT OR REPLACE INTO users (id, name, sex, department) VALUES (?, ?, ?, ?)", rows)
+
+    def user_records(self):
+        return self._conn().execute("SELECT id, name, sex, department FROM users ORDER BY id").fetchall()
+
+    def users_version(self):
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'users_version'").fetchone()[0]
+
+    def attendance_stamp(self):
+        return list(self._conn().execute("SELECT COUNT(*), MAX(rowid) FROM attendance").fetchone())
+
+    # ----- attendance -----
+
+    def _attendance(self, where: str = "", params=()):
+        import pandas as pd
+        df = pd.read_sql_query(f"SELECT date, time, id, name FROM attendance {where} ORDER BY rowid",
+                               self._conn(), params=params)
+        return df.astype({"id": int})
+
+    def attendance_df(self):
+        return self._attendance()
+
+    def save_attendance_df(self, df: "pd.DataFrame"):
+        rows = [(str(r["date"]), str(r["time"]), int(r["id"]), _text(r.get("name")))
+                for r in df.to_dict("records")]
+        with self._conn() as con:
+            con.execute("DELETE FROM attendance")
+            con.executemany("INSERT INTO attendance (date, time, id, name) VALUES (?, ?, ?, ?)", rows)
+        self._conn().execute("ANALYZE")   # refresh planner stats after a bulk load
+
+    def append_attendance(self, date_str: str, time_str: str, pid: int, name: str):
+        with self._conn() as con:
+            con.execute("INSERT INTO attendance (date, time, id, name) VALUES (?, ?, ?, ?)",
+                        (date_str, time_str, int(pid), name or ""))
+
+    def append_attendance_many(self, rows):
+        """Append (date, time, id, name) rows in one transaction."""
+        with self._conn() as con:
+            con.executemany("INSERT INTO attendance (date, time, id, name) VALUES (?, ?, ?, ?)",
+                            [(d, t, int(pid), name or "") for d, t, pid, name in rows])
+
+    def delete_attendance(self, keys=None, start: str = None, end: str = None, pid: int = None):
+        """Like CsvStorage.delete_attendance; each key is an indexed (date, id) lookup."""
+        with self._conn() as con:
+            if keys is not None:
+                before = con.total_changes
+                con.executemany("DELETE FROM attendance WHERE date = ? AND id = ? AND time = ?",
+                                [(str(d), int(i), str(t)) for d, t, i in keys])
+                return con.total_changes - before
+            where, params = _range_where(start, end, pid)
+            return con.execute(f"DELETE FROM attendance {where}", params).rowcount
+
+    def attendance_between(self, start: str = None, end: str = None):
+        return self._attendance(*_range_where(start, end))
+
+    def query_attendance(self, offset: int = 0, limit: int = 100, sort: str = "date", desc: bool = False,
+                         start: str = None, end: str = None, pid: int = None, department: str = None):
+        """Like CsvStorage.query_attendance; filtering, sorting and paging run in SQL."""
+        where, params = _range_where(start, end, pid, department)
+        order = ", ".join(f"{c} {'DESC' if desc else 'ASC'}" for c in _sort_columns(sort))
+        con = self._conn()
+        total = con.execute(f"SELECT COUNT(*) FROM attendance {where}", params).fetchone()[0]
+        rows = con.execute(f"SELECT date, time, id, name FROM attendance {where} "
+                           f"ORDER BY {order}, rowid LIMIT ? OFFSET ?",
+                           list(params) + [int(limit), int(offset)]).fetchall()
+        return rows, total
+
+    def iter_attendance(self, start: str = None, end: str = None, pid: int = None,
+                        department: str = None, chunk: int = 50000):
+        """Like CsvStorage.iter_attendance; one ordered cursor read with fetchmany()."""
+        where, params = _range_where(start, end, pid, department)
+        cur = self._conn().execute(f"SELECT date, time, id, name FROM attendance {where} "
+                                   f"ORDER BY date, time, name", params)
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield rows
+
+    def count_attendance(self, start: str = None, end: str = None, pid: int = None, department: str = None):
+        where, params = _range_where(start, end, pid, department)
+        return self._conn().execute(f"SELECT COUNT(*) FROM attendance {where}", params).fetchone()[0]
+
+    def query_users(self, offset: int = 0, limit: int = 100, sort: str = "id", desc: bool = False,
+                    department: str = None, search: str = None):
+        clauses, params = [], []
+        if department is not None:
+            clauses.append("department = ?"); params.append(department)
+        if search:
+            clauses.append("(name LIKE ? OR CAST(id AS TEXT) LIKE ?)"); params += [f"%{search}%"] * 2
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+        col = sort if sort in USER_FIELDS else "id"
+        if col != "id":
+            col += " COLLATE NOCASE"
+        con = self._conn()
+        total = con.execute(f"SELECT COUNT(*) FROM users {where}", params).fetchone()[0]
+        rows = con.execute(f"SELECT id, name, sex, department FROM users {where} "
+                           f"ORDER BY {col} {'DESC' if desc else 'ASC'} LIMIT ? OFFSET ?",
+                           params + [int(limit), int(offset)]).fetchall()
+        return rows, total
+
+    def departments(self):
+        return [r[0] for r in self._conn().execute(
+            "SELECT DISTINCT department FROM users WHERE department != '' ORDER BY department")]
+
+    def rows_since(self, date_str: str):
+        return self._conn().execute(
+            "SELECT date, time, id, name FROM attendance WHERE date >= ? ORDER BY rowid", (date_str,)
+        ).fetchall()
+
+    # ----- import -----
+
+    def import_csv(self, users_csv: Path = USERS_CSV, attendance_csv: Path = ATTENDANCE_CSV):
+        """
+        Copy users.csv / attendance.csv into the database (one transaction each;
+        users are upserted, attendance rows appended). Rows whose (date, time,
+        id) is already in the database are skipped, so importing twice, or into
+        a database that was auto-imported, does not duplicate the history.
+        Returns (users, rows imported).
+        """
+        src = CsvStorage(users_csv, attendance_csv)
+        users = src.user_records() if Path(users_csv).exists() else []
+        rows = [(str(d), str(t), int(i), _text(n)) for d, t, i, n in
+                src.attendance_df().itertuples(index=False)] if Path(attendance_csv).exists() else []
+        if rows:
+            existing = set(self._conn().execute(
+                "SELECT date, time, id FROM attendance WHERE date BETWEEN ? AND ?",
+                (min(r[0] for r in rows), max(r[0] for r in rows))))
+            rows = [r for r in rows if r[:3] not in existing]
+        with self._conn() as con:
+            con.executemany("INSERT OR REPLACE INTO users (id, name, sex, department) VALUES (?, ?, ?, ?)", users)
+        with self._conn() as con:
+            con.executemany("INSERT INTO attendance (date, time, id, name) VALUES (?, ?, ?, ?)", rows)
+        self._conn().execute("ANALYZE")
+        return len(users), len(rows)
+
+    def is_empty(self):
+        con = self._conn()
+        return (con.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None and
+                con.execute("SELECT 1 FROM attendance LIMIT 1").fetchone() is None)
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for con in conns:
+            try:
+                con.execute("PRAGMA optimize")
+                con.close()
+            except sqlite3.Error:
+                pass
+
+
+def _sort_columns(sort: str):
+    """Attendance sort order: the chosen column, then date and time."""
+    cols = [sort] if sort in ATTENDANCE_FIELDS else []
+    return cols + [c for c in ("date", "time") if c not in cols]
+
+def _filter_users(rows, department: str = None, search: str = None):
+    out = []
+    needle = (search or "").strip().lower()
+    for r in rows:
+        if department is not None and r[3] != department:
+            continue
+        if needle and needle not in str(r[1]).lower() and needle not in str(r[0]):
+            continue
+        out.append(tuple(r))
+    return out
+
+def _range_where(start: str = None, end: str = None, pid: int = None, department: str = None):
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("date >= ?"); params.append(start)
+    if end is not None:
+        clauses.append("date <= ?"); params.append(end)
+    if pid is not None:
+        clauses.append("id = ?"); params.append(int(pid))
+    if department is not None:
+        clauses.append("id IN (SELECT id FROM users WHERE department = ?)"); params.append(department)
+    return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def _text(v):
+    return "" if v is None or (isinstance(v, float) and v != v) else str(v)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def storage():
+    """
+    Process-wide storage backend selected by STORAGE_BACKEND. A new SQLite
+    database is filled from the existing CSVs on first use.
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == "sqlite":
+                fresh = not Path(STORAGE_DB).exists()
+                _storage = SqliteStorage()
+                if fresh and _storage.is_empty():
+                    users, rows = _storage.import_csv()
+                    if users or rows:
+                        log.info("Imported %d users and %d attendance rows into %s", users, rows, STORAGE_DB)
+            else:
+                _storage = CsvStorage()
+            atexit.register(_storage.close)
+        return _storage
+
+
+if __name__ == "__main__":
+    # python -m app.storage [db path]  -> one-shot import of users.csv / attendance.csv
+    import sys
+    db = SqliteStorage(sys.argv[1] if len(sys.argv) > 1 else STORAGE_DB)
+    users, rows = db.import_csv()
+    log.info("Imported %d users and %d attendance rows into %s", users, rows, db.path)
+    db.close()
@@ -0,0 +1,193 @@
+import threading, queue
+import tkinter as tk
+from tkinter import ttk
+
+from .config import TABLE_PAGE_SIZE
+
+
+class PagedTable(ttk.Frame):
+    """
+    Treeview that only ever holds one page of rows.
+
+    `fetch(offset, limit, sort, desc, **filters)` must return
+    (rows, total) - e.g. storage().query_attendance - and is called on a
+    background thread; results come back to Tk through a queue polled with
+    after(), so the mainloop never waits on disk. Clicking a heading sorts
+    by that column (in the storage layer), and set_filters() re-queries from
+    the first page. Replies to superseded requests are dropped.
+    """
+
+    def __init__(self, parent, columns, widths, fetch, page_size: int = TABLE_PAGE_SIZE,
+                 sort: str = None, height: int = 16, selectmode: str = "extended"):
+        super().__init__(parent)
+        self.columns = tuple(columns)
+        self.fetch = fetch
+        self.page_size = max(1, int(page_size))
+        self.sort = sort or self.columns[0]
+        self.desc = False
+        self.filters = {}
+        self.page = 0
+        self.total = 0
+        self._seq = 0
+        self._results = queue.Queue()
+        self._polling = False
+        self._shown = 0
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings",
+                                 height=height, selectmode=selectmode)
+        for c, w in zip(self.columns, widths):
+            self.tree.heading(c, text=c.title(), command=lambda c=c: self.sort_by(c))
+            self.tree.column(c, width=w, anchor="center")
+        self.tree.pack(fill="both", expand=True)
+
+        nav = ttk.Frame(self)
+        nav.pack(fill="x", pady=4)
+        self.btn_prev = ttk.Button(nav, text="< Prev", command=self.prev_page)
+        self.btn_prev.pack(side="left")
+        self.btn_next = ttk.Button(nav, text="Next >", command=self.next_page)
+        self.btn_next.pack(side="left", padx=6)
+        self.status = ttk.Label(nav, text="Loading...")
+        self.status.pack(side="left", padx=12)
+
+        self.refresh()
+
+    # ----- navigation -----
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.page_size))
+
+    def refresh(self):
+        """Re-query the current page in the background."""
+        self._seq += 1
+        seq, offset = self._seq, self.page * self.page_size
+        args = (offset, self.page_size, self.sort, self.desc)
+        filters = dict(self.filters)
+        self.status.configure(text="Loading...")
+
+        def work():
+            try:
+                self._results.put((seq, self.fetch(*args, **filters), None))
+            except Exception as e:
+                self._results.put((seq, None, e))
+
+        threading.Thread(target=work, daemon=True).start()
+        if not self._polling:
+            self._polling = True
+            self.after(30, self._poll)
+
+    def set_filters(self, **filters):
+        self.filters = {k: v for k, v in filters.items() if v not in (None, "")}
+        self.page = 0
+        self.refresh()
+
+    def sort_by(self, column):
+        self.desc = not self.desc if column == self.sort else False
+        self.sort = column
+        self.page = 0
+        self.refresh()
+
+    def next_page(self):
+        if self.page + 1 < self.pages:
+            self.page += 1
+            self.refresh()
+
+    def prev_page(self):
+        if self.page > 0:
+            self.page -= 1
+            self.refresh()
+
+    def selected_values(self):
+        return [self.tree.item(s)["values"] for s in self.tree.selection()]
+
+    # ----- results -----
+
+    def _poll(self):
+        try:
+            if not self.winfo_exists():
+                return
+        except tk.TclError:   # the window is gone
+            return
+        latest = None
+        try:
+            while True:
+                latest = self._results.get_nowait()
+        except queue.Empty:
+            pass
+        if latest is not None and latest[0] == self._seq:
+            self._show(*latest[1:])
+        if self._seq != self._shown:
+            self.after(30, self._poll)
+        else:
+            self._polling = False
+
+    def _show(self, result, error):
+        self._shown = self._seq
+        if error is not None:
+            self.status.configure(text=f"Error: {error}")
+            return
+        rows, self.total = result
+        if self.page >= self.pages:
+            # rows were deleted under us: jump back to the last page
+            self.page = self.pages - 1
+            self.refresh()
+            return
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", "end", values=tuple(row))
+        first = self.page * self.page_size
+        arrow = " v" if self.desc else " ^"
+        for c in self.columns:
+            self.tree.heading(c, text=c.title() + (arrow if c == self.sort else ""))
+        self.status.configure(text=f"Rows {first + 1 if rows else 0}-{first + len(rows)} of {self.total}"
+                                   f"   (page {self.page + 1}/{self.pages})")
+        self.btn_prev.state(["!disabled"] if self.page > 0 else ["disabled"])
+        self.btn_next.state(["!disabled"] if self.page + 1 < self.pages else ["disabled"])
+
+
+class FilterBar(ttk.Frame):
+    """
+    Row of filter inputs for a PagedTable. `fields` are (key, label, width,
+    choices) tuples; choices makes a read-only combobox (first entry = "any").
+    `convert` maps a key to a function applied to non-empty values (e.g. int);
+    invalid values are ignored.
+    """
+
+    def __init__(self, parent, table: PagedTable, fields, convert=None):
+        super().__init__(parent)
+        self.table = table
+        self.convert = convert or {}
+        self.vars = {}
+        for key, label, width, choices in fields:
+            ttk.Label(self, text=label).pack(side="left", padx=(8, 2))
+            var = tk.StringVar()
+            if choices is not None:
+                w = ttk.Combobox(self, textvariable=var, values=[""] + list(choices),
+                                 width=width, state="readonly")
+            else:
+                w = ttk.Entry(self, textvariable=var, width=width)
+                w.bind("<Return>", lambda e: self.apply())
+            w.pack(side="left")
+            self.vars[key] = var
+        ttk.Button(self, text="Filter", command=self.apply).pack(side="left", padx=(10, 4))
+        ttk.Button(self, text="Clear", command=self.clear).pack(side="left")
+
+    def values(self):
+        out = {}
+        for key, var in self.vars.items():
+            v = var.get().strip()
+            if not v:
+                continue
+            try:
+                out[key] = self.convert.get(key, str)(v)
+            except ValueError:
+                continue
+        return out
+
+    def apply(self):
+        self.table.set_filters(**self.values())
+
+    def clear(self):
+        for var in self.vars.values():
+            var.set("")
+        self.table.set_filters()
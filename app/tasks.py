@@ -0,0 +1,150 @@
+import itertools, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import TASK_WORKERS, TASK_POLL_MS
+from .metrics import log
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task (by Task.check / Task.checkpoint) once it was cancelled."""
+
+
+class Task:
+    """
+    Handle of one background job. The job function receives it as its first
+    argument; it may call report(done, total) for progress, and check() (or
+    watch .cancel_event) to stop early - check() raises TaskCancelled once
+    cancel() was called. checkpoint() does both, so it can be handed to
+    code that takes a `progress` callback and has no cancel hook of its own.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str = ""):
+        self.id = next(Task._ids)
+        self.name = name
+        self.cancel_event = threading.Event()
+        self.status = "pending"      # pending / running / done / error / cancelled
+        self.result = None
+        self.error = None
+        self._scheduler = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise TaskCancelled(self.name)
+
+    def report(self, done, total=None):
+        """Progress from the worker; delivered to on_progress on the Tk thread."""
+        if self._scheduler is not None:
+            self._scheduler._post(self, "progress", (done, total))
+
+    def checkpoint(self, done, total=None):
+        self.check()
+        self.report(done, total)
+
+
+class TaskScheduler:
+    """
+    Runs blocking jobs (camera sessions, training, exports) on a thread pool
+    and hands their progress and results back to Tk.
+
+    Workers never touch widgets: they put events on a queue, and the Tk
+    thread drains it every `poll_ms` milliseconds with after() (16 ms keeps
+    the window at ~60 fps) and calls on_progress / on_done / on_error /
+    on_cancel there. call_soon() marshals any other callable the same way.
+    """
+
+    def __init__(self, root, workers: int = TASK_WORKERS, poll_ms: int = TASK_POLL_MS):
+        self.root = root
+        self.poll_ms = int(poll_ms)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="task")
+        self._events = queue.Queue()
+        self._callbacks = {}
+        self.active = {}
+        self._closed = False
+        self.root.after(self.poll_ms, self._drain)
+
+    def submit(self, fn, *args, name: str = "", on_done=None, on_error=None,
+               on_progress=None, on_cancel=None, **kwargs):
+        """Run fn(task, *args, **kwargs) on a worker; returns the Task."""
+        task = Task(name or getattr(fn, "__name__", "task"))
+        task._scheduler = self
+        self._callbacks[task.id] = (on_done, on_error, on_progress, on_cancel)
+        self.active[task.id] = task
+
+        def run():
+            if task.cancelled:
+                self._post(task, "cancelled", None)
+                return
+            task.status = "running"
+            try:
+                result = fn(task, *args, **kwargs)
+            except TaskCancelled:
+                self._post(task, "cancelled", None)
+            except Exception as e:
+                log.error("Task %s failed: %s", task.name, e)
+                self._post(task, "error", e)
+            else:
+                self._post(task, "cancelled" if task.cancelled else "done", result)
+
+        self._pool.submit(run)
+        return task
+
+    def call_soon(self, fn, *args):
+        """Run fn(*args) on the Tk thread (safe to call from any thread)."""
+        self._events.put((None, "call", (fn, args)))
+
+    def _post(self, task, kind, value):
+        self._events.put((task, kind, value))
+
+    def _drain(self):
+        if self._closed:
+            return
+        try:
+            while True:
+                task, kind, value = self._events.get_nowait()
+                self._dispatch(task, kind, value)
+        except queue.Empty:
+            pass
+        self.root.after(self.poll_ms, self._drain)
+
+    def _dispatch(self, task, kind, value):
+        if kind == "call":
+            fn, args = value
+            fn(*args)
+            return
+        on_done, on_error, on_progress, on_cancel = self._callbacks.get(task.id, (None,) * 4)
+        if kind == "progress":
+            if on_progress is not None and not task.cancelled:
+                on_progress(*value)
+            return
+        task.status = kind
+        self._callbacks.pop(task.id, None)
+        self.active.pop(task.id, None)
+        if kind == "done":
+            task.result = value
+            if on_done is not None:
+                on_done(value)
+        elif kind == "error":
+            task.error = value
+            if on_error is not None:
+                on_error(value)
+        elif on_cancel is not None:
+            on_cancel()
+
+    def cancel_all(self):
+        for task in list(self.active.values()):
+            task.cancel()
+
+    def shutdown(self):
+        """Cancel running tasks and stop polling (call when the window closes)."""
+        self.cancel_all()
+        self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,152 @@
+import itertools, time
+
+from .config import (
+    MIN_FACE_SIZE, TRACK_DETECT_EVERY, TRACK_ROI_MARGIN, TRACK_MAX_MISSES,
+    TRACK_IOU_MATCH, TRACK_CONFIDENT, DETECT_ADAPTIVE
+)
+from .metrics import metrics
+from .detection import AdaptiveDetector
+
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    """One face followed across frames, with its last recognition result."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, box):
+        self.id = next(Track._ids)
+        self.box = tuple(int(v) for v in box)
+        self.misses = 0
+        self.age = 0
+        self.result = None     # last ("known"/"already"/"unknown", name, confidence, id)
+        self.tag = ""
+        self.clr = (255, 255, 255)
+
+    def needs_prediction(self, confident: float = TRACK_CONFIDENT):
+        """New tracks and tracks without a confident match are predicted again."""
+        if self.result is None:
+            return True
+        confidence = self.result[2]
+        return confidence is None or confidence > confident
+
+    def remember(self, result, tag, clr):
+        self.result, self.tag, self.clr = result, tag, clr
+
+
+class FaceTracker:
+    """
+    Cheap frame-to-frame face tracking on top of the Haar cascade.
+
+    A full-frame detectMultiScale runs every `detect_every` frames, or as
+    soon as a track is lost. In between, each track is re-detected only
+    inside its previous box grown by `roi_margin`, with minSize close to the
+    track's size, which is a small fraction of the full-frame cost. Tracks
+    carry their recognition result so callers only re-run predict() for new
+    or low-confidence tracks (Track.needs_prediction). With `adaptive`, the
+    full detections go through an AdaptiveDetector (downscaled, ROI,
+    auto-tuned); boxes are always in full-frame pixels.
+    """
+
+    def __init__(self, face_cascade, detect_every: int = TRACK_DETECT_EVERY,
+                 roi_margin: float = TRACK_ROI_MARGIN, max_misses: int = TRACK_MAX_MISSES,
+                 iou_match: float = TRACK_IOU_MATCH, min_size=MIN_FACE_SIZE,
+                 scale_factor: float = 1.2, min_neighbors: int = 5, adaptive: bool = DETECT_ADAPTIVE):
+        self.face_cascade = face_cascade
+        self.detector = AdaptiveDetector(face_cascade, min_size=min_size) if adaptive else None
+        self.detect_every = max(1, int(detect_every))
+        self.roi_margin = float(roi_margin)
+        self.max_misses = int(max_misses)
+        self.iou_match = float(iou_match)
+        self.min_size = tuple(min_size)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+        self.tracks = []
+        self.frame_idx = 0
+        self.full_detections = 0
+        self.roi_detections = 0
+        self._force_full = True
+
+    def reset(self):
+        self.tracks = []
+        self._force_full = True
+
+    def update(self, gray):
+        """Advance one grayscale frame; returns the tracks seen in this frame."""
+        self.frame_idx += 1
+        if self._force_full or not self.tracks or self.frame_idx % self.detect_every == 0:
+            self._full_detect(gray)
+        else:
+            self._roi_update(gray)
+        return [t for t in self.tracks if t.misses == 0]
+
+    # ----- detection modes -----
+
+    def _full_detect(self, gray):
+        self.full_detections += 1
+        self._force_full = False
+        with metrics().time("detectMultiScale"):
+            if self.detector is not None:
+                found = self.detector.detect(gray)
+            else:
+                found = self.face_cascade.detectMultiScale(
+                    gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size
+                )
+        boxes = [tuple(int(v) for v in b) for b in found]
+        unmatched = list(range(len(boxes)))
+        for tr in self.tracks:
+            best, best_iou = None, self.iou_match
+            for i in unmatched:
+                v = iou(tr.box, boxes[i])
+                if v >= best_iou:
+                    best, best_iou = i, v
+            if best is None:
+                tr.misses += 1
+            else:
+                unmatched.remove(best)
+                tr.box = boxes[best]
+                tr.misses = 0
+            tr.age += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        self.tracks += [Track(boxes[i]) for i in unmatched]
+
+    def _roi_update(self, gray):
+        H, W = gray.shape[:2]
+        lost = False
+        timer = metrics().timer("detectMultiScale_roi")
+        for tr in self.tracks:
+            x, y, w, h = tr.box
+            mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+            x0, y0 = max(0, x - mx), max(0, y - my)
+            x1, y1 = min(W, x + w + mx), min(H, y + h + my)
+            self.roi_detections += 1
+            t0 = time.perf_counter()
+            found = self.face_cascade.detectMultiScale(
+                gray[y0:y1, x0:x1], scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                minSize=(max(self.min_size[0], int(w * 0.7)), max(self.min_size[1], int(h * 0.7))),
+                maxSize=(int(w * 1.4) + 1, int(h * 1.4) + 1),
+            )
+            timer.observe(time.perf_counter() - t0)
+            if len(found):
+                cands = [(int(fx) + x0, int(fy) + y0, int(fw), int(fh)) for (fx, fy, fw, fh) in found]
+                tr.box = max(cands, key=lambda b: iou(tr.box, b))
+                tr.misses = 0
+            else:
+                tr.misses += 1
+                lost = True
+            tr.age += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        if lost:
+            # a face moved out of its window or left: look at the whole frame next time
+            self._force_full = True
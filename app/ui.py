@@ -1,13 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import webbrowser, threading, time
-import pyttsx3
-import pandas as pd
+import webbrowser, time, queue
+from pathlib import Path
+from datetime import datetime, timedelta
 from ttkbootstrap import Style
-from app.config import USERS_CSV, ATTENDANCE_CSV
-from app.utils import ensure_dirs, users_df, save_users_df, attendance_df, speak
-from app.backend import capture_samples, train_model, take_attendance
-from app.exporter import export_attendance_to_excel, export_attendance_to_pdf
+from app.directory import user_directory, invalidate_directory
+from app.utils import ensure_dirs, users_df, save_users_df, delete_attendance, speak
+from app.storage import storage
+from app.table_view import PagedTable, FilterBar
+from app.rollups import attendance_rollups
+from app.tasks import TaskScheduler
+from app.speech import SpeechWorker
+from app.metrics import log, serve_metrics, profiled
 
 APP_TITLE = "FACE RECOGNITION ATTENDANCE SYSTEM"
 URL = "https://academicprojectworld.com/"
@@ -22,6 +26,17 @@ PROJECT_INFO = (
     "MRS MORADEYO"
 )
 
+def warm_up(task=None):
+    """
+    Import OpenCV/NumPy and load what a camera session needs (cascade, model,
+    user index, presence cache, attendance rollups) so the first Take
+    Attendance / kiosk start does not pay for it. Runs as a background task after the window appears.
+    """
+    from app.backend import warm_up as warm_backend
+    t0 = time.perf_counter()
+    warm_backend()
+    log.info("Warm-up finished in %.2fs", time.perf_counter() - t0)
+
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -31,11 +46,20 @@ class App(tk.Tk):
         self.style = Style(theme="flatly")
         ensure_dirs()
 
-        self.engine = pyttsx3.init()
-        self.engine.setProperty("rate", 175)
+        # camera sessions, training and exports run on self.tasks; speech on its own thread
+        self.tasks = TaskScheduler(self)
+        self.engine = SpeechWorker()
         self.after(300, lambda: speak(self.engine, f"Welcome to {APP_TITLE}"))
+        serve_metrics()   # only when METRICS_PORT is set
 
         self.build_home()
+        # OpenCV, the model and the cascade load once the window is up (see warm_up)
+        self.after(100, lambda: self.tasks.submit(warm_up, name="warm_up"))
+
+    def destroy(self):
+        self.tasks.shutdown()
+        self.engine.stop()
+        super().destroy()
 
     def clear(self):
         for w in self.winfo_children():
@@ -45,6 +69,31 @@ class App(tk.Tk):
         lbl = ttk.Label(parent, text=text, font=("Segoe UI", 18, "bold"))
         lbl.pack(pady=10)
 
+    def task_dialog(self, title, text, cancel=None, maximum=1.0):
+        """Progress window for a background task; `maximum=None` gives a busy bar."""
+        dlg = tk.Toplevel(self)
+        dlg.title(title)
+        dlg.geometry("380x140")
+        ttk.Label(dlg, text=text, wraplength=350).pack(pady=8)
+        bar = ttk.Progressbar(dlg, length=320, mode="determinate" if maximum else "indeterminate",
+                              maximum=maximum or 100)
+        bar.pack(pady=6)
+        if not maximum:
+            bar.start(10)
+        if cancel is not None:
+            ttk.Button(dlg, text="Cancel", command=cancel).pack(pady=4)
+            dlg.protocol("WM_DELETE_WINDOW", cancel)
+        else:
+            dlg.protocol("WM_DELETE_WINDOW", lambda: None)
+        return dlg, bar
+
+    @staticmethod
+    def close_dialog(dlg):
+        try:
+            dlg.destroy()
+        except tk.TclError:   # already gone with the screen it belonged to
+            pass
+
     def footer(self, parent):
         frm = ttk.Frame(parent)
         frm.pack(side="bottom", fill="x", pady=8)
@@ -71,6 +120,8 @@ class App(tk.Tk):
             ("Delete Attendance", self.on_delete_attendance),
             ("Enroll New User", self.on_enroll_user),
             ("Export Attendance", self.on_export_menu),
+            ("Kiosk Mode", self.on_kiosk_mode),
+            ("Daily Summary", self.on_daily_summary),
         ]
 
         for i, (text, cmd) in enumerate(btns):
@@ -85,10 +136,46 @@ class App(tk.Tk):
 
         self.footer(wrap)
 
+    # -------- Tables (paged, loaded off the UI thread) --------
+    def attendance_table(self, parent, height=15):
+        table = PagedTable(parent, ("date","time","id","name"), (120, 120, 80, 420),
+                           storage().query_attendance, sort="date", height=height)
+        depts = sorted({r[3] for r in user_directory().records() if r[3]})
+        FilterBar(parent, table, [("start", "From", 11, None), ("end", "To", 11, None),
+                                  ("pid", "User ID", 7, None), ("department", "Dept", 14, depts)],
+                  convert={"pid": int}).pack(fill="x")
+        return table
+
+    def users_table(self, parent, height=16, selectmode="extended"):
+        table = PagedTable(parent, ("id","name","sex","department"), (80, 300, 120, 300),
+                           storage().query_users, sort="id", height=height, selectmode=selectmode)
+        depts = sorted({r[3] for r in user_directory().records() if r[3]})
+        FilterBar(parent, table, [("search", "Search", 18, None), ("department", "Dept", 14, depts)]).pack(fill="x")
+        return table
+
     # -------- Actions --------
     def on_take_attendance(self):
         speak(self.engine, "Taking attendance. Camera opening.")
-        result = take_attendance()
+        dlg, _ = self.task_dialog("Take Attendance", "Camera is open. Look at the camera "
+                                  "(press q in the camera window to finish).",
+                                  cancel=lambda: task.cancel(), maximum=None)
+
+        def failed(e):
+            self.close_dialog(dlg)
+            messagebox.showerror("Error", f"Camera error: {e}")
+
+        def run(t):
+            from app.backend import take_attendance
+            with profiled("attendance"):
+                return take_attendance(cancel=t.cancel_event)
+
+        task = self.tasks.submit(run, name="take_attendance",
+                                 on_done=lambda result: (self.close_dialog(dlg), self.show_attendance_result(result)),
+                                 on_error=failed, on_cancel=lambda: self.close_dialog(dlg))
+
+    def show_attendance_result(self, result):
+        if result is None:   # closed without a face
+            return
         if result == "no_model":
             messagebox.showwarning("No Model", "No trained model found. Please enroll and train first.")
             speak(self.engine, "No trained model found. Please enroll and train first.")
@@ -97,26 +184,82 @@ class App(tk.Tk):
         if state == "known":
             speak(self.engine, "Attendance taken successfully.")
             messagebox.showinfo("Success", f"Attendance recorded for {name}.")
+        elif state == "already":
+            speak(self.engine, "Attendance already taken.")
+            messagebox.showinfo("Already Present", f"Attendance for {name} was already recorded.")
         else:
             speak(self.engine, "Unknown user.")
             messagebox.showwarning("Unknown", "Unknown user. Please enroll.")
         self.build_home()
 
-    def on_check_attendance(self):
+    def on_kiosk_mode(self):
         self.clear()
         wrap = ttk.Frame(self, padding=12)
         wrap.pack(fill="both", expand=True)
-        self.header(wrap, "Attendance Records")
-        df = attendance_df()
+        self.header(wrap, "Kiosk Mode")
+
+        status = ttk.Label(wrap, text="Starting camera...", font=("Segoe UI", 11))
+        status.pack(pady=4)
 
-        tree = ttk.Treeview(wrap, columns=("date","time","id","name"), show="headings", height=18)
-        for c, w in zip(("date","time","id","name"), (120, 120, 80, 420)):
+        tree = ttk.Treeview(wrap, columns=("time","state","id","name"), show="headings", height=14)
+        for c, w in zip(("time","state","id","name"), (120, 120, 80, 420)):
             tree.heading(c, text=c.title())
             tree.column(c, width=w, anchor="center")
-        for _, r in df.iterrows():
-            tree.insert("", "end", values=(r["date"], r["time"], int(r["id"]), str(r["name"])))
         tree.pack(fill="both", expand=True, pady=10)
 
+        from app.backend import RecognitionSession
+        results = queue.Queue()
+        session = RecognitionSession(results=results).start()
+        speak(self.engine, "Kiosk mode started.")
+
+        def poll():
+            if not tree.winfo_exists():
+                return
+            while True:
+                try:
+                    state, name, conf, pid = results.get_nowait()
+                except queue.Empty:
+                    break
+                tree.insert("", 0, values=(time.strftime("%H:%M:%S"), state,
+                                           "" if pid is None else pid, name or "Unknown"))
+            if session.error == "no_model":
+                messagebox.showwarning("No Model", "No trained model found. Please enroll and train first.")
+                self.build_home()
+                return
+            if session.error == "camera_error":
+                messagebox.showerror("Error", "Could not open the camera.")
+                self.build_home()
+                return
+            if session.error and not session.running:
+                messagebox.showerror("Error", f"Kiosk mode stopped: {session.error}")
+                self.build_home()
+                return
+            text = f"{session.people_per_minute():.1f} people/min   {session.fps():.1f} fps"
+            stages = session.pipeline_stats()
+            if stages:
+                text += "   " + "  ".join(f"{k}: q={v['queue']} {v['avg_ms']:.0f}ms" for k, v in stages.items())
+            status.config(text=text)
+            if session.running:
+                self.after(200, poll)
+            else:
+                status.config(text=status.cget("text") + "   (stopped)")
+
+        def stop():
+            session.stop(wait=False)
+            self.build_home()
+
+        ttk.Button(wrap, text="Stop", command=stop).pack(pady=6)
+        self.after(200, poll)
+
+    def on_check_attendance(self):
+        self.clear()
+        wrap = ttk.Frame(self, padding=12)
+        wrap.pack(fill="both", expand=True)
+        self.header(wrap, "Attendance Records")
+
+        table = self.attendance_table(wrap, height=15)
+        table.pack(fill="both", expand=True, pady=(4, 10))
+
         # Export buttons here too
         btn_row = ttk.Frame(wrap)
         btn_row.pack(pady=6)
@@ -131,15 +274,9 @@ class App(tk.Tk):
         wrap = ttk.Frame(self, padding=12)
         wrap.pack(fill="both", expand=True)
         self.header(wrap, "Registered Users")
-        df = users_df()
 
-        tree = ttk.Treeview(wrap, columns=("id","name","sex","department"), show="headings", height=18)
-        for c, w in zip(("id","name","sex","department"), (80, 300, 120, 300)):
-            tree.heading(c, text=c.title())
-            tree.column(c, width=w, anchor="center")
-        for _, r in df.iterrows():
-            tree.insert("", "end", values=(int(r["id"]), r["name"], r.get("sex",""), r.get("department","")))
-        tree.pack(fill="both", expand=True, pady=10)
+        table = self.users_table(wrap, height=16)
+        table.pack(fill="both", expand=True, pady=(4, 10))
         ttk.Button(wrap, text="Back", command=self.build_home).pack(pady=6)
         self.footer(wrap)
 
@@ -152,33 +289,43 @@ class App(tk.Tk):
         wrap.pack(fill="both", expand=True)
         self.header(wrap, "Delete User")
 
-        df = users_df()
-
-        tree = ttk.Treeview(wrap, columns=("id","name","sex","department"), show="headings", height=16)
-        for c, w in zip(("id","name","sex","department"), (80, 300, 120, 300)):
-            tree.heading(c, text=c.title()); tree.column(c, width=w, anchor="center")
-        for _, r in df.iterrows():
-            tree.insert("", "end", values=(int(r["id"]), r["name"], r.get("sex",""), r.get("department","")))
-        tree.pack(fill="both", expand=True, pady=10)
+        table = self.users_table(wrap, height=14, selectmode="browse")
+        table.pack(fill="both", expand=True, pady=(4, 10))
 
         def do_delete():
-            sel = tree.selection()
+            sel = table.selected_values()
             if not sel:
                 messagebox.showinfo("Info", "Select a user to delete."); return
-            item = tree.item(sel[0])["values"]
+            item = sel[0]
             pid = int(item[0]); name = str(item[1])
-            # remove from users.csv
-            df2 = df[df["id"] != pid]
-            save_users_df(df2)
-            # remove dataset folder
-            from app.config import DATASET_DIR
-            import shutil
-            for d in DATASET_DIR.glob(f"{pid}_*"):
-                if d.is_dir():
+
+            def run(t):
+                # remove from users.csv
+                df = users_df()
+                save_users_df(df[df["id"] != pid])
+                # remove dataset folder
+                import shutil
+                for d in user_directory().folders(pid):
                     shutil.rmtree(d, ignore_errors=True)
-            speak(self.engine, "User deleted successfully.")
-            messagebox.showinfo("Deleted", f"Deleted user: {name} (ID {pid})")
-            self.build_home()
+                invalidate_directory()
+                # drop the user's templates from the model (no full retrain)
+                from app.backend import forget_user
+                forget_user(pid)
+
+            def done(_):
+                self.close_dialog(dlg)
+                speak(self.engine, "User deleted successfully.")
+                messagebox.showinfo("Deleted", f"Deleted user: {name} (ID {pid})")
+                self.build_home()
+
+            def failed(e):
+                self.close_dialog(dlg)
+                messagebox.showerror("Error", f"Could not delete user: {e}")
+                self.build_home()
+
+            # rewrites users.csv and the model as it goes, so it is not cancellable
+            dlg, _ = self.task_dialog("Delete User", f"Deleting {name} (ID {pid})...", maximum=None)
+            self.tasks.submit(run, name="delete_user", on_done=done, on_error=failed)
 
         ttk.Button(wrap, text="Delete Selected User", command=do_delete).pack(pady=6)
         ttk.Button(wrap, text="Back", command=self.build_home).pack(pady=6)
@@ -190,32 +337,114 @@ class App(tk.Tk):
         wrap.pack(fill="both", expand=True)
         self.header(wrap, "Delete Attendance")
 
-        att = attendance_df()
-
-        tree = ttk.Treeview(wrap, columns=("date","time","id","name"), show="headings", height=16)
-        for c, w in zip(("date","time","id","name"), (120,120,80,420)):
-            tree.heading(c, text=c.title()); tree.column(c, width=w, anchor="center")
-        for _, r in att.iterrows():
-            tree.insert("", "end", values=(r["date"], r["time"], int(r["id"]), r["name"]))
-        tree.pack(fill="both", expand=True, pady=10)
+        table = self.attendance_table(wrap, height=13)
+        table.pack(fill="both", expand=True, pady=(4, 10))
 
         def do_delete_selected():
-            sel = tree.selection()
-            if not sel:
+            rows = table.selected_values()
+            if not rows:
                 messagebox.showinfo("Info", "Select at least one record to delete."); return
-            rows = [tree.item(s)["values"] for s in sel]
-            df = attendance_df()
-            for date, time_str, pid, name in rows:
-                df = df[~((df["date"]==date) & (df["time"]==time_str) & (df["id"]==int(pid)))]
-            df.to_csv(ATTENDANCE_CSV, index=False)
-            speak(self.engine, "Attendance deleted successfully.")
-            messagebox.showinfo("Deleted", "Selected attendance record(s) deleted.")
-            self.on_delete_attendance()
+            keys = [(str(date), str(time_str), int(pid)) for date, time_str, pid, _ in rows]
+
+            def done(_):
+                self.close_dialog(dlg)
+                try:
+                    table.refresh()
+                except tk.TclError:   # the screen was left meanwhile
+                    pass
+                speak(self.engine, "Attendance deleted successfully.")
+                messagebox.showinfo("Deleted", "Selected attendance record(s) deleted.")
+
+            def failed(e):
+                self.close_dialog(dlg)
+                messagebox.showerror("Error", f"Could not delete attendance: {e}")
+
+            dlg, _ = self.task_dialog("Delete Attendance", f"Deleting {len(keys)} record(s)...", maximum=None)
+            self.tasks.submit(lambda t: delete_attendance(keys), name="delete_attendance",
+                              on_done=done, on_error=failed)
 
         ttk.Button(wrap, text="Delete Selected", command=do_delete_selected).pack(pady=6)
         ttk.Button(wrap, text="Back", command=self.build_home).pack(pady=6)
         self.footer(wrap)
 
+    def on_daily_summary(self):
+        self.clear()
+        wrap = ttk.Frame(self, padding=12)
+        wrap.pack(fill="both", expand=True)
+        self.header(wrap, "Daily Summary")
+
+        bar = ttk.Frame(wrap); bar.pack(fill="x")
+        day = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
+        ttk.Label(bar, text="Date").pack(side="left", padx=(0, 4))
+        e_day = ttk.Entry(bar, textvariable=day, width=12); e_day.pack(side="left")
+        totals = ttk.Label(bar, text="Loading...", font=("Segoe UI", 10, "bold"))
+
+        body = ttk.Frame(wrap); body.pack(fill="both", expand=True, pady=8)
+        present = ttk.Treeview(body, columns=("id","name","first in","last out","rows"), show="headings", height=14)
+        for c, w in zip(("id","name","first in","last out","rows"), (60, 220, 90, 90, 60)):
+            present.heading(c, text=c.title()); present.column(c, width=w, anchor="center")
+        present.pack(side="left", fill="both", expand=True)
+        side = ttk.Frame(body); side.pack(side="left", fill="y", padx=(10, 0))
+        ttk.Label(side, text="Absent").pack(anchor="w")
+        absent = tk.Listbox(side, width=30, height=10); absent.pack(fill="y")
+        ttk.Label(side, text="By department").pack(anchor="w", pady=(8, 0))
+        depts = tk.Listbox(side, width=30, height=5); depts.pack(fill="y")
+
+        def load():
+            d = day.get().strip()
+            totals.configure(text="Loading...")
+
+            def work(task):
+                # first use may rebuild the rollups from storage: keep it off the Tk thread
+                rollups = attendance_rollups()
+                directory = user_directory()
+                records = directory.records()
+                roster = {r[0] for r in records}
+                entries = rollups.day(d)
+                return (d, [(pid, directory.name(pid, ""), v[1], v[2], v[0]) for pid, v in sorted(entries.items())],
+                        [(pid, directory.name(pid, "")) for pid in rollups.absentees(d, roster)],
+                        rollups.department_counts(d, {r[0]: r[3] for r in records}), len(roster))
+
+            self.tasks.submit(work, name="daily_summary", on_done=show, on_error=show)
+
+        def show(item):
+            try:
+                if not present.winfo_exists():
+                    return
+            except tk.TclError:   # the window was closed meanwhile
+                return
+            if isinstance(item, Exception):
+                totals.configure(text=f"Error: {item}"); return
+            d, rows, missing, by_dept, registered = item
+            present.delete(*present.get_children())
+            for r in rows:
+                present.insert("", "end", values=r)
+            absent.delete(0, "end")
+            for pid, name in missing:
+                absent.insert("end", f"{pid}  {name}")
+            depts.delete(0, "end")
+            for dept, n in sorted(by_dept.items()):
+                depts.insert("end", f"{dept or '(none)'}: {n}")
+            totals.configure(text=f"{d}: present {len(rows)}, absent {len(missing)} of {registered} registered")
+
+        def shift(days):
+            try:
+                d = datetime.strptime(day.get().strip(), "%Y-%m-%d")
+            except ValueError:
+                d = datetime.now()
+            day.set((d + timedelta(days=days)).strftime("%Y-%m-%d"))
+            load()
+
+        ttk.Button(bar, text="<", width=3, command=lambda: shift(-1)).pack(side="left", padx=(6, 0))
+        ttk.Button(bar, text=">", width=3, command=lambda: shift(1)).pack(side="left", padx=2)
+        ttk.Button(bar, text="Show", command=load).pack(side="left", padx=6)
+        totals.pack(side="left", padx=12)
+        e_day.bind("<Return>", lambda e: load())
+
+        ttk.Button(wrap, text="Back", command=self.build_home).pack(pady=6)
+        self.footer(wrap)
+        load()
+
     def on_enroll_user(self):
         self.clear()
         wrap = ttk.Frame(self, padding=12)
@@ -253,36 +482,72 @@ class App(tk.Tk):
                 messagebox.showerror("Error", "Name is required and cannot be only numbers.")
                 return
 
-            df = users_df()
-            if (df["id"] == pid).any():
-                df.loc[df["id"]==pid, ["name","sex","department"]] = [name, sex, dept]
-            else:
-                df.loc[len(df)] = {"id": pid, "name": name, "sex": sex, "department": dept}
-            save_users_df(df)
-            speak(self.engine, "Starting enrollment. Look at the camera.")
-            count = capture_samples(pid, name, num_samples=60)
-            messagebox.showinfo("Captured", f"Captured {count} images for {name}.")
-            speak(self.engine, "Training model. Please wait.")
-            self.show_training_and_train()
-
-        ttk.Button(wrap, text="Enroll User", command=enroll).pack(pady=6)
+            def enable():
+                try:
+                    btn_enroll.configure(state="normal")
+                except tk.TclError:   # screen already left
+                    pass
+
+            def save_user(t):
+                df = users_df()
+                if (df["id"] == pid).any():
+                    df.loc[df["id"]==pid, ["name","sex","department"]] = [name, sex, dept]
+                else:
+                    df.loc[len(df)] = {"id": pid, "name": name, "sex": sex, "department": dept}
+                save_users_df(df)
+
+            def save_failed(e):
+                enable()
+                messagebox.showerror("Error", f"Could not save user: {e}")
+
+            def saved(_):
+                speak(self.engine, "Starting enrollment. Look at the camera.")
+                num_samples = 60
+                dlg, bar = self.task_dialog("Enrollment", f"Capturing images for {name}...",
+                                            cancel=lambda: task.cancel(), maximum=num_samples)
+
+                def captured(count):
+                    self.close_dialog(dlg)
+                    messagebox.showinfo("Captured", f"Captured {count} images for {name}.")
+                    speak(self.engine, "Training model. Please wait.")
+                    self.show_training_and_train()
+
+                def cancelled():
+                    self.close_dialog(dlg)
+                    enable()
+                    messagebox.showinfo("Cancelled", "Enrollment cancelled. Images captured so far are kept "
+                                        "and used the next time the model is trained.")
+
+                def failed(e):
+                    self.close_dialog(dlg)
+                    enable()
+                    messagebox.showerror("Error", f"Capture failed: {e}")
+
+                def run(t):
+                    from app.backend import capture_samples
+                    return capture_samples(pid, name, num_samples=num_samples,
+                                           cancel=t.cancel_event, progress=t.report)
+
+                task = self.tasks.submit(
+                    run, name="capture_samples", on_done=captured, on_error=failed, on_cancel=cancelled,
+                    on_progress=lambda done, total: bar.configure(value=done))
+
+            # users.csv is read and written off the Tk thread; the button stays off until enrollment ends
+            btn_enroll.configure(state="disabled")
+            self.tasks.submit(save_user, name="save_user", on_done=saved, on_error=save_failed)
+
+        btn_enroll = ttk.Button(wrap, text="Enroll User", command=enroll)
+        btn_enroll.pack(pady=6)
         ttk.Button(wrap, text="Back", command=self.build_home).pack(pady=6)
         self.footer(wrap)
 
     def show_training_and_train(self):
-        dlg = tk.Toplevel(self)
-        dlg.title("Training Model")
-        dlg.geometry("420x160")
-        ttk.Label(dlg, text="Training model, please wait...", font=("Segoe UI", 12)).pack(pady=12)
-        pb = ttk.Progressbar(dlg, mode="indeterminate", length=300)
-        pb.pack(pady=8)
-        pb.start(10)
-
-        def work():
-            ok, n = train_model()
-            time.sleep(1.0)
-            pb.stop()
-            dlg.destroy()
+        # training replaces the model files as it goes, so it is not cancellable
+        dlg, _ = self.task_dialog("Training Model", "Training model, please wait...", maximum=None)
+
+        def done(result):
+            ok, n = result
+            self.close_dialog(dlg)
             if ok:
                 speak(self.engine, "Model trained successfully.")
                 messagebox.showinfo("Success", f"Model trained successfully with {n} images.")
@@ -291,24 +556,54 @@ class App(tk.Tk):
                 messagebox.showerror("Error", "No training images found. Please enroll a user first.")
             self.build_home()
 
-        threading.Thread(target=work, daemon=True).start()
+        def failed(e):
+            self.close_dialog(dlg)
+            messagebox.showerror("Error", f"Training failed: {e}")
+            self.build_home()
+
+        def run(t):
+            from app.backend import train_model
+            return train_model()
+
+        self.tasks.submit(run, name="train_model", on_done=done, on_error=failed)
 
     # ----- Export actions (home-level) -----
     def on_export_menu(self):
         # quick chooser window
         dlg = tk.Toplevel(self)
         dlg.title("Export Attendance")
-        dlg.geometry("360x140")
+        dlg.geometry("440x240")
         ttk.Label(dlg, text="Choose export format:", font=("Segoe UI", 11, "bold")).pack(pady=10)
+        flt = ttk.Frame(dlg); flt.pack(pady=4)
+        e_start, e_end = tk.StringVar(), tk.StringVar()
+        e_dept = tk.StringVar()
+        ttk.Label(flt, text="From").grid(row=0, column=0, padx=4)
+        ttk.Entry(flt, textvariable=e_start, width=11).grid(row=0, column=1)
+        ttk.Label(flt, text="To").grid(row=0, column=2, padx=4)
+        ttk.Entry(flt, textvariable=e_end, width=11).grid(row=0, column=3)
+        depts = sorted({r[3] for r in user_directory().records() if r[3]})
+        e_group = tk.StringVar(value="date")
+        ttk.Label(flt, text="Dept").grid(row=1, column=0, padx=4, pady=4)
+        ttk.Combobox(flt, textvariable=e_dept, values=[""] + depts, width=11, state="readonly").grid(
+            row=1, column=1, sticky="w", pady=4)
+        ttk.Label(flt, text="PDF by").grid(row=1, column=2, padx=4)
+        ttk.Combobox(flt, textvariable=e_group, values=["date", "department", "none"], width=11,
+                     state="readonly").grid(row=1, column=3, sticky="w")
+
+        def run(export):
+            f = {"start": e_start.get().strip() or None, "end": e_end.get().strip() or None,
+                 "department": e_dept.get().strip() or None}
+            if export == self.export_pdf:
+                f["group_by"] = None if e_group.get() == "none" else e_group.get()
+            dlg.destroy()
+            export(**f)
+
         row = ttk.Frame(dlg); row.pack(pady=6)
-        ttk.Button(row, text="Export to Excel (.xlsx)", command=lambda: [dlg.destroy(), self.export_excel()]).pack(side="left", padx=6)
-        ttk.Button(row, text="Export to PDF (.pdf)", command=lambda: [dlg.destroy(), self.export_pdf()]).pack(side="left", padx=6)
+        ttk.Button(row, text="Export to Excel (.xlsx)", command=lambda: run(self.export_excel)).pack(side="left", padx=6)
+        ttk.Button(row, text="Export to PDF (.pdf)", command=lambda: run(self.export_pdf)).pack(side="left", padx=6)
+        ttk.Button(dlg, text="Daily summary (.xlsx)", command=lambda: run(self.export_summary)).pack(pady=2)
 
-    def export_excel(self):
-        df = attendance_df()
-        if df.empty:
-            messagebox.showinfo("No Data", "No attendance to export.")
-            return
+    def export_excel(self, start=None, end=None, department=None):
         path = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
             filetypes=[("Excel Workbook", "*.xlsx")],
@@ -316,18 +611,10 @@ class App(tk.Tk):
         )
         if not path:
             return
-        try:
-            n = export_attendance_to_excel(path)
-            speak(self.engine, "Export completed.")
-            messagebox.showinfo("Exported", f"Saved {n} rows to:\n{path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export: {e}")
+        from app.exporter import export_attendance_to_excel
+        self.run_export(export_attendance_to_excel, path, start=start, end=end, department=department)
 
-    def export_pdf(self):
-        df = attendance_df()
-        if df.empty:
-            messagebox.showinfo("No Data", "No attendance to export.")
-            return
+    def export_pdf(self, start=None, end=None, department=None, group_by="date"):
         path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF", "*.pdf")],
@@ -335,12 +622,60 @@ class App(tk.Tk):
         )
         if not path:
             return
-        try:
-            n = export_attendance_to_pdf(path, title="Attendance Report")
+        from app.exporter import export_attendance_to_pdf
+        self.run_export(export_attendance_to_pdf, path, title="Attendance Report",
+                        start=start, end=end, department=department, group_by=group_by)
+
+    def export_summary(self, start=None, end=None, department=None):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel Workbook", "*.xlsx")],
+            title="Save Daily Summary as Excel"
+        )
+        if not path:
+            return
+        from app.exporter import export_summary_to_excel
+        self.run_export(export_summary_to_excel, path, start=start, end=end, department=department)
+
+    def run_export(self, export, path, **kwargs):
+        """
+        Run an exporter as a background task with a progress window and Cancel.
+        It writes a temp file next to `path`, which replaces `path` only when
+        rows were exported; a cancelled or failed export leaves `path` as it was.
+        """
+        dlg, bar = self.task_dialog("Exporting...", f"Writing {path}", cancel=lambda: task.cancel())
+        target = Path(path)
+        tmp = target.with_name(target.stem + ".partial" + target.suffix)
+
+        def work(t):
+            rows = export(str(tmp), progress=t.checkpoint, **kwargs)
+            if rows:
+                tmp.replace(target)
+            else:
+                tmp.unlink(missing_ok=True)
+            return rows
+
+        def done(rows):
+            self.close_dialog(dlg)
+            if not rows:
+                messagebox.showinfo("No Data", "No attendance to export.")
+                return
             speak(self.engine, "Export completed.")
-            messagebox.showinfo("Exported", f"Saved {n} rows to:\n{path}")
-        except Exception as e:
+            messagebox.showinfo("Exported", f"Saved {rows} rows to:\n{path}")
+
+        def cancelled():
+            self.close_dialog(dlg)
+            tmp.unlink(missing_ok=True)   # only the half-written temp file
+
+        def failed(e):
+            self.close_dialog(dlg)
+            tmp.unlink(missing_ok=True)
             messagebox.showerror("Error", f"Failed to export: {e}")
 
+        task = self.tasks.submit(work,
+                                 name=getattr(export, "__name__", "export"),
+                                 on_done=done, on_error=failed, on_cancel=cancelled,
+                                 on_progress=lambda d, n: bar.configure(value=d / n if n else 1.0))
+
 if __name__ == "__main__":
     App().mainloop()
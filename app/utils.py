@@ -1,46 +1,168 @@
 from pathlib import Path
-import pandas as pd
-import cv2
+import threading
 from datetime import datetime
-from .config import DATASET_DIR, MODELS_DIR, USERS_CSV, ATTENDANCE_CSV
+from typing import TYPE_CHECKING
+from .config import DATASET_DIR, MODELS_DIR
+from .storage import storage
+from .presence import invalidate_presence
+from .directory import invalidate_directory
+from .metrics import log
+from .rollups import attendance_rollups
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 def ensure_dirs():
     DATASET_DIR.mkdir(parents=True, exist_ok=True)
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
 def speak(engine, text: str):
+    """Say `text`: a SpeechWorker just queues it, a bare pyttsx3 engine blocks until spoken."""
     try:
         engine.say(text)
-        engine.runAndWait()
+        if hasattr(engine, "runAndWait"):
+            engine.runAndWait()
     except Exception:
         pass
 
 def get_cascade():
+    import cv2
     cascade_path = Path(cv2.data.haarcascades) / "haarcascade_frontalface_default.xml"
     if not cascade_path.exists():
         raise FileNotFoundError("OpenCV haarcascade not found in cv2.data.haarcascades")
     return cv2.CascadeClassifier(str(cascade_path))
 
 def users_df():
-    if not USERS_CSV.exists():
-        pd.DataFrame(columns=["id","name","sex","department"]).to_csv(USERS_CSV, index=False)
-    return pd.read_csv(USERS_CSV, dtype={"id": int, "name": str, "sex": str, "department": str})
+    return storage().users_df()
 
-def save_users_df(df: pd.DataFrame):
-    df.to_csv(USERS_CSV, index=False)
+def save_users_df(df: "pd.DataFrame"):
+    storage().save_users_df(df)
+    invalidate_directory()
 
 def attendance_df():
-    if not ATTENDANCE_CSV.exists():
-        pd.DataFrame(columns=["date","time","id","name"]).to_csv(ATTENDANCE_CSV, index=False)
-    return pd.read_csv(ATTENDANCE_CSV, dtype={"date": str, "time": str, "id": int, "name": str})
+    return storage().attendance_df()
+
+def attendance_between(start: str = None, end: str = None):
+    """Attendance rows dated start..end inclusive ("YYYY-MM-DD"; None leaves that side open)."""
+    return storage().attendance_between(start, end)
+
+def save_attendance_df(df: "pd.DataFrame"):
+    """Replace all attendance rows (used for deletions)."""
+    storage().save_attendance_df(df)
+    invalidate_presence()
+    _refresh_rollups()
+
+def delete_attendance(keys=None, start: str = None, end: str = None, pid: int = None):
+    """
+    Bulk delete: rows whose (date, time, id) is in `keys`, or all rows in a date
+    range and/or of one user. Returns the number of rows deleted.
+    """
+    if keys is None and start is None and end is None and pid is None:
+        raise ValueError("delete_attendance needs keys, a date range or a user id")
+    n = storage().delete_attendance(keys, start=start, end=end, pid=pid)
+    if n:
+        invalidate_presence()
+        if keys is not None:
+            _refresh_rollups(days={str(k[0]) for k in keys})
+        else:
+            _refresh_rollups(start=start, end=end)
+    return n
+
+def _refresh_rollups(days=None, start: str = None, end: str = None):
+    """Recompute the affected part of the rollups (once they are loaded; see load_rollups)."""
+    with _log_lock:
+        rollups = _rollups_ready
+        if rollups is None:
+            if _rollups_loading:
+                _rollups_missed.append((days, start, end))
+            return   # otherwise they are checked against storage when loaded
+    if days is not None:
+        rollups.refresh_days(days)
+    else:
+        rollups.rebuild(start, end)
+
+_log_lock = threading.Lock()
+
+# Rollups are fed by log_attendance only once load_rollups() has finished:
+# loading may rebuild them from the whole history, which must not happen on
+# the recognition thread under _log_lock. Deletions made meanwhile are
+# recorded in _rollups_missed and recomputed before the handover; the days
+# of rows logged meanwhile are recent, so they are re-read from the tail of
+# storage (rows_since) under _log_lock at the handover itself.
+_rollups_ready = None
+_rollups_missed = []
+_rollups_logged_days = set()
+_rollups_loading = False
+
+def load_rollups():
+    """Load (or rebuild) the attendance rollups and start feeding them new rows. Blocking."""
+    global _rollups_ready, _rollups_loading
+    with _log_lock:
+        if _rollups_ready is not None:
+            return _rollups_ready
+        _rollups_loading = True
+    try:
+        rollups = attendance_rollups()
+    except Exception:
+        with _log_lock:
+            _rollups_loading = False   # the next logged row tries again
+            del _rollups_missed[:]
+            _rollups_logged_days.clear()
+        raise
+    rollups.guard = _log_lock   # see AttendanceRollups.save
+    while True:
+        with _log_lock:
+            missed = _rollups_missed[:]
+            del _rollups_missed[:]
+            if not missed:
+                rollups.refresh_recent(_rollups_logged_days)
+                _rollups_logged_days.clear()
+                _rollups_ready = rollups
+                _rollups_loading = False
+                return rollups
+        for days, start, end in missed:
+            if days is not None:
+                rollups.refresh_days(days)
+            else:
+                rollups.rebuild(start, end)
+
+def _rollups_for_log(days):
+    """The rollups to add() rows to, or None (and the days recorded) while they load. Call under _log_lock."""
+    global _rollups_loading
+    if _rollups_ready is not None:
+        return _rollups_ready
+    _rollups_logged_days.update(days)
+    if not _rollups_loading:
+        _rollups_loading = True   # set here too, so only one loader thread is started
+        threading.Thread(target=_load_rollups_logged, name="rollups-load", daemon=True).start()
+    return None
+
+def _load_rollups_logged():
+    try:
+        load_rollups()
+    except Exception as e:
+        log.error("Could not load the attendance rollups: %s", e)
 
 def log_attendance(pid: int, name: str):
-    df = attendance_df()
-    from datetime import datetime
     now = datetime.now()
     date_str = now.strftime("%Y-%m-%d")
     time_str = now.strftime("%H:%M:%S")
-    # Always append a new row
-    df.loc[len(df)] = {"date": date_str, "time": time_str, "id": pid, "name": name}
-    df.to_csv(ATTENDANCE_CSV, index=False)
+    # Always append a new row, without re-reading the history
+    with _log_lock:
+        storage().append_attendance(date_str, time_str, int(pid), name)
+        rollups = _rollups_for_log((date_str,))
+        if rollups is not None:
+            rollups.add(date_str, time_str, int(pid))
     return True
+
+def log_attendance_rows(rows):
+    """Batch form of log_attendance() for (date, time, id, name) rows that were already timestamped."""
+    if not rows:
+        return 0
+    with _log_lock:
+        storage().append_attendance_many(rows)
+        rollups = _rollups_for_log({r[0] for r in rows})
+        if rollups is not None:
+            for date_str, time_str, pid, _ in rows:
+                rollups.add(date_str, time_str, int(pid))
+    return len(rows)
@@ -0,0 +1,65 @@
+"""
+Bulk attendance delete: select `--delete` random (date, time, id) keys out of
+`--rows` and remove them with storage.delete_attendance(), for both backends.
+
+    python -m benchmarks.bench_delete                       # 1,000,000 rows, 5,000 keys
+    python -m benchmarks.bench_delete --rows 200000 --delete 1000 --backend sqlite
+"""
+import argparse, tempfile, time
+from datetime import date, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from app.storage import CsvStorage, SqliteStorage
+
+
+def make_rows(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    day0 = date(2024, 1, 1)
+    days = rng.integers(0, 365, n)
+    secs = rng.integers(0, 86400, n)
+    return pd.DataFrame({
+        "date": [(day0 + timedelta(days=int(d))).isoformat() for d in days],
+        "time": [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in secs],
+        "id": rng.integers(1, 500, n),
+        "name": "User",
+    })
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--delete", type=int, default=5_000)
+    ap.add_argument("--backend", choices=["csv", "sqlite", "both"], default="both")
+    args = ap.parse_args()
+
+    df = make_rows(args.rows)
+    pick = np.random.default_rng(1).choice(len(df), args.delete, replace=False)
+    keys = list(df.iloc[pick][["date", "time", "id"]].itertuples(index=False, name=None))
+    expected = len(df) - len(df.merge(pd.DataFrame(keys, columns=["date", "time", "id"]), how="left",
+                                      indicator=True).query('_merge == "left_only"'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        stores = []
+        if args.backend in ("csv", "both"):
+            stores.append(CsvStorage(tmp / "users.csv", tmp / "attendance.csv"))
+        if args.backend in ("sqlite", "both"):
+            stores.append(SqliteStorage(tmp / "attendance.db"))
+        for store in stores:
+            store.save_attendance_df(df)
+            t0 = time.perf_counter()
+            n = store.delete_attendance(keys)
+            dt = time.perf_counter() - t0
+            left = len(store.attendance_df())
+            print(f"{store.name:<7} deleted {n:>6} of {len(df)} rows in {dt * 1000:8.1f} ms"
+                  f"  (expected {expected}, {left} left)")
+            t0 = time.perf_counter()
+            n = store.delete_attendance(start="2024-03-01", end="2024-03-31")
+            print(f"{'':<7} date range: {n:>6} rows in {(time.perf_counter() - t0) * 1000:8.1f} ms")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
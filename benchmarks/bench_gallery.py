@@ -0,0 +1,98 @@
+"""
+Accuracy / latency report: full LBPH gallery vs compacted prototypes vs two-stage search.
+
+    python -m benchmarks.bench_gallery                      # app/dataset (synthetic if empty)
+    python -m benchmarks.bench_gallery --dataset path/to/dataset --per-user 10 --holdout 5
+    python -m benchmarks.bench_gallery --synthetic 100 --samples 60
+
+Reads the usual <id>_<name>/*.png layout. The last `--holdout` images of
+every user are used as queries, the rest as the gallery.
+"""
+import argparse, time
+from pathlib import Path
+import numpy as np
+import cv2
+
+from app.config import DATASET_DIR, GALLERY_PROTOTYPES_PER_USER, GALLERY_SHORTLIST
+from app.lbph import LBPHEngine
+from app.gallery import select_prototypes, TwoStageIndex
+from benchmarks.synth import synthetic_faces
+
+
+def load_dataset(root: Path):
+    per_user = {}
+    for person_dir in sorted(root.iterdir()) if root.exists() else []:
+        if not person_dir.is_dir():
+            continue
+        try:
+            label = int(person_dir.name.split("_", 1)[0])
+        except ValueError:
+            continue
+        imgs = [cv2.imread(str(p), cv2.IMREAD_GRAYSCALE) for p in sorted(person_dir.glob("*.png"))]
+        imgs = [cv2.resize(i, (200, 200)) for i in imgs if i is not None]
+        if imgs:
+            per_user[label] = imgs
+    return per_user
+
+
+def split(per_user, holdout):
+    g_img, g_lbl, q_img, q_lbl = [], [], [], []
+    for label, imgs in per_user.items():
+        k = min(holdout, len(imgs) - 1)
+        for img in imgs[:len(imgs) - k]:
+            g_img.append(img); g_lbl.append(label)
+        for img in imgs[len(imgs) - k:]:
+            q_img.append(img); q_lbl.append(label)
+    return g_img, np.array(g_lbl, np.int32), q_img, np.array(q_lbl, np.int32)
+
+
+def run(name, predictor, hists, truth, reference=None, size=None):
+    t0 = time.perf_counter()
+    labels, _ = predictor.predict_histograms(hists)
+    ms = (time.perf_counter() - t0) / max(1, len(hists)) * 1000
+    acc = float((labels == truth).mean()) if len(truth) else 0.0
+    agree = float((labels == reference).mean()) if reference is not None else 1.0
+    print(f"{name:<14} {size:>10,} {acc * 100:>9.1f}% {agree * 100:>11.1f}% {ms:>10.2f}")
+    return labels
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--dataset", type=Path, default=DATASET_DIR)
+    ap.add_argument("--synthetic", type=int, default=0, help="use N synthetic users instead of a dataset")
+    ap.add_argument("--samples", type=int, default=60, help="samples per synthetic user")
+    ap.add_argument("--holdout", type=int, default=5, help="query images per user")
+    ap.add_argument("--per-user", type=int, default=GALLERY_PROTOTYPES_PER_USER)
+    ap.add_argument("--shortlist", type=int, default=GALLERY_SHORTLIST)
+    args = ap.parse_args()
+
+    per_user = {} if args.synthetic else load_dataset(args.dataset)
+    if not per_user:
+        users = args.synthetic or 30
+        print(f"[INFO] using {users} synthetic users x {args.samples} samples")
+        imgs, lbls = synthetic_faces(users, args.samples)
+        for img, lbl in zip(imgs, lbls):
+            per_user.setdefault(int(lbl), []).append(img)
+
+    g_img, g_lbl, q_img, q_lbl = split(per_user, args.holdout)
+    full = LBPHEngine()
+    full.train(np.stack(g_img), g_lbl)
+    hists = full.histograms(np.stack(q_img))
+
+    t0 = time.perf_counter()
+    proto, cluster = select_prototypes(full, args.per_user)
+    t_cluster = time.perf_counter() - t0
+    compact = LBPHEngine()
+    compact.add_counts(full.counts[:, proto].T, full.labels[proto])
+    two_stage = TwoStageIndex(full, proto, cluster, shortlist=args.shortlist)
+
+    print(f"users={len(per_user)} gallery={len(g_lbl)} queries={len(q_lbl)} "
+          f"prototypes/user<={args.per_user} shortlist={args.shortlist} (clustering {t_cluster:.2f}s)")
+    print(f"{'gallery':<14} {'templates':>10} {'accuracy':>10} {'agree(full)':>12} {'ms/face':>10}")
+    ref = run("full", full, hists, q_lbl, size=len(full))
+    run("prototypes", compact, hists, q_lbl, ref, size=len(compact))
+    run("two-stage", two_stage, hists, q_lbl, ref, size=len(proto))
+
+
+if __name__ == "__main__":
+    main()
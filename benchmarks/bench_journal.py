@@ -0,0 +1,74 @@
+"""
+Benchmark attendance logging against a large history.
+
+    python -m benchmarks.bench_journal --rows 1000000 --appends 2000
+
+Builds attendance.csv files of increasing size in a temp folder and times
+AttendanceJournal.append() on each. Per-row cost should stay flat as the
+history grows. With --legacy the old read-modify-rewrite path is timed too
+(slow: it rewrites the whole file on every call).
+"""
+import argparse, tempfile, time
+from pathlib import Path
+
+from app.journal import AttendanceJournal, HEADER
+
+
+def make_history(path: Path, rows: int):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(HEADER)
+        chunk = []
+        for i in range(rows):
+            day, sec = divmod(i, 86400)
+            chunk.append(f"2024-{1 + (day // 28) % 12:02d}-{1 + day % 28:02d},"
+                         f"{sec // 3600:02d}:{sec // 60 % 60:02d}:{sec % 60:02d},"
+                         f"{100 + i % 500},User {i % 500}\n")
+            if len(chunk) >= 10000:
+                f.writelines(chunk)
+                chunk.clear()
+        f.writelines(chunk)
+
+
+def time_journal(path: Path, appends: int, policy: str):
+    j = AttendanceJournal(path, fsync_policy=policy, compact_interval=0)
+    t0 = time.perf_counter()
+    for i in range(appends):
+        j.append("2099-01-01", f"{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}", 180, "Alex Raji")
+    elapsed = time.perf_counter() - t0
+    j.stop()
+    return elapsed / appends
+
+
+def time_legacy(path: Path, appends: int):
+    import pandas as pd
+    t0 = time.perf_counter()
+    for i in range(appends):
+        df = pd.read_csv(path, dtype={"date": str, "time": str, "id": int, "name": str})
+        df.loc[len(df)] = {"date": "2099-01-01", "time": f"00:00:{i % 60:02d}", "id": 180, "name": "Alex Raji"}
+        df.to_csv(path, index=False)
+    return (time.perf_counter() - t0) / appends
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=1_000_000, help="largest history size")
+    ap.add_argument("--appends", type=int, default=2000, help="rows appended per measurement")
+    ap.add_argument("--policy", default="batch", choices=["always", "batch", "never"])
+    ap.add_argument("--legacy", action="store_true", help="also time the old pandas rewrite (3 calls)")
+    args = ap.parse_args()
+
+    sizes = sorted({s for s in (1_000, 100_000, args.rows) if s <= args.rows})
+    print(f"{'history rows':>14} {'journal us/row':>16}" + (f" {'legacy ms/row':>15}" if args.legacy else ""))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = Path(tmp) / f"attendance_{n}.csv"
+            make_history(path, n)
+            line = f"{n:>14,} {time_journal(path, args.appends, args.policy) * 1e6:>16.1f}"
+            if args.legacy:
+                make_history(path, n)
+                line += f" {time_legacy(path, 3) * 1e3:>15.1f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
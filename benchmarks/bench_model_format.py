@@ -0,0 +1,73 @@
+"""
+Model file formats: OpenCV YAML (lbph_model.yml) vs the binary layout
+(lbph_model.bin, model_store.write_binary_model) - write time, file size,
+load time (cv2 read vs memory-mapped) and recognition parity.
+
+    python -m benchmarks.bench_model_format                  # 50 users x 20 samples
+    python -m benchmarks.bench_model_format --users 200 --samples 30 --queries 100
+
+Parity: every query must get the same label from the YAML model read by
+cv2.face and from the binary model, with confidences equal to float
+precision. Exits non-zero on any mismatch.
+"""
+import argparse, sys, tempfile, time
+from pathlib import Path
+import numpy as np
+import cv2
+
+from app.lbph import LBPHEngine
+from app.model_store import write_lbph_model, write_binary_model, load_binary_model
+from benchmarks.synth import synthetic_faces
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--samples", type=int, default=20)
+    ap.add_argument("--queries", type=int, default=40)
+    args = ap.parse_args()
+
+    images, labels = synthetic_faces(args.users, args.samples)
+    queries, _ = synthetic_faces(args.users, 1, seed=1)
+    queries = np.stack(queries[:args.queries])
+    hists = LBPHEngine().histograms(np.stack(images))
+    print(f"{len(labels)} templates x {hists.shape[1]} bins, {len(queries)} queries")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        yml, binf = Path(tmp) / "lbph_model.yml", Path(tmp) / "lbph_model.bin"
+        _, w_yml = timed(write_lbph_model, yml, hists, labels)
+        _, w_bin = timed(write_binary_model, binf, hists, labels)
+
+        rec = cv2.face.LBPHFaceRecognizer_create()
+        _, r_yml = timed(rec.read, str(yml))
+        _, r_eng = timed(LBPHEngine.from_recognizer, rec)
+        eng, r_mmap = timed(load_binary_model, binf)
+        _, r_copy = timed(load_binary_model, binf, mmap=False)
+
+        print(f"{'':10}{'size':>10}{'write':>10}{'load':>12}")
+        print(f"{'yaml':10}{yml.stat().st_size / 1e6:8.1f}MB{w_yml:9.2f}s{r_yml:11.3f}s"
+              f"   (+{r_eng:.3f}s into the numpy engine)")
+        print(f"{'binary':10}{binf.stat().st_size / 1e6:8.1f}MB{w_bin:9.2f}s{r_mmap:11.4f}s"
+              f"   mmap   ({r_copy:.3f}s read into memory)")
+
+        (lab, conf), p_first = timed(eng.predict_batch, queries)
+        _, p_warm = timed(eng.predict_batch, queries)
+        cv_lab, cv_conf = zip(*[rec.predict(q) for q in queries])
+        cv_lab, cv_conf = np.array(cv_lab), np.array(cv_conf)
+        same = np.array_equal(cv_lab, lab)
+        err = float(np.abs(cv_conf - conf).max())
+        print(f"predict {len(queries)} queries from mmap: first {p_first * 1000:.0f} ms, "
+              f"warm {p_warm * 1000:.0f} ms")
+        print(f"parity: labels identical={same}, max confidence diff {err:.2e}")
+        if not same or err > 1e-6 * max(1.0, float(np.abs(cv_conf).max())):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Startup cost: how long until the window can be shown, and how long from
+"Take Attendance" to the first recognized frame - cold, after the
+background warm-up, and for the next session in the same process (shared
+resources). Every measurement runs in a fresh interpreter.
+
+    python -m benchmarks.bench_startup                # 5 runs each
+    python -m benchmarks.bench_startup --runs 10 --users 50
+
+Without a camera the first frame is a synthetic face, and without a display
+the window step is skipped. A synthetic model is trained into a temp dir so
+the real models/ folder is never touched.
+"""
+import argparse, importlib, json, os, subprocess, sys, tempfile, time
+from pathlib import Path
+
+HEAVY = ("pandas", "reportlab", "openpyxl", "cv2", "numpy", "pyttsx3")
+
+
+def stage_import():
+    t0 = time.perf_counter()
+    importlib.import_module("app.ui")   # what starting the app imports before the window exists
+    return {"import_ui": time.perf_counter() - t0,
+            "heavy_loaded": [m for m in HEAVY if m in sys.modules]}
+
+
+def stage_window():
+    t0 = time.perf_counter()
+    import app.ui
+    try:
+        root = app.ui.App()
+    except Exception as e:   # no display
+        return {"skipped": str(e)}
+    root.update()
+    out = {"window": time.perf_counter() - t0}
+    root.destroy()
+    return out
+
+
+def session_start(backend, shared, np, face):
+    """What a Take Attendance click does before the first result: cascade, model, camera, predict."""
+    cascade = shared.cascade()
+    recognizer = shared.recognizer()
+    cap = backend.open_camera()
+    ok, frame = cap.read()
+    cap.release()
+    if ok:
+        gray = backend.cv2.cvtColor(frame, backend.cv2.COLOR_BGR2GRAY)
+        boxes = backend.detect_faces(cascade, gray)
+        if len(boxes):
+            x, y, w, h = boxes[0]
+            face = backend.cv2.resize(gray[y:y+h, x:x+w], (200, 200))
+    else:
+        backend.detect_faces(cascade, np.zeros((480, 640), np.uint8))
+    backend.predict_faces(recognizer, [face])
+    return bool(ok)
+
+
+def stage_first_frame(model: str, warm: bool):
+    out = {}
+    t0 = time.perf_counter()   # the click; cold runs pay for importing OpenCV here
+    from app import backend, resources
+    import numpy as np
+    from benchmarks.synth import synthetic_faces
+    resources._resources = resources.SharedResources(model)
+    face = synthetic_faces(1, 1)[0][0]
+    if warm:
+        backend.warm_up()
+        out["warm_up"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+    out["camera"] = session_start(backend, resources.resources(), np, face)
+    out["first_frame"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    session_start(backend, resources.resources(), np, face)
+    out["next_session"] = time.perf_counter() - t0
+    return out
+
+
+def run_stage(args):
+    t0 = time.perf_counter()
+    res = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup"] + args,
+                         capture_output=True, text=True, check=True)
+    data = json.loads(res.stdout.strip().splitlines()[-1])
+    data["process"] = time.perf_counter() - t0
+    return data
+
+
+def train_model(path: Path, users: int, samples: int):
+    import cv2
+    from benchmarks.synth import synthetic_faces
+    images, labels = synthetic_faces(users, samples)
+    rec = cv2.face.LBPHFaceRecognizer_create()
+    rec.train(images, labels)
+    rec.write(str(path))
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--users", type=int, default=30)
+    ap.add_argument("--samples", type=int, default=20)
+    ap.add_argument("--stage", choices=["import", "window", "first_frame"], help=argparse.SUPPRESS)
+    ap.add_argument("--model", help=argparse.SUPPRESS)
+    ap.add_argument("--warm", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.stage:
+        if args.stage == "import":
+            out = stage_import()
+        elif args.stage == "window":
+            out = stage_window()
+        else:
+            out = stage_first_frame(args.model, args.warm)
+        print(json.dumps(out))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = Path(tmp) / "lbph_model.yml"
+        train_model(model, args.users, args.samples)
+        print(f"{os.cpu_count()} CPUs, model {args.users} users x {args.samples} samples, {args.runs} runs")
+
+        runs = [run_stage(["--stage", "import"]) for _ in range(args.runs)]
+        print(f"import app.ui        {median([r['import_ui'] for r in runs]) * 1000:7.1f} ms"
+              f"   (process {median([r['process'] for r in runs]) * 1000:.0f} ms)"
+              f"   heavy modules loaded: {runs[0]['heavy_loaded'] or 'none'}")
+
+        win = run_stage(["--stage", "window"])
+        if "skipped" in win:
+            print(f"window               skipped ({win['skipped']})")
+        else:
+            runs = [win] + [run_stage(["--stage", "window"]) for _ in range(args.runs - 1)]
+            print(f"window shown         {median([r['window'] for r in runs]) * 1000:7.1f} ms")
+
+        for warm in (False, True):
+            runs = [run_stage(["--stage", "first_frame", "--model", str(model)] + (["--warm"] if warm else []))
+                    for _ in range(args.runs)]
+            label = "first frame (warm)" if warm else "first frame (cold)"
+            extra = f"   warm-up {median([r['warm_up'] for r in runs]) * 1000:.0f} ms" if warm else ""
+            print(f"{label:<20} {median([r['first_frame'] for r in runs]) * 1000:7.1f} ms"
+                  f"   camera={runs[0]['camera']}{extra}")
+        print(f"next session         {median([r['next_session'] for r in runs]) * 1000:7.1f} ms"
+              f"   (shared model and cascade)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Scripted benchmarks of the hot paths in app/backend.py, runnable without a
+webcam, with JSON output for tracking regressions between commits.
+
+    python -m benchmarks.bench_suite                                  # everything, synthetic data
+    python -m benchmarks.bench_suite --only recognition --source clip.mp4 --frames 600
+    python -m benchmarks.bench_suite --users 100 --samples 40 --rows 50000 --json results.json
+
+recognition - frames from --source (default "synthetic", see app/sources.py:
+              a video file, an image folder or a camera index also work)
+              through cvtColor -> Haar detection -> LBPH prediction; reports
+              fps and per-frame detection / per-face recognition latency
+              percentiles (--adaptive: downscaled / ROI detection). Synthetic faces are not found by the Haar
+              cascade, so for them the known paste positions are recognized.
+training    - a synthetic <id>_<name> dataset: scan, decode + featurize, write model
+export      - Excel and PDF export of a synthetic attendance.csv
+
+Everything is written to a temp folder; the app's own data is not touched.
+"""
+import argparse, json, os, platform, sys, tempfile, time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import cv2
+
+from app import backend, directory, storage
+from app.config import RECOGNITION_ENGINE, MODEL_FORMAT, TRAIN_WORKERS
+from app.model_store import scan_dataset, write_model, MODEL_PATH
+from app.sources import open_source, SyntheticSource
+from app.metrics import metrics
+from app.detection import AdaptiveDetector
+from benchmarks.synth import synthetic_faces, write_dataset, write_attendance
+
+
+def percentiles(seconds):
+    """{"p50", "p95", "p99", "mean", "n"} in milliseconds."""
+    if not seconds:
+        return {"n": 0}
+    ms = np.asarray(seconds) * 1000.0
+    return {"n": int(len(ms)), "mean": round(float(ms.mean()), 3),
+            **{f"p{p}": round(float(np.percentile(ms, p)), 3) for p in (50, 95, 99)}}
+
+
+def bench_recognition(args, tmp: Path):
+    images, labels = synthetic_faces(args.users, args.samples)
+    model = tmp / MODEL_PATH.name
+    hists = backend.LBPHEngine().histograms(np.stack(images))
+    write_model(model, list(hists), labels)
+    recognizer = backend.load_recognizer(model)
+    cascade = backend.resources().cascade()
+    if args.adaptive:
+        cascade = AdaptiveDetector(cascade)
+    metrics().reset()
+
+    if args.source == "synthetic":
+        src = SyntheticSource(count=args.frames, faces=args.faces, images=images[::args.samples])
+    else:
+        src = open_source(args.source, loop=True)
+    detect, recognize, per_frame = [], [], []
+    faces_seen = 0
+    t_start = time.perf_counter()
+    for _ in range(args.frames):
+        t0 = time.perf_counter()
+        ok, frame = src.read()
+        if not ok:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        t1 = time.perf_counter()
+        boxes = backend.detect_faces(cascade, gray)
+        detect.append(time.perf_counter() - t1)
+        if not len(boxes):
+            boxes = getattr(src, "truth", [])
+        crops = [cv2.resize(gray[y:y+h, x:x+w], (200, 200)) for x, y, w, h in boxes]
+        if crops:
+            t2 = time.perf_counter()
+            backend.predict_faces(recognizer, crops)
+            recognize.append((time.perf_counter() - t2) / len(crops))
+            faces_seen += len(crops)
+        per_frame.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - t_start
+    src.release()
+    return {"source": str(args.source), "engine": type(recognizer).__name__,
+            "templates": int(len(labels)), "frames": len(per_frame), "faces": faces_seen,
+            "fps": round(len(per_frame) / elapsed, 2) if elapsed else 0.0,
+            "frame_ms": percentiles(per_frame), "detect_ms": percentiles(detect),
+            "recognize_ms_per_face": percentiles(recognize),
+            "stages": metrics().snapshot(events=False)["timers"],
+            "detector": cascade.stats() if args.adaptive else "full-frame"}
+
+
+def bench_training(args, tmp: Path):
+    root = tmp / "train"
+    t0 = time.perf_counter()
+    ids = write_dataset(root / "dataset", args.users, args.samples)
+    generate = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    folders = scan_dataset(ids, root / "dataset", verbose=False)
+    scan = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    hists, labels = backend.extract_training_set(folders, use_cache=False, dataset_dir=root / "dataset")
+    extract = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    write_model(root / MODEL_PATH.name, hists, labels)
+    write = time.perf_counter() - t0
+    return {"users": len(ids), "images": len(labels), "workers": TRAIN_WORKERS, "format": MODEL_FORMAT,
+            "generate_s": round(generate, 3), "scan_s": round(scan, 3), "extract_s": round(extract, 3),
+            "write_model_s": round(write, 3), "total_s": round(scan + extract + write, 3),
+            "images_per_s": round(len(labels) / (scan + extract + write), 1)}
+
+
+def bench_export(args, tmp: Path):
+    from app.exporter import export_attendance_to_excel, export_attendance_to_pdf
+    root = tmp / "export"
+    root.mkdir()
+    ids = write_dataset(root / "dataset", min(args.users, 50), 1, root / "users.csv")
+    write_attendance(root / "attendance.csv", args.rows, ids)
+    # point the process-wide storage / user index at the synthetic files
+    store = storage._storage = storage.CsvStorage(root / "users.csv", root / "attendance.csv")
+    directory._directory = directory.UserDirectory(dataset_dir=root / "dataset")
+
+    out = {"rows": args.rows}
+    t0 = time.perf_counter()
+    n = export_attendance_to_excel(str(root / "attendance.xlsx"))
+    out["excel_s"] = round(time.perf_counter() - t0, 3)
+    out["excel_rows_per_s"] = round(n / out["excel_s"], 1)
+    start = None
+    if args.pdf_rows < args.rows:   # only the newest days, about pdf_rows rows
+        start = store.attendance_df()["date"].sort_values(ascending=False).iloc[args.pdf_rows - 1]
+    t0 = time.perf_counter()
+    n = export_attendance_to_pdf(str(root / "attendance.pdf"), start=start)
+    out["pdf_rows"] = n
+    out["pdf_s"] = round(time.perf_counter() - t0, 3)
+    out["pdf_rows_per_s"] = round(n / out["pdf_s"], 1)
+    return out
+
+
+BENCHES = {"recognition": bench_recognition, "training": bench_training, "export": bench_export}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", nargs="+", choices=list(BENCHES), default=list(BENCHES))
+    ap.add_argument("--source", default="synthetic", help="frame source spec (app/sources.py)")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--faces", type=int, default=1, help="faces per synthetic frame")
+    ap.add_argument("--adaptive", action="store_true", help="detect with app/detection.py's AdaptiveDetector")
+    ap.add_argument("--users", type=int, default=30)
+    ap.add_argument("--samples", type=int, default=20)
+    ap.add_argument("--rows", type=int, default=50000, help="attendance rows for the export bench")
+    ap.add_argument("--pdf-rows", type=int, default=5000, help="rows put into the PDF (it is slow)")
+    ap.add_argument("--json", type=Path, help="also write the results to this file")
+    args = ap.parse_args()
+
+    report = {"meta": {"time": datetime.now().isoformat(timespec="seconds"),
+                       "python": sys.version.split()[0], "platform": platform.platform(),
+                       "cpus": os.cpu_count(), "opencv": cv2.__version__, "numpy": np.__version__,
+                       "engine": RECOGNITION_ENGINE, "model_format": MODEL_FORMAT,
+                       "args": {k: str(v) for k, v in vars(args).items()}},
+              "results": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.only:
+            print(f"[INFO] {name}...", flush=True)
+            res = report["results"][name] = BENCHES[name](args, Path(tmp))
+            for k, v in res.items():
+                print(f"  {k:<24} {v}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=1))
+        print(f"[INFO] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Training throughput vs worker count: decode + LBPH feature extraction per
+user folder (backend.extract_training_set), on a synthetic PNG dataset.
+
+    python -m benchmarks.bench_training                       # 40 users x 30 samples
+    python -m benchmarks.bench_training --users 100 --samples 50 --workers 1 2 4 8
+    python -m benchmarks.bench_training --cache               # also time warm image-cache runs
+
+Each worker count trains from cold PNGs (no image cache) and checks that the
+merged histograms are identical to the single-worker run.
+"""
+import argparse, os, tempfile, time
+from pathlib import Path
+import numpy as np
+
+from app.backend import extract_training_set
+from app.model_store import scan_dataset
+from benchmarks.synth import write_dataset
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=40)
+    ap.add_argument("--samples", type=int, default=30)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--cache", action="store_true", help="also time runs from a warm image cache")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        ids = write_dataset(root / "dataset", args.users, args.samples)
+        folders = scan_dataset(ids, root / "dataset", verbose=False)
+        n = sum(len(v["files"]) for v in folders.values())
+        print(f"{len(folders)} users, {n} images, {os.cpu_count()} CPUs")
+
+        reference, base = None, None
+        for w in args.workers:
+            t0 = time.perf_counter()
+            hists, labels = extract_training_set(folders, workers=w, use_cache=False,
+                                                 dataset_dir=root / "dataset")
+            dt = time.perf_counter() - t0
+            mat = np.concatenate([np.asarray(h).reshape(1, -1) for h in hists])
+            if reference is None:
+                reference, base = (mat, labels), dt
+            same = np.array_equal(mat, reference[0]) and labels == reference[1]
+            print(f"workers={w:<3} cold {dt:7.2f}s  {n / dt:7.1f} img/s  x{base / dt:4.2f}"
+                  f"  identical={same}")
+
+            if args.cache:
+                cache_dir = root / f"cache{w}"
+                extract_training_set(folders, workers=w, dataset_dir=root / "dataset", cache_dir=cache_dir)
+                t0 = time.perf_counter()
+                extract_training_set(folders, workers=w, dataset_dir=root / "dataset", cache_dir=cache_dir)
+                dt = time.perf_counter() - t0
+                print(f"            warm {dt:7.2f}s  {n / dt:7.1f} img/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Parity and speed check: app.lbph.LBPHEngine vs cv2.face.LBPHFaceRecognizer.
+
+    python -m benchmarks.check_lbph_parity --users 50 --samples 20 --queries 40
+
+Trains both recognizers on the same synthetic faces and checks that every
+query gets the same label and (to float precision) the same confidence.
+Exits non-zero on any mismatch.
+
+Expect the numpy engine to be slower per face than cv2 with --workers 1.
+On one core it measured 31.5 against 23.5 ms/face at 1,000 templates, and
+98.5 against 91.1 ms/face at 4,000. Compare with --workers set to the core
+count before choosing RECOGNITION_ENGINE = "numpy".
+"""
+import argparse, sys, time
+import numpy as np
+import cv2
+
+from app.config import LBPH_RADIUS, LBPH_NEIGHBORS, LBPH_GRID_X, LBPH_GRID_Y
+from app.lbph import LBPHEngine
+from benchmarks.synth import synthetic_faces
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--samples", type=int, default=20)
+    ap.add_argument("--queries", type=int, default=40)
+    ap.add_argument("--workers", type=int, default=1, help="threads for the numpy engine")
+    args = ap.parse_args()
+
+    images, labels = synthetic_faces(args.users, args.samples)
+    queries, _ = synthetic_faces(args.users, 1, seed=1)
+    queries = queries[:args.queries]
+
+    rec = cv2.face.LBPHFaceRecognizer_create(
+        radius=LBPH_RADIUS, neighbors=LBPH_NEIGHBORS, grid_x=LBPH_GRID_X, grid_y=LBPH_GRID_Y
+    )
+    rec.train(images, labels)
+    engine = LBPHEngine.from_recognizer(rec)
+    engine.workers = args.workers
+
+    cv_hists = np.concatenate([np.asarray(h, np.float32).reshape(1, -1) for h in rec.getHistograms()])
+    feat_err = float(np.abs(LBPHEngine().histograms(np.stack(images)) - cv_hists).max())
+
+    t0 = time.perf_counter()
+    cv_out = [rec.predict(q) for q in queries]
+    t_cv = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    np_labels, np_conf = engine.predict_batch(np.stack(queries))
+    t_np = time.perf_counter() - t0
+
+    mismatches = 0
+    for (lbl, conf), l2, c2 in zip(cv_out, np_labels, np_conf):
+        if lbl != l2 or abs(conf - c2) > 1e-4 * max(1.0, abs(conf)):
+            mismatches += 1
+            print(f"  mismatch: cv2=({lbl}, {conf:.6f}) numpy=({l2}, {c2:.6f})")
+
+    print(f"gallery: {len(labels)} templates x {engine.dim} bins")
+    print(f"max histogram difference (training): {feat_err:.2e}")
+    print(f"cv2   predict: {t_cv / len(queries) * 1000:8.2f} ms/face")
+    print(f"numpy batch  : {t_np / len(queries) * 1000:8.2f} ms/face")
+    print(f"parity: {len(queries) - mismatches}/{len(queries)} identical")
+    sys.exit(1 if mismatches or feat_err > 1e-6 else 0)
+
+
+if __name__ == "__main__":
+    main()
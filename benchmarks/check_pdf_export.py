@@ -0,0 +1,70 @@
+"""
+Consistency check for the PDF report: every exported row is printed once.
+
+    python -m benchmarks.check_pdf_export --users 30 --rows 3000 --unregistered 5
+
+Writes synthetic users.csv / attendance.csv (plus rows of `--unregistered`
+IDs missing from users.csv) to a temporary directory, builds the report
+with each group_by, and checks that the rows in its tables add up to the
+returned total and to count_attendance(). Exits non-zero on any mismatch.
+"""
+import argparse, sys, tempfile
+from pathlib import Path
+
+from reportlab.platypus import Table
+
+from app import directory, exporter, storage as storage_mod
+from app.storage import CsvStorage
+from benchmarks.synth import synthetic_users, write_attendance
+
+
+def printed(store, group_by):
+    """(rows in tables, Heading1 texts) of the report's flowables."""
+    done = [0]
+    rows, headings = 0, []
+    for f in exporter._pdf_flowables(store, "check", None, None, None, group_by, 50,
+                                     store.count_attendance(), done, None):
+        if isinstance(f, Table):
+            rows += len(f._cellvalues) - 1
+        elif getattr(f, "style", None) is not None and f.style.name == "Heading1":
+            headings.append(f.text)
+    return rows, headings
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--users", type=int, default=30)
+    ap.add_argument("--rows", type=int, default=3000)
+    ap.add_argument("--unregistered", type=int, default=5, help="IDs with rows but no users.csv entry")
+    args = ap.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        users = synthetic_users(args.users)
+        with open(tmp / "users.csv", "w", encoding="utf-8") as f:
+            f.write("id,name,sex,department\n")
+            f.writelines(f"{pid},{name},{sex},{dept}\n" for pid, name, sex, dept in users)
+        ids = {u[0] for u in users} | set(range(9000, 9000 + args.unregistered))
+        write_attendance(tmp / "attendance.csv", args.rows, ids)
+
+        store = CsvStorage(tmp / "users.csv", tmp / "attendance.csv")
+        storage_mod._storage = store
+        directory._directory = directory.UserDirectory(store=store, dataset_dir=tmp / "dataset")
+        total = store.count_attendance()
+
+        for group_by in ("date", "department", None):
+            n = exporter.export_attendance_to_pdf(str(tmp / "report.pdf"), group_by=group_by)
+            rows, headings = printed(store, group_by)
+            ok = n == rows == total
+            failures += not ok
+            print(f"group_by={group_by!s:<10} returned {n}, printed {rows}, stored {total}"
+                  f"{'' if ok else '   MISMATCH'}")
+            if group_by == "department":
+                print(f"  sections: {', '.join(h.replace('Department: ', '') for h in headings)}")
+        store.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
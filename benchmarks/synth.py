@@ -0,0 +1,100 @@
+"""
+Synthetic data shared by the benchmark scripts (no camera or real faces needed).
+
+    python -m benchmarks.synth --out /tmp/synth --users 200 --samples 60 --attendance 100000
+
+writes <out>/dataset/<id>_<name>/*.png, <out>/users.csv and (with
+--attendance) <out>/attendance.csv in the app's own layouts.
+"""
+import argparse, csv
+from datetime import date, timedelta
+from pathlib import Path
+import numpy as np
+import cv2
+
+FIRST = ["Ada", "Bola", "Chidi", "Dayo", "Emeka", "Funke", "Gbenga", "Halima", "Ife", "Jide",
+         "Kemi", "Lanre", "Musa", "Ngozi", "Ola", "Segun", "Tobi", "Uche", "Yemi", "Zainab"]
+LAST = ["Adeyemi", "Bello", "Okafor", "Balogun", "Eze", "Lawal", "Nwosu", "Ogunleye", "Raji", "Sani"]
+DEPARTMENTS = ["Computer Science", "Mathematics", "Physics", "Biology", "Economics"]
+
+
+def synthetic_faces(users: int, samples: int, seed: int = 0):
+    """Smooth random 'identities' plus per-sample noise and jitter, 200x200 uint8."""
+    rng = np.random.default_rng(seed)
+    images, labels = [], []
+    for uid in range(users):
+        base = cv2.GaussianBlur(rng.integers(0, 256, (200, 200), dtype=np.uint8), (15, 15), 0)
+        for _ in range(samples):
+            img = np.roll(base, tuple(rng.integers(-3, 4, 2)), axis=(0, 1)).astype(np.int16)
+            img += rng.integers(-12, 13, img.shape, dtype=np.int16)
+            images.append(np.clip(img, 0, 255).astype(np.uint8))
+            labels.append(100 + uid)
+    return images, np.array(labels, np.int32)
+
+
+def synthetic_users(users: int, seed: int = 0):
+    """(id, name, sex, department) rows matching the labels of synthetic_faces()."""
+    rng = np.random.default_rng(seed)
+    return [(100 + i, f"{FIRST[i % len(FIRST)]} {LAST[(i // len(FIRST)) % len(LAST)]}",
+             str(rng.choice(["M", "F"])), DEPARTMENTS[i % len(DEPARTMENTS)]) for i in range(users)]
+
+
+def write_dataset(root: Path, users: int, samples: int, users_csv: Path = None, seed: int = 0):
+    """
+    <id>_<name>/NNNN.png folders like capture_samples() writes (and, with
+    `users_csv`, the matching users.csv). Returns the set of user IDs.
+    """
+    images, labels = synthetic_faces(users, samples, seed)
+    rows = synthetic_users(users, seed)
+    names = {pid: name for pid, name, _, _ in rows}
+    counts = {}
+    for img, label in zip(images, labels):
+        label = int(label)
+        folder = Path(root) / f"{label}_{names[label].replace(' ', '_')}"
+        folder.mkdir(parents=True, exist_ok=True)
+        counts[label] = counts.get(label, 0) + 1
+        cv2.imwrite(str(folder / f"{counts[label]:04d}.png"), img)
+    if users_csv is not None:
+        with open(users_csv, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["id", "name", "sex", "department"])
+            w.writerows(rows)
+    return set(names)
+
+
+def write_attendance(path: Path, rows: int, ids, days: int = 120, seed: int = 0):
+    """attendance.csv with `rows` random rows over `days` days, in date/time order."""
+    rng = np.random.default_rng(seed)
+    ids = sorted(ids)
+    day0 = date.today() - timedelta(days=days)
+    d = np.sort(rng.integers(0, days, rows))
+    secs = rng.integers(7 * 3600, 18 * 3600, rows)
+    who = rng.integers(0, len(ids), rows)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("date,time,id,name\n")
+        for i in range(rows):
+            s = int(secs[i])
+            pid = ids[who[i]]
+            f.write(f"{(day0 + timedelta(days=int(d[i]))).isoformat()},"
+                    f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d},{pid},User {pid}\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--samples", type=int, default=30)
+    ap.add_argument("--attendance", type=int, default=0, help="attendance rows to generate")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    ids = write_dataset(args.out / "dataset", args.users, args.samples, args.out / "users.csv", args.seed)
+    print(f"[INFO] Wrote {len(ids)} users x {args.samples} images to {args.out / 'dataset'}")
+    if args.attendance:
+        write_attendance(args.out / "attendance.csv", args.attendance, ids, seed=args.seed)
+        print(f"[INFO] Wrote {args.attendance} attendance rows to {args.out / 'attendance.csv'}")
+
+
+if __name__ == "__main__":
+    main()